@@ -0,0 +1,239 @@
+# alerts/channels.py
+"""
+Alert delivery channels.
+
+A channel turns an Alert into one delivery: an email, a webhook POST,
+syslog messages or a line in an NDJSON spool file. Channels are driven by
+alerts/dispatcher.py, which gives each one its own queue, timeout, retries
+and circuit breaker. send_batch() receives the alerts queued for the channel
+and returns one error (or None) per alert.
+
+Raise PermanentDeliveryError for failures a retry cannot fix, such as a
+webhook answering 404.
+"""
+import asyncio
+import json
+import os
+import socket
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+class PermanentDeliveryError(Exception):
+    """A delivery failure that retrying will not fix"""
+
+
+class Alert:
+    """A set of critical findings to announce, with a ready-made subject and body"""
+
+    def __init__(self, subject, body, findings, critical_count=0, scan_time=None, scan_type=None,
+                 fingerprints=()):
+        self.subject = subject
+        self.body = body
+        self.findings = findings  # Finding dicts, each with a 'reason' if deduplicated
+        self.critical_count = critical_count
+        self.scan_time = scan_time
+        self.scan_type = scan_type
+        self.fingerprints = list(fingerprints)
+
+    def to_dict(self):
+        return {
+            'subject': self.subject,
+            'scan_time': self.scan_time,
+            'scan_type': self.scan_type,
+            'critical_count': self.critical_count,
+            'findings': self.findings
+        }
+
+
+class Channel:
+    """Base class: deliver alerts one at a time"""
+
+    name = 'channel'
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+
+    async def send(self, alert):
+        raise NotImplementedError
+
+    async def send_batch(self, alerts):
+        errors = []
+        for alert in alerts:
+            try:
+                await self.send(alert)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+    async def close(self):
+        pass
+
+
+class EmailChannel(Channel):
+    """Emails alerts through a pooled SMTPSender, a whole batch at a time
+
+    The sender belongs to the caller and stays open for later batches.
+    """
+
+    name = 'email'
+
+    def __init__(self, sender, sender_email, recipients, timeout=60):
+        super().__init__(timeout)
+        self.sender = sender
+        self.sender_email = sender_email
+        self.recipients = recipients
+
+    def message(self, alert):
+        # Only loaded when an email actually goes out
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg['From'] = self.sender_email
+        msg['To'] = ", ".join(self.recipients)
+        msg['Subject'] = alert.subject
+
+        msg.attach(MIMEText(alert.body, 'plain'))
+        return msg
+
+    async def send_batch(self, alerts):
+        from alerts.smtp_sender import is_transient
+
+        messages = [self.message(alert) for alert in alerts]
+        sent, failed = await asyncio.to_thread(self.sender.send, messages)
+        errors = {id(msg): error for msg, error in failed}
+
+        results = []
+        for msg in messages:
+            error = errors.get(id(msg))
+            if error is not None and not is_transient(error):
+                error = PermanentDeliveryError(str(error))
+            results.append(error)
+        return results
+
+
+class WebhookChannel(Channel):
+    """POSTs each alert as JSON: a Slack-style {"text": ...} message, or the full alert"""
+
+    name = 'webhook'
+
+    # Client errors that are worth retrying
+    RETRY_STATUSES = (408, 425, 429)
+
+    def __init__(self, url, format='slack', headers=None, timeout=10):
+        super().__init__(timeout)
+        self.url = url
+        self.format = format
+        self.headers = headers or {}
+
+    def payload(self, alert):
+        if self.format == 'slack':
+            return {'text': f"*{alert.subject}*\n{alert.body.strip()}"}
+        return alert.to_dict()
+
+    async def send(self, alert):
+        await asyncio.to_thread(self._post, json.dumps(self.payload(alert)).encode())
+
+    def _post(self, data):
+        import urllib.error
+        import urllib.request
+
+        headers = {'Content-Type': 'application/json'}
+        headers.update(self.headers)
+        request = urllib.request.Request(self.url, data=data, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code not in self.RETRY_STATUSES:
+                raise PermanentDeliveryError(f"Webhook returned {e.code}") from e
+            raise
+
+
+# Facility codes from RFC 5424
+SYSLOG_FACILITIES = {
+    'user': 1, 'daemon': 3, 'auth': 4,
+    'local0': 16, 'local1': 17, 'local2': 18, 'local3': 19,
+    'local4': 20, 'local5': 21, 'local6': 22, 'local7': 23,
+}
+
+SYSLOG_CRITICAL = 2
+
+
+class SyslogChannel(Channel):
+    """Sends one RFC 5424 message per finding over UDP or TCP"""
+
+    name = 'syslog'
+
+    def __init__(self, host='localhost', port=514, protocol='udp', facility='local0',
+                 app_name='threatforge', timeout=5):
+        super().__init__(timeout)
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.priority = SYSLOG_FACILITIES[facility] * 8 + SYSLOG_CRITICAL
+        self.app_name = app_name
+        self.hostname = socket.gethostname()
+
+    def messages(self, alert):
+        timestamp = datetime.now(timezone.utc).isoformat()
+        header = f"<{self.priority}>1 {timestamp} {self.hostname} {self.app_name} {os.getpid()} alert -"
+        if not alert.findings:
+            return [f"{header} {alert.subject}"]
+
+        messages = []
+        for finding in alert.findings:
+            fields = " ".join(
+                f'{field}="{finding[field]}"' for field in ('rule_id', 'resource', 'account', 'region', 'reason')
+                if finding.get(field)
+            )
+            messages.append(f"{header} {finding['severity']} {finding['title']} {fields}".rstrip())
+        return messages
+
+    async def send(self, alert):
+        messages = [message.encode() for message in self.messages(alert)]
+        loop = asyncio.get_running_loop()
+
+        if self.protocol == 'tcp':
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                # Octet-counting framing (RFC 6587)
+                writer.write(b"".join(b"%d %s" % (len(message), message) for message in messages))
+                await writer.drain()
+            finally:
+                writer.close()
+                await writer.wait_closed()
+            return
+
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=(self.host, self.port)
+        )
+        try:
+            for message in messages:
+                transport.sendto(message)
+        finally:
+            transport.close()
+
+
+class SpoolChannel(Channel):
+    """Appends each alert as one JSON line to a spool file for other tools to pick up"""
+
+    name = 'spool'
+
+    def __init__(self, path="results/alerts.ndjson", timeout=5):
+        super().__init__(timeout)
+        self.path = Path(path)
+
+    async def send_batch(self, alerts):
+        lines = "".join(json.dumps(alert.to_dict()) + "\n" for alert in alerts)
+        await asyncio.to_thread(self._append, lines)
+        return [None] * len(alerts)
+
+    def _append(self, lines):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,225 @@
+# alerts/dispatcher.py
+"""
+Fan-out of alerts to every configured channel.
+
+dispatch() puts an alert on each channel's queue and returns at once.
+Every channel drains its own queue on its own task, so a slow SMTP server
+never holds up the webhook. A batch that fails, or takes longer than the
+channel's timeout, goes back on that channel's queue after an exponential
+backoff, up to max_retries times.
+
+Each channel also has a circuit breaker. After breaker_failures failed
+batches in a row the channel is considered down. Alerts for it then fail
+immediately, without a connection attempt, and are retried as usual. After
+breaker_reset seconds one batch is let through to test the channel again.
+"""
+import asyncio
+import logging
+import random
+import time
+
+from alerts.channels import PermanentDeliveryError
+
+
+class CircuitOpenError(Exception):
+    """The channel's circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed, open or half-open, counted over consecutive failed deliveries"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        return self.state != 'open'
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        # A failed trial delivery while half-open opens the circuit again
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class _Lane:
+    """One channel's queue, breaker and worker task"""
+
+    def __init__(self, channel, breaker, max_queue):
+        self.channel = channel
+        self.breaker = breaker
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.task = None
+
+
+class AlertDispatcher:
+    """Delivers each alert to all channels concurrently"""
+
+    def __init__(self, channels, max_retries=3, backoff=1.0, breaker_failures=5, breaker_reset=60,
+                 batch_size=20, max_queue=1000):
+        self.channels = list(channels)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.lanes = {}
+        self.delivered = {}  # Alert -> names of channels that delivered it
+        self.failed = {}  # Alert -> {channel name: last error}
+        self._outstanding = 0  # Queued deliveries and pending retries, across all alerts
+        self._per_alert = {}  # Alert -> its outstanding deliveries
+        self._alert_waiters = {}  # Alert -> Event set once it has none left
+        self._idle = None
+        self._retries = {}  # Token -> timer handle of a pending retry
+
+    async def start(self):
+        self._idle = asyncio.Event()
+        self._idle.set()
+        for channel in self.channels:
+            lane = _Lane(channel, CircuitBreaker(self.breaker_failures, self.breaker_reset), self.max_queue)
+            lane.task = asyncio.create_task(self._run(lane), name=f"alerts-{channel.name}")
+            self.lanes[channel.name] = lane
+        return self
+
+    def dispatch(self, alert):
+        """Queue an alert on every channel; call from the event loop"""
+        self.delivered.setdefault(alert, set())
+        for lane in self.lanes.values():
+            self._enqueue(lane, alert, 0)
+
+    def _enqueue(self, lane, alert, attempt):
+        try:
+            lane.queue.put_nowait((alert, attempt))
+        except asyncio.QueueFull:
+            logging.error(f"Alert queue for {lane.channel.name} is full; dropping '{alert.subject}'")
+            self.failed.setdefault(alert, {})[lane.channel.name] = "queue full"
+            return
+        self._hold(alert)
+
+    def _hold(self, alert):
+        self._outstanding += 1
+        self._per_alert[alert] = self._per_alert.get(alert, 0) + 1
+        self._idle.clear()
+
+    def _done(self, alert):
+        self._outstanding -= 1
+        remaining = self._per_alert.pop(alert) - 1
+        if remaining:
+            self._per_alert[alert] = remaining
+        elif alert in self._alert_waiters:
+            self._alert_waiters.pop(alert).set()
+        if self._outstanding == 0:
+            self._idle.set()
+
+    async def wait_for(self, alert):
+        """Wait until every channel has delivered an alert or given up on it"""
+        if alert in self._per_alert:
+            await self._alert_waiters.setdefault(alert, asyncio.Event()).wait()
+
+    async def drain(self):
+        """Wait until every queued alert is delivered or has used up its retries"""
+        await self._idle.wait()
+
+    async def close(self):
+        """Stop the channel workers; alerts still queued are dropped"""
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        for lane in self.lanes.values():
+            lane.task.cancel()
+        await asyncio.gather(*(lane.task for lane in self.lanes.values()), return_exceptions=True)
+        for lane in self.lanes.values():
+            try:
+                await lane.channel.close()
+            except Exception as e:
+                logging.warning(f"Error closing alert channel {lane.channel.name}: {e}")
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        try:
+            if exc_info[0] is None:
+                await self.drain()
+        finally:
+            await self.close()
+
+    async def _run(self, lane):
+        while True:
+            batch = [await lane.queue.get()]
+            while len(batch) < self.batch_size and not lane.queue.empty():
+                batch.append(lane.queue.get_nowait())
+
+            errors = await self._deliver(lane, [alert for alert, _ in batch])
+            if any(error is None for error in errors):
+                lane.breaker.record_success()
+            elif not all(isinstance(error, CircuitOpenError) for error in errors):
+                lane.breaker.record_failure()
+
+            for (alert, attempt), error in zip(batch, errors):
+                if error is None:
+                    self.delivered[alert].add(lane.channel.name)
+                    self.failed.get(alert, {}).pop(lane.channel.name, None)
+                else:
+                    self._retry_or_drop(lane, alert, attempt, error)
+                self._done(alert)
+
+    async def _deliver(self, lane, alerts):
+        if not lane.breaker.allow():
+            return [CircuitOpenError(f"{lane.channel.name} circuit is open")] * len(alerts)
+        try:
+            errors = await asyncio.wait_for(lane.channel.send_batch(alerts), lane.channel.timeout)
+        except asyncio.TimeoutError:
+            error = TimeoutError(f"{lane.channel.name} did not answer within {lane.channel.timeout}s")
+            return [error] * len(alerts)
+        except Exception as e:
+            return [e] * len(alerts)
+        return list(errors)
+
+    def _retry_or_drop(self, lane, alert, attempt, error):
+        name = lane.channel.name
+        self.failed.setdefault(alert, {})[name] = str(error)
+        if isinstance(error, PermanentDeliveryError) or attempt >= self.max_retries:
+            logging.error(f"Giving up on '{alert.subject}' via {name} after {attempt + 1} attempt(s): {error}")
+            return
+
+        delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+        logging.warning(f"Alert delivery via {name} failed ({error}); retry {attempt + 1} in {delay:.1f}s")
+        # Counted as outstanding until it is back on the queue
+        self._hold(alert)
+        token = object()
+        self._retries[token] = asyncio.get_running_loop().call_later(
+            delay, self._requeue, token, lane, alert, attempt + 1
+        )
+
+    def _requeue(self, token, lane, alert, attempt):
+        del self._retries[token]
+        self._enqueue(lane, alert, attempt)
+        self._done(alert)
+
+
+def deliver_alerts(channels, alerts, **options):
+    """Send alerts to all channels and wait for the outcome. Returns the finished dispatcher"""
+    async def run():
+        dispatcher = AlertDispatcher(channels, **options)
+        async with dispatcher:
+            for alert in alerts:
+                dispatcher.dispatch(alert)
+        return dispatcher
+
+    return asyncio.run(run())
@@ -0,0 +1,151 @@
+# alerts/live.py
+"""
+Alerts raised while a scan is still running.
+
+A LiveAlerter subscribes to the scan event bus (utils/events.py) and sends
+CRITICAL findings to the alert channels a few seconds after a scanner finds
+them, instead of after the whole scan is saved. Findings that arrive close
+together are sent as one alert: the first one starts a coalesce_seconds
+window, and the end of a scan sends whatever is waiting.
+
+Alerts go through the same fingerprint index as AlertNotifier, so running
+the notifier on the saved scan afterwards only reports what the live pass
+missed. Stop the LiveAlerter first; that waits for pending deliveries and
+marks them alerted.
+
+The alerter runs its own event loop on a background thread. Bus callbacks
+only hand findings over to that loop, so scanners are never slowed down
+by delivery.
+"""
+import asyncio
+import logging
+import threading
+
+from alerts.dispatcher import AlertDispatcher
+from alerts.notifier import AlertNotifier
+from utils.events import FINDING, SCAN_FINISHED, bus
+from utils.findings import as_dict, field_value
+from utils.findings_store import finding_key
+
+
+class LiveAlerter:
+    """Dispatches CRITICAL findings from the event bus within seconds of being found"""
+
+    def __init__(self, notifier=None, event_bus=None, coalesce_seconds=2.0):
+        self.notifier = notifier or AlertNotifier()
+        self.events = event_bus or bus
+        self.coalesce_seconds = coalesce_seconds
+        self.alerts = []  # Alerts dispatched so far
+        self._loop = None
+        self._thread = None
+        self._dispatcher = None
+        self._pending = {}  # (scan_type, scan_time) -> {finding key: finding}
+        self._flush_handle = None
+        self._tasks = set()
+        self._unsubscribe = []
+
+    def start(self):
+        """Start the delivery loop and subscribe to scan events"""
+        channels = self.notifier.channels()
+        if not channels:
+            logging.info("No alert channels are enabled; live alerts are off")
+            return self
+
+        self._loop = asyncio.new_event_loop()
+        self._dispatcher = AlertDispatcher(channels, **self.notifier.dispatch_options())
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name='tf-live-alerts', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+        self._unsubscribe = [
+            self.events.subscribe(FINDING, self._on_finding),
+            self.events.subscribe(SCAN_FINISHED, self._on_scan_finished),
+        ]
+        return self
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._dispatcher.start())
+        ready.set()
+        self._loop.run_forever()
+
+    def _on_finding(self, event):
+        # Called on the scanner's thread
+        if field_value(event['finding'], 'severity') == 'CRITICAL':
+            self._call_soon(self._add, event)
+
+    def _on_scan_finished(self, event):
+        self._call_soon(self._flush_pending)
+
+    def _call_soon(self, callback, *args):
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(callback, *args)
+
+    def _add(self, event):
+        finding = as_dict(event['finding'])
+        issues = self._pending.setdefault((event['scan_type'], event['scan_time']), {})
+        issues.setdefault(finding_key(finding), finding)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.coalesce_seconds, self._flush_pending)
+
+    def _flush_pending(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._send(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, pending):
+        for (scan_type, scan_time), issues in pending.items():
+            try:
+                # The fingerprint index is SQLite; keep it off the loop
+                alert = await asyncio.to_thread(self.notifier.build_live_alert, issues, scan_type, scan_time)
+            except Exception as e:
+                logging.error(f"Could not build live alert: {e}")
+                continue
+            if alert is None:
+                continue
+
+            self.alerts.append(alert)
+            self._dispatcher.dispatch(alert)
+            await self._dispatcher.wait_for(alert)
+            await asyncio.to_thread(self.notifier.record_delivery, [alert], self._dispatcher)
+
+    def settle(self):
+        """Block until alerts for every finding seen so far are delivered and recorded"""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._settle(), self._loop).result()
+
+    async def _settle(self):
+        self._flush_pending()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self):
+        """Send anything still pending, wait for delivery and stop the loop"""
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+        if self._loop is None:
+            return
+
+        loop, self._loop = self._loop, None
+        asyncio.run_coroutine_threadsafe(self._finish(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+    async def _finish(self):
+        await self._settle()
+        await self._dispatcher.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
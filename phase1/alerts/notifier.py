@@ -1,14 +1,22 @@
-import smtplib
 import json
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+import os
+import sys
 import logging
 from pathlib import Path
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datetime import timedelta
+
+from utils.findings_store import FindingsStore, finding_key
+from utils.results_format import open_scan_results, read_summary
+
 class AlertNotifier:
-    def __init__(self, config_file="config/alerts.json"):
+    def __init__(self, config_file="config/alerts.json", sender=None, store=None):
         self.config_file = Path(config_file)
         self.load_config()
+        self.sender = sender  # Built from the config on first send
+        self.store = store  # Fingerprint index; opened on first use
+        self.outbox = []  # (message, fingerprints) pairs
     
     def load_config(self):
         """Load alert configuration"""
@@ -17,11 +25,31 @@ class AlertNotifier:
                 "enabled": False,
                 "smtp_server": "smtp.gmail.com",
                 "smtp_port": 587,
+                "use_tls": True,
                 "sender_email": "",
                 "sender_password": "",
-                "recipients": []
+                "recipients": [],
+                "pool_size": 2,
+                "batch_size": 20,
+                "max_retries": 3,
+                "retry_backoff_seconds": 1.0,
+                "timeout_seconds": 30
+            },
+            "channels": {
+                "webhook": {"enabled": False, "url": "", "format": "slack", "timeout_seconds": 10},
+                "syslog": {"enabled": False, "host": "localhost", "port": 514, "protocol": "udp",
+                           "facility": "local0", "timeout_seconds": 5},
+                "spool": {"enabled": False, "path": "results/alerts.ndjson"}
             },
-            "critical_severity_threshold": 1
+            "dispatch": {
+                "max_retries": 3,
+                "retry_backoff_seconds": 1.0,
+                "breaker_failures": 5,
+                "breaker_reset_seconds": 60
+            },
+            "critical_severity_threshold": 1,
+            "deduplicate": True,
+            "reminder_interval_hours": 0
         }
         
         if self.config_file.exists():
@@ -30,82 +58,296 @@ class AlertNotifier:
         else:
             self.config = default_config
     
+    def _critical_count(self, header):
+        return header['summary']['severity'].get('CRITICAL', 0)
+    
     def check_critical_findings(self, scan_file):
         """Check if scan contains critical findings"""
         try:
-            with open(scan_file, 'r') as f:
-                scan_data = json.load(f)
-            
-            critical_count = 0
-            for finding in scan_data.get('findings', []):
-                if finding['severity'] == 'CRITICAL':
-                    critical_count += 1
-            
+            # Counts come from the summary header; findings are not read
+            critical_count = self._critical_count(read_summary(scan_file))
             return critical_count >= self.config['critical_severity_threshold']
             
         except Exception as e:
             logging.error(f"Error checking critical findings: {e}")
             return False
     
-    def send_email_alert(self, scan_file, critical_count):
-        """Send email alert for critical findings"""
-        if not self.config['email']['enabled']:
-            return
+    def build_alert(self, scan_file):
+        """Read a scan once and return an Alert, or None if nothing needs one
         
-        try:
-            with open(scan_file, 'r') as f:
-                scan_data = json.load(f)
-            
-            subject = f"ThreatForge Alert: {critical_count} Critical Security Issues Found"
+        With deduplication on, only critical findings that are new, have
+        reopened or are due a reminder are included. Their fingerprints are
+        marked alerted once a channel has delivered the alert.
+        """
+        deduplicate = self.config.get('deduplicate', True)
+        with open_scan_results(scan_file) as (header, findings):
+            critical_count = self._critical_count(header)
+            below_threshold = critical_count < self.config['critical_severity_threshold']
+            if below_threshold and not deduplicate:
+                return None
             
-            body = f"""
+            issues = {}
+            for finding in findings:
+                if finding['severity'] == 'CRITICAL':
+                    issues.setdefault(finding_key(finding), finding)
+        
+        fingerprints = []
+        if deduplicate:
+            # Tracked below the threshold too, so fixed findings resolve and alert again if they come back
+            reasons = self._get_store().track_fingerprints(
+                issues, scan_type=header.get('scan_type'), reminder_interval=self._reminder_interval(),
+                coverage=header.get('coverage')
+            )
+            if below_threshold:
+                return None
+            if not reasons:
+                logging.info(f"All {critical_count} critical issues were already alerted")
+                return None
+            issues = {key: dict(finding, reason=reasons[key]) for key, finding in issues.items() if key in reasons}
+            fingerprints = list(issues)
+        
+        return self._make_alert(list(issues.values()), critical_count, header, fingerprints)
+    
+    def build_live_alert(self, issues, scan_type=None, scan_time=None):
+        """Build an Alert for critical findings reported by a scan still in progress
+        
+        issues maps finding_key() to finding dicts. Fingerprints are tracked
+        as in build_alert() but nothing is marked resolved, since the scan has
+        not reported everything yet.
+        """
+        fingerprints = []
+        if self.config.get('deduplicate', True):
+            reasons = self._get_store().track_fingerprints(
+                issues, scan_type=scan_type, reminder_interval=self._reminder_interval(), resolve=False
+            )
+            if not reasons:
+                return None
+            issues = {key: dict(finding, reason=reasons[key]) for key, finding in issues.items() if key in reasons}
+            fingerprints = list(issues)
+        
+        header = {'scan_time': scan_time, 'scan_type': scan_type}
+        return self._make_alert(list(issues.values()), len(issues), header, fingerprints)
+    
+    def _make_alert(self, issues, critical_count, header, fingerprints=()):
+        from alerts.channels import Alert
+        
+        lines = []
+        for finding in issues:
+            line = f"\n- {finding['title']} ({finding['resource']})"
+            if finding.get('reason') in ('reopened', 'reminder'):
+                line += f" [{finding['reason']}]"
+            lines.append(line)
+        
+        subject = f"ThreatForge Alert: {len(issues)} Critical Security Issues Found"
+        
+        body = f"""
 Critical security issues detected in your AWS environment.
 
-Scan Time: {scan_data.get('scan_time')}
+Scan Time: {header.get('scan_time')}
 Total Critical Issues: {critical_count}
 
 Immediate attention required for:
 """
+        body += "".join(lines)
+        body += f"\n\nView full report: http://localhost:8000"
+        
+        return Alert(
+            subject, body, issues,
+            critical_count=critical_count,
+            scan_time=header.get('scan_time'),
+            scan_type=header.get('scan_type'),
+            fingerprints=fingerprints
+        )
+    
+    def _reminder_interval(self):
+        hours = self.config.get('reminder_interval_hours')
+        return timedelta(hours=hours) if hours else None
+    
+    def _get_store(self):
+        if self.store is None:
+            self.store = FindingsStore()
+        return self.store
+    
+    def send_email_alert(self, scan_file, critical_count=None):
+        """Send email alert for critical findings
+        
+        Only the email channel is used; process_scan_alerts() sends to every
+        enabled channel. With deduplication on, findings emailed here count
+        as alerted for the other channels too.
+        """
+        if not self.config['email']['enabled']:
+            return
+        
+        try:
+            alert = self.build_alert(scan_file)
+            if alert is None:
+                return
             
-            for finding in scan_data.get('findings', []):
-                if finding['severity'] == 'CRITICAL':
-                    body += f"\n- {finding['title']} ({finding['resource']})"
-            
-            body += f"\n\nView full report: http://localhost:8000"
-            
-            self._send_email(subject, body)
-            logging.info(f"Email alert sent for {critical_count} critical issues")
+            from alerts.dispatcher import deliver_alerts
             
+            dispatcher = deliver_alerts([self._email_channel()], [alert], **self.dispatch_options())
+            self.record_delivery([alert], dispatcher)
         except Exception as e:
             logging.error(f"Error sending email alert: {e}")
     
-    def _send_email(self, subject, body):
-        """Send email using SMTP"""
-        msg = MimeMultipart()
-        msg['From'] = self.config['email']['sender_email']
-        msg['To'] = ", ".join(self.config['email']['recipients'])
-        msg['Subject'] = subject
-        
-        msg.attach(MimeText(body, 'plain'))
-        
-        server = smtplib.SMTP(self.config['email']['smtp_server'], self.config['email']['smtp_port'])
-        server.starttls()
-        server.login(self.config['email']['sender_email'], self.config['email']['sender_password'])
-        server.send_message(msg)
-        server.quit()
-    
-    def process_scan_alerts(self, scan_file):
-        """Process alerts for a new scan"""
-        if self.check_critical_findings(scan_file):
-            with open(scan_file, 'r') as f:
-                scan_data = json.load(f)
-            
-            critical_count = len([f for f in scan_data.get('findings', []) if f['severity'] == 'CRITICAL'])
+    def queue_alert(self, alert):
+        """Add an alert to the outbox; flush() sends everything queued together"""
+        self.outbox.append(alert)
+    
+    def flush(self):
+        """Send the outbox to every enabled channel; True if each alert reached them all"""
+        if not self.outbox:
+            return True
+        
+        alerts, self.outbox = self.outbox, []
+        channels = self.channels()
+        if not channels:
+            return False
+        
+        from alerts.dispatcher import deliver_alerts
+        
+        dispatcher = deliver_alerts(channels, alerts, **self.dispatch_options())
+        return self.record_delivery(alerts, dispatcher)
+    
+    def dispatch_options(self):
+        """AlertDispatcher keyword arguments from the config"""
+        dispatch = self.config.get('dispatch', {})
+        return {
+            'max_retries': dispatch.get('max_retries', 3),
+            'backoff': dispatch.get('retry_backoff_seconds', 1.0),
+            'breaker_failures': dispatch.get('breaker_failures', 5),
+            'breaker_reset': dispatch.get('breaker_reset_seconds', 60)
+        }
+    
+    def record_delivery(self, alerts, dispatcher):
+        """Log how alerts went and mark the delivered ones; True if each reached every channel"""
+        # Alerts no channel delivered stay unmarked and are raised again by the next scan
+        delivered = []
+        for alert in alerts:
+            names = dispatcher.delivered.get(alert, set())
+            if names:
+                delivered.extend(alert.fingerprints)
+                logging.info(f"Alert for {alert.critical_count} critical issues sent via {', '.join(sorted(names))}")
+            for name, error in dispatcher.failed.get(alert, {}).items():
+                logging.error(f"Could not send '{alert.subject}' via {name}: {error}")
+        if delivered:
+            self._get_store().mark_alerted(delivered)
+        return not any(dispatcher.failed.get(alert) for alert in alerts)
+    
+    def channels(self):
+        """Build the enabled alert channels from the config"""
+        from alerts.channels import SpoolChannel, SyslogChannel, WebhookChannel
+        
+        channels = []
+        if self.config['email']['enabled']:
+            channels.append(self._email_channel())
+        
+        config = self.config.get('channels', {})
+        webhook = config.get('webhook', {})
+        if webhook.get('enabled'):
+            channels.append(WebhookChannel(
+                webhook['url'],
+                format=webhook.get('format', 'slack'),
+                headers=webhook.get('headers'),
+                timeout=webhook.get('timeout_seconds', 10)
+            ))
+        syslog = config.get('syslog', {})
+        if syslog.get('enabled'):
+            channels.append(SyslogChannel(
+                syslog.get('host', 'localhost'),
+                syslog.get('port', 514),
+                protocol=syslog.get('protocol', 'udp'),
+                facility=syslog.get('facility', 'local0'),
+                timeout=syslog.get('timeout_seconds', 5)
+            ))
+        spool = config.get('spool', {})
+        if spool.get('enabled'):
+            channels.append(SpoolChannel(spool.get('path', "results/alerts.ndjson")))
+        return channels
+    
+    def _email_channel(self):
+        from alerts.channels import EmailChannel
+        
+        email = self.config['email']
+        return EmailChannel(
+            self._get_sender(), email['sender_email'], email['recipients'],
+            timeout=email.get('send_timeout_seconds', 60)
+        )
+    
+    def _get_sender(self):
+        if self.sender is None:
+            from alerts.smtp_sender import SMTPSender
             
-            if self.config['email']['enabled']:
-                self.send_email_alert(scan_file, critical_count)
+            email = self.config['email']
+            self.sender = SMTPSender(
+                email['smtp_server'],
+                email['smtp_port'],
+                username=email['sender_email'],
+                password=email['sender_password'],
+                starttls=email.get('use_tls', True),
+                pool_size=email.get('pool_size', 2),
+                batch_size=email.get('batch_size', 20),
+                max_retries=email.get('max_retries', 3),
+                backoff=email.get('retry_backoff_seconds', 1.0),
+                timeout=email.get('timeout_seconds', 30)
+            )
+        return self.sender
+    
+    def _send_email(self, subject, body):
+        """Send one email right away"""
+        from alerts.channels import Alert
+        from alerts.dispatcher import deliver_alerts
+        
+        alert = Alert(subject, body, [])
+        dispatcher = deliver_alerts([self._email_channel()], [alert], max_retries=0)
+        if not dispatcher.delivered[alert]:
+            raise RuntimeError(f"Email '{subject}' was not delivered: {dispatcher.failed[alert]['email']}")
+    
+    def process_scan_alerts(self, scan_file, flush=True):
+        """Process alerts for a new scan
+        
+        The scan is streamed once. Pass flush=False to queue the alert and
+        send several scans' alerts together with flush().
+        """
+        if not self.channels_enabled():
+            return
+        
+        try:
+            alert = self.build_alert(scan_file)
+        except Exception as e:
+            logging.error(f"Error checking critical findings: {e}")
+            return
+        if alert is None:
+            return
+        
+        self.queue_alert(alert)
+        if flush:
+            self.flush()
+    
+    def channels_enabled(self):
+        return self.config['email']['enabled'] or any(
+            channel.get('enabled') for channel in self.config.get('channels', {}).values()
+        )
+    
+    def close(self):
+        """Send anything still queued and close pooled SMTP connections"""
+        try:
+            self.flush()
+        finally:
+            if self.sender is not None:
+                self.sender.close()
 
-if __name__ == "__main__":
+def notify_latest_scan():
+    """Send alerts for the most recent scan"""
     notifier = AlertNotifier()
-    latest_scan = max(Path("results").glob("*scan*.json"), key=lambda x: x.stat().st_mtime)
-    notifier.process_scan_alerts(latest_scan)
+    latest_scan = FindingsStore().latest_scan()
+    if latest_scan is None:
+        logging.error("No scan results found")
+        return
+    try:
+        notifier.process_scan_alerts(latest_scan['path'])
+    finally:
+        notifier.close()
+
+if __name__ == "__main__":
+    notify_latest_scan()
@@ -0,0 +1,189 @@
+# alerts/smtp_sender.py
+"""
+Pooled SMTP delivery for alerts.
+
+Connecting, STARTTLS and AUTH cost several round trips, so an SMTPSender
+keeps authenticated connections open and reuses them across messages and
+across send() calls. Messages go out in batches of batch_size, one batch
+per pooled connection, and batches run in parallel up to pool_size.
+
+Failures are split by cause. A dropped connection, a socket error or a 4xx
+reply is transient: the connection is thrown away and the rest of the batch
+is retried on a new one after an exponential backoff with jitter. A 5xx
+reply or a refused recipient is permanent for that one message; it is
+reported and the batch carries on.
+"""
+import logging
+import queue
+import random
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Pooled connections idle longer than this are checked with NOOP before use
+IDLE_CHECK_SECONDS = 30
+
+# Longest wait between retries
+MAX_BACKOFF_SECONDS = 30
+
+
+def is_transient(error):
+    """True if a send that failed with this error is worth retrying"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    # socket.timeout, ConnectionRefusedError, ...
+    return isinstance(error, OSError)
+
+
+class SMTPSender:
+    """Sends email.message.Message objects over a pool of reusable SMTP connections"""
+
+    def __init__(self, host, port=587, username=None, password=None, starttls=True,
+                 pool_size=2, batch_size=20, max_retries=3, backoff=1.0, timeout=30,
+                 smtp_class=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.pool_size = max(1, pool_size)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.smtp_class = smtp_class
+        self.connections_opened = 0
+        # Most recently used first, so idle extras age out and get closed
+        self._idle = queue.LifoQueue(maxsize=self.pool_size)
+        self._lock = threading.Lock()
+
+    def send(self, messages):
+        """Deliver messages; return (sent, failed) where failed holds (message, error) pairs"""
+        messages = list(messages)
+        batches = [messages[i:i + self.batch_size] for i in range(0, len(messages), self.batch_size)]
+        if len(batches) <= 1 or self.pool_size == 1:
+            results = [self._send_batch(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.pool_size, len(batches))) as executor:
+                results = list(executor.map(self._send_batch, batches))
+
+        sent, failed = 0, []
+        for batch_sent, batch_failed in results:
+            sent += batch_sent
+            failed.extend(batch_failed)
+        return sent, failed
+
+    def _send_batch(self, batch):
+        sent, failed = 0, []
+        pending = list(batch)
+        attempt = 0
+
+        while pending:
+            error = None
+            try:
+                connection = self._checkout()
+            except Exception as e:
+                error = e
+            else:
+                while pending:
+                    message = pending[0]
+                    try:
+                        refused = connection.send_message(message)
+                    except Exception as e:
+                        if is_transient(e):
+                            error = e
+                            break
+                        # The message was rejected; the connection is still good
+                        failed.append((message, e))
+                        pending.pop(0)
+                        continue
+                    if refused:
+                        logging.warning(f"SMTP server refused recipients {', '.join(refused)}")
+                    pending.pop(0)
+                    sent += 1
+
+                if error is None:
+                    self._checkin(connection)
+                else:
+                    self._discard(connection)
+
+            if error is None:
+                continue
+            attempt += 1
+            if not is_transient(error) or attempt > self.max_retries:
+                failed.extend((message, error) for message in pending)
+                break
+            delay = self._backoff_delay(attempt)
+            logging.warning(f"SMTP send to {self.host}:{self.port} failed ({error}); retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+
+        return sent, failed
+
+    def _backoff_delay(self, attempt):
+        delay = min(self.backoff * 2 ** (attempt - 1), MAX_BACKOFF_SECONDS)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _connect(self):
+        connection = self.smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                connection.starttls(context=ssl.create_default_context())
+            if self.username and self.password:
+                connection.login(self.username, self.password)
+        except BaseException:
+            connection.close()
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    def _checkout(self):
+        while True:
+            try:
+                connection, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < IDLE_CHECK_SECONDS:
+                return connection
+            try:
+                if connection.noop()[0] == 250:
+                    return connection
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(connection)
+
+    def _checkin(self, connection):
+        try:
+            self._idle.put_nowait((connection, time.monotonic()))
+        except queue.Full:
+            self._discard(connection, quit=True)
+
+    def _discard(self, connection, quit=False):
+        try:
+            if quit:
+                connection.quit()
+            else:
+                connection.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    def close(self):
+        """Say QUIT on every pooled connection"""
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(connection, quit=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
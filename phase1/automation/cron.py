@@ -0,0 +1,104 @@
+# automation/cron.py
+"""
+Five-field cron expressions: minute hour day-of-month month day-of-week.
+
+Fields accept *, numbers, ranges (1-5), steps (*/15, 0-30/10), comma lists
+and three-letter month and weekday names. Day-of-week runs 0-6 from Sunday
+(7 is also Sunday). As in cron, when both day fields are restricted a day
+matches if either one does.
+"""
+from datetime import timedelta
+
+MONTH_NAMES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+DAY_NAMES = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+# Give up after this many days without a match (e.g. "0 0 31 2 *")
+SEARCH_DAYS = 366 * 5
+
+
+def _parse_value(value, names, offset):
+    value = value.lower()
+    if value in names:
+        return names.index(value) + offset
+    return int(value)
+
+
+def _parse_field(field, low, high, names=()):
+    offset = low if names else 0
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/', 1)
+            step = int(step)
+            if step <= 0:
+                raise ValueError(f"Invalid step in cron field: {field}")
+
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (_parse_value(value, names, offset) for value in part.split('-', 1))
+        else:
+            start = _parse_value(part, names, offset)
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field out of range: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """A parsed cron expression that can compute its next fire time"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression}")
+
+        minute, hour, day, month, weekday = fields
+        self.minutes = _parse_field(minute, 0, 59)
+        self.hours = _parse_field(hour, 0, 23)
+        self.days = _parse_field(day, 1, 31)
+        self.months = _parse_field(month, 1, 12, MONTH_NAMES)
+        self.weekdays = {value % 7 for value in _parse_field(weekday, 0, 7, DAY_NAMES)}
+        self.any_day = day.startswith('*')
+        self.any_weekday = weekday.startswith('*')
+
+    def _day_matches(self, dt):
+        # isoweekday() is 1-7 from Monday; cron counts 0-6 from Sunday
+        day_ok = dt.day in self.days
+        weekday_ok = dt.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt):
+        """First fire time strictly after dt"""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        end = dt + timedelta(days=SEARCH_DAYS)
+
+        while dt < end:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r})"
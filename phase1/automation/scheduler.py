@@ -1,69 +1,346 @@
-import schedule
-import time
-import subprocess
+import asyncio
+import fcntl
+import functools
+import json
 import logging
-from datetime import datetime
 import os
+import random
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Allow running as `python3 automation/scheduler.py` from the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from automation.cron import CronSchedule
+from scanner.scan_worker import ScanWorker
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Used when config/schedules.json is missing: the original daily scan and weekly report
+DEFAULT_CONFIG = {
+    "state_file": "results/scheduler_state.json",
+    "max_concurrent_jobs": 2,
+    "live_alerts": False,
+    "jobs": [
+        {"name": "daily-scan", "type": "scan", "cron": "0 2 * * *",
+         "scanner": "enhanced", "jitter_seconds": 300, "timeout_seconds": 600},
+        {"name": "weekly-report", "type": "report", "cron": "0 6 * * mon", "jitter_seconds": 60}
+    ]
+}
+
+# Longest sleep between checks, so clock changes are noticed
+MAX_SLEEP_SECONDS = 300
+
+# Missed fire times counted when catching up after downtime
+MAX_MISSED_RUNS = 100000
+
+
+class ScheduledJob:
+    """A named job on a cron cadence"""
+
+    def __init__(self, name, cron, action, jitter=0, catch_up=True, timeout=None):
+        self.name = name
+        self.schedule = CronSchedule(cron)
+        self.action = action  # Coroutine function, called with no arguments
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.timeout = timeout
+        self.next_fire = None  # Cron time of the next run
+        self.next_run = None  # next_fire plus jitter
+
+
+class SchedulerState:
+    """Per-job run history kept in a JSON file so it survives restarts"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.jobs = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.jobs = json.load(f).get('jobs', {})
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable scheduler state {self.path}: {e}")
+
+    def get(self, name):
+        return self.jobs.setdefault(name, {})
+
+    def update(self, name, **fields):
+        self.get(name).update(fields)
+        self.save()
+
+    def save(self):
+        # Write then rename, so a crash never leaves a half-written file
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump({'jobs': self.jobs}, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+async def _wait_finished(future):
+    """Wait until a concurrent.futures.Future is done, whatever it raises and however often we are cancelled"""
+    waiter = asyncio.wrap_future(future)
+    while True:
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            if not waiter.done():
+                continue
+        except BaseException:
+            pass  # Stopped by the cancel event, or failed; either way it is finished
+        return
+
+
 class ScanScheduler:
-    def __init__(self):
-        self.scan_script = "scanner/enhanced_scanner.py"
-        
-    def run_daily_scan(self):
-        """Run daily security scan"""
-        logging.info("Starting scheduled daily security scan")
+    """Runs scans and reports on cron cadences
+
+    Each job fires on its cron schedule plus a random delay of up to
+    jitter_seconds, so many schedulers do not call AWS at the same moment.
+    After downtime a job whose runs were missed runs once to catch up. A job
+    never overlaps itself: a run that comes due while the previous one is
+    still going is skipped, and a lock file keeps other scheduler processes
+    on the host from running it at the same time. A timed-out scan keeps
+    its lock until its thread has actually stopped. At most
+    max_concurrent_jobs jobs run at once.
+    """
+
+    def __init__(self, config_file="config/schedules.json"):
+        config = self.load_config(config_file)
+        self.state = SchedulerState(config['state_file'])
+        self.lock_dir = self.state.path.parent
+        self.max_concurrent = config.get('max_concurrent_jobs', 2)
+        # Alert on critical findings while scheduled scans are still running
+        self.live_alerts = config.get('live_alerts', False)
+        self.live_alerter = None
+        self.jobs = {}
+        self._running = {}
+        # Scans share one warm session instead of starting python3 each time
+        self.scan_worker = ScanWorker(max_workers=self.max_concurrent)
+
+        for job_config in config['jobs']:
+            if job_config.get('enabled', True):
+                self.add_job(
+                    job_config['name'],
+                    job_config['cron'],
+                    self._action_for(job_config),
+                    jitter=job_config.get('jitter_seconds', 0),
+                    catch_up=job_config.get('catch_up', True),
+                    timeout=job_config.get('timeout_seconds')
+                )
+
+    def load_config(self, config_file):
+        """Load job definitions"""
         try:
-            result = subprocess.run(
-                ["python3", self.scan_script],
-                capture_output=True,
-                text=True,
-                timeout=600  # 10 minute timeout
-            )
-            
-            if result.returncode == 0:
-                logging.info("Daily scan completed successfully")
-            else:
-                logging.error(f"Daily scan failed: {result.stderr}")
-                
-        except Exception as e:
-            logging.error(f"Error running daily scan: {e}")
-    
-    def run_weekly_report(self):
+            with open(config_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return DEFAULT_CONFIG
+
+    def _action_for(self, job_config):
+        if job_config['type'] == 'scan':
+            return functools.partial(self.run_scan, job_config['scanner'], job_config.get('options', {}))
+        if job_config['type'] == 'report':
+            return self.run_weekly_report
+        raise ValueError(f"Unknown job type: {job_config['type']}")
+
+    def add_job(self, name, cron, action, jitter=0, catch_up=True, timeout=None):
+        """Register a job; action is a coroutine function"""
+        self.jobs[name] = ScheduledJob(name, cron, action, jitter, catch_up, timeout)
+
+    async def run_scan(self, scan_type, options=None):
+        """Run a scan on the warm scan worker without blocking the scheduler"""
+        logging.info(f"Starting scheduled {scan_type} scan {options or ''}".rstrip())
+        cancel = threading.Event()
+        future = self.scan_worker.submit(scan_type, options, cancel=cancel)
+        try:
+            scanner = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Timed out or shutting down; stop the scan at its next step, and
+            # only return (releasing the job's lock) once its thread has stopped
+            cancel.set()
+            await _wait_finished(future)
+            raise
+        logging.info(f"Scheduled {scan_type} scan completed with {len(scanner.findings)} findings")
+        if self.live_alerter is not None:
+            await asyncio.to_thread(self._alert_saved_scan, scanner)
+
+    def _alert_saved_scan(self, scanner):
+        # Live alerts for this scan land first; the saved scan then only adds what they missed
+        from utils.findings_store import FindingsStore
+        self.live_alerter.settle()
+        scan = FindingsStore().latest_scan(scan_type=scanner.scan_type)
+        if scan is not None:
+            self.live_alerter.notifier.process_scan_alerts(scan['path'])
+
+    async def run_weekly_report(self):
         """Generate weekly security report"""
         logging.info("Generating weekly security report")
+        report_file = await asyncio.to_thread(self._write_weekly_report)
+        logging.info(f"Weekly report saved: {report_file}")
+
+    def _write_weekly_report(self):
+        from utils.security_reporter import SecurityReporter
+        reporter = SecurityReporter()
+        report = reporter.generate_comprehensive_report()
+        # The week's movement and the last 12 months, from the rollups kept as scans land
+        weeks = reporter.store.trend('week', months=12)
+        report['latest_week'] = weeks[-1] if weeks else None
+        report['weekly_trend'] = weeks
+
+        # Save weekly report with date
+        week = datetime.now().strftime("%Y-%U")
+        report_file = f"results/weekly_report_{week}.json"
+
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
+        return report_file
+
+    def _plan(self, job, now):
+        """Work out a job's next run from its persisted state"""
+        last_fire = _parse_time(self.state.get(job.name).get('last_scheduled')) or now
+        fire = job.schedule.next_after(last_fire)
+
+        if fire <= now:
+            missed, latest = 0, fire
+            while fire <= now and missed < MAX_MISSED_RUNS:
+                missed, latest = missed + 1, fire
+                fire = job.schedule.next_after(fire)
+
+            if job.catch_up:
+                logging.info(f"Job {job.name} missed {missed} run(s) while stopped; catching up")
+                job.next_fire = latest
+                job.next_run = now + self._jitter(job)
+                return
+            fire = job.schedule.next_after(now)
+
+        job.next_fire = fire
+        job.next_run = fire + self._jitter(job)
+
+    def _jitter(self, job):
+        return timedelta(seconds=random.uniform(0, job.jitter)) if job.jitter else timedelta()
+
+    def _recover_interrupted(self):
+        # A run left as 'running' whose lock nobody holds died with its scheduler
+        for name in self.jobs:
+            if self.state.get(name).get('last_status') != 'running':
+                continue
+            lock = self._try_lock(name)
+            if lock is not None:
+                self._unlock(lock)
+                self.state.update(name, last_status='interrupted')
+                logging.warning(f"Job {name} was interrupted by a restart")
+
+    def _try_lock(self, name):
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_dir / f"scheduler_{name}.lock", os.O_RDWR | os.O_CREAT, 0o644)
         try:
-            from utils.security_reporter import SecurityReporter
-            reporter = SecurityReporter()
-            report = reporter.generate_comprehensive_report()
-            
-            # Save weekly report with date
-            week = datetime.now().strftime("%Y-%U")
-            report_file = f"results/weekly_report_{week}.json"
-            
-            with open(report_file, 'w') as f:
-                import json
-                json.dump(report, f, indent=2)
-                
-            logging.info(f"Weekly report saved: {report_file}")
-            
-        except Exception as e:
-            logging.error(f"Error generating weekly report: {e}")
-    
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return None
+        return fd
+
+    def _unlock(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _dispatch(self, job, now):
+        fire = job.next_fire
+
+        # Plan the following run first; skip fire times that already passed
+        next_fire = job.schedule.next_after(fire)
+        if next_fire <= now:
+            next_fire = job.schedule.next_after(now)
+        job.next_fire = next_fire
+        job.next_run = next_fire + self._jitter(job)
+
+        running = self._running.get(job.name)
+        if running is not None and not running.done():
+            logging.warning(f"Job {job.name} is still running; skipping the run due at {fire}")
+            self.state.update(job.name, last_skipped=fire.isoformat())
+            return
+
+        self.state.update(job.name, last_scheduled=fire.isoformat())
+        self._running[job.name] = asyncio.create_task(self._execute(job, fire))
+
+    async def _execute(self, job, fire):
+        lock = self._try_lock(job.name)
+        if lock is None:
+            logging.warning(f"Job {job.name} is running in another scheduler; skipping the run due at {fire}")
+            return
+
+        try:
+            async with self._slots:
+                self.state.update(
+                    job.name,
+                    last_started=datetime.now().isoformat(),
+                    last_status='running',
+                    last_error=None
+                )
+                status, error = 'succeeded', None
+                try:
+                    await asyncio.wait_for(job.action(), job.timeout)
+                except asyncio.TimeoutError:
+                    status, error = 'timed_out', f"Timed out after {job.timeout}s"
+                except Exception as e:
+                    status, error = 'failed', str(e)
+
+                if error:
+                    logging.error(f"Job {job.name} {status}: {error}")
+                self.state.update(
+                    job.name,
+                    last_finished=datetime.now().isoformat(),
+                    last_status=status,
+                    last_error=error
+                )
+        finally:
+            self._unlock(lock)
+
+    async def run_forever(self):
+        """Run jobs as they come due"""
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._recover_interrupted()
+        await asyncio.to_thread(self.scan_worker.warm)
+        if self.live_alerts:
+            from alerts.live import LiveAlerter
+            self.live_alerter = await asyncio.to_thread(LiveAlerter().start)
+
+        now = datetime.now()
+        for job in self.jobs.values():
+            self._plan(job, now)
+            logging.info(f"Job {job.name} ({job.schedule.expression}) next runs at {job.next_run:%Y-%m-%d %H:%M:%S}")
+
+        try:
+            while True:
+                now = datetime.now()
+                for job in self.jobs.values():
+                    if job.next_run <= now:
+                        self._dispatch(job, now)
+
+                if self.jobs:
+                    wait = (min(job.next_run for job in self.jobs.values()) - datetime.now()).total_seconds()
+                else:
+                    wait = MAX_SLEEP_SECONDS
+                await asyncio.sleep(min(max(wait, 0), MAX_SLEEP_SECONDS))
+        finally:
+            tasks = [task for task in self._running.values() if not task.done()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.live_alerter is not None:
+                await asyncio.to_thread(self.live_alerter.stop)
+
     def start_scheduler(self):
         """Start the automated scheduling"""
-        # Daily scan at 2 AM
-        schedule.every().day.at("02:00").do(self.run_daily_scan)
-        
-        # Weekly report on Monday at 6 AM
-        schedule.every().monday.at("06:00").do(self.run_weekly_report)
-        
-        logging.info("Scheduler started - Daily scans at 02:00, Weekly reports on Monday at 06:00")
-        
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
+        logging.info(f"Scheduler started with {len(self.jobs)} jobs, at most {self.max_concurrent} at a time")
+        asyncio.run(self.run_forever())
+
 
 if __name__ == "__main__":
     scheduler = ScanScheduler()
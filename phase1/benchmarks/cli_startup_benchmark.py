@@ -0,0 +1,73 @@
+# benchmarks/cli_startup_benchmark.py
+"""
+Startup cost of each threatforge subcommand.
+
+Runs `python -X importtime threatforge.py --import-only <command>` for every
+subcommand. That imports exactly what the command would import, then exits
+before doing any work. The script reports wall time, total import time and
+the packages that take longest to import.
+
+    python3 benchmarks/cli_startup_benchmark.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [
+    ['--help'],
+    ['scan'],
+    ['scan', '--type', 'production'],
+    ['report'],
+    ['alert'],
+    ['serve'],
+    ['schedule'],
+]
+
+
+def parse_importtime(stderr):
+    """Return (total microseconds, {root package: microseconds}) from -X importtime output"""
+    packages = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_time)
+    return sum(packages.values()), packages
+
+
+def measure(command, runs):
+    argv = command if command == ['--help'] else ['--import-only'] + command
+    walls, totals, packages = [], [], Counter()
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "threatforge.py"] + argv,
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        walls.append(time.perf_counter() - start)
+        total, packages = parse_importtime(result.stderr)
+        totals.append(total)
+    return statistics.median(walls), statistics.median(totals), packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark threatforge subcommand startup")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=3, help="Slowest packages to list")
+    args = parser.parse_args()
+
+    print(f"{'command':<26} {'wall ms':>8} {'imports ms':>11}  slowest packages (ms)")
+    for command in COMMANDS:
+        wall, imports, packages = measure(command, args.runs)
+        slowest = ", ".join(f"{name} {micros / 1000:.0f}" for name, micros in packages.most_common(args.top))
+        print(f"{' '.join(command):<26} {wall * 1000:8.1f} {imports / 1000:11.1f}  {slowest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/html_report_benchmark.py
+"""
+HTML report rendering time and peak memory for 10k, 100k and 1M findings.
+
+A synthetic scan (a quarter CRITICAL, spread over a few services) is
+indexed into a temporary FindingsStore, then rendered two ways, each in a
+fresh child process so peak RSS is measured per renderer:
+
+  legacy     the old approach: build the report dict, then the whole page
+             with repeated `html += f"..."`, then write it
+  streaming  write_html_report(): findings stream from the store onto the
+             index and its continuation pages
+
+    python3 benchmarks/html_report_benchmark.py --sizes 10000 100000 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from utils.findings_store import FindingsStore
+from utils.html_report import DEFAULT_PAGE_SIZE, write_html_report
+from utils.security_reporter import SecurityReporter
+
+SERVICES = ('EC2', 'S3', 'IAM', 'RDS', 'EBS')
+SEVERITIES = ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW')
+TITLES = {
+    'CRITICAL': "SSH Port Open to World",
+    'HIGH': "IAM Password Policy Not Configured",
+    'MEDIUM': "EBS Volume Not Encrypted",
+    'LOW': "Resource Missing Owner Tag",
+}
+
+
+class SyntheticFindings:
+    """Generates findings on every pass instead of holding them"""
+
+    def __init__(self, count):
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for i in range(self.count):
+            severity = SEVERITIES[i % len(SEVERITIES)]
+            yield {
+                'severity': severity,
+                'service': SERVICES[i % len(SERVICES)],
+                'region': 'us-east-1',
+                'resource': f"res-{i:07d}",
+                'title': TITLES[severity],
+                'description': f"Resource res-{i:07d} <allows> 0.0.0.0/0 & more",
+                'recommendation': "Restrict access",
+            }
+
+
+def legacy_render(reporter, output_file):
+    """The pre-streaming renderer, kept here as the baseline"""
+    report = reporter.generate_comprehensive_report()
+    html = f"<html><body><h1>Generated: {report['report_generated']}</h1><h2>Critical Findings</h2>"
+    for service, findings in report['critical_findings'].items():
+        html += f"<h3>{service}</h3>"
+        for finding in findings:
+            html += f"""
+            <div class="finding">
+                <strong>{finding['title']}</strong>
+                <p>Resource: {finding['resource']}</p>
+                <p>{finding['description']}</p>
+                <p><em>Recommendation: {finding['recommendation']}</em></p>
+            </div>
+            """
+    html += "<h2>Recommendations</h2>"
+    for rec in report['recommendations']:
+        html += f"""
+        <div class="recommendation">
+            <strong>{rec['priority']} Priority: {rec['action']}</strong>
+            <p>{rec['description']}</p>
+            <p>Impact: {rec['impact']}</p>
+        </div>
+        """
+    html += "</body></html>"
+    with open(output_file, 'w') as f:
+        f.write(html)
+
+
+def streaming_render(reporter, output_file):
+    write_html_report(reporter.store, reporter.store.latest_scan(), output_file, DEFAULT_PAGE_SIZE)
+
+
+def _child(renderer, results_dir, output_file, queue):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    reporter = SecurityReporter(results_dir)
+    started = time.perf_counter()
+    renderer(reporter, output_file)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, max(0, peak - baseline) / 1024))
+
+
+def measure(renderer, results_dir, output_file):
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(renderer, results_dir, output_file, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def output_size(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files if name.endswith('.html'))
+    return total / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML report rendering")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--skip-legacy', action='store_true', help="Only time the streaming renderer")
+    args = parser.parse_args()
+
+    print(f"{'findings':>10}  {'renderer':>10}  {'seconds':>8}  {'peak RSS +MB':>12}  {'HTML MB':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as results_dir:
+            store = FindingsStore(os.path.join(results_dir, "findings.db"))
+            store.save_scan({
+                'scan_time': '2024-01-01T00:00:00', 'scan_type': 'benchmark',
+                'findings': SyntheticFindings(size)
+            }, filename=f"benchmark_{size}.json.gz")
+
+            renderers = [('streaming', streaming_render)]
+            if not args.skip_legacy:
+                renderers.insert(0, ('legacy', legacy_render))
+            for label, renderer in renderers:
+                output_dir = os.path.join(results_dir, label)
+                os.makedirs(output_dir)
+                seconds, peak_mb = measure(renderer, results_dir, os.path.join(output_dir, "security_report.html"))
+                print(f"{size:>10}  {label:>10}  {seconds:>8.2f}  {peak_mb:>12.1f}  {output_size(output_dir):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
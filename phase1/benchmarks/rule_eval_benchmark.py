@@ -0,0 +1,123 @@
+# benchmarks/rule_eval_benchmark.py
+"""
+Rule evaluation throughput, in-process vs sharded across a process pool.
+
+Builds a synthetic account of security groups spread over several regions
+and evaluates it at 1, 2, 4, ... workers up to the core count, checking
+that every run returns the same findings in the same order.
+
+Two batch types are measured:
+
+  query      each region is a query the worker collects itself, as the
+             scanners do with eval_workers; generating the groups stands in
+             for the describe calls and response parsing
+  collected  groups are collected up front and pickled to the workers,
+             sharded with --shard-by
+
+    python3 benchmarks/rule_eval_benchmark.py --groups 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scanner.rule_engine import ResourceQuery, RuleEvaluator, ShardedRuleEvaluator
+
+REGIONS = ['us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'eu-west-1', 'eu-central-1', 'ap-south-1', 'ap-northeast-1']
+PORTS = [(22, 22), (80, 80), (443, 443), (3389, 3389), (0, 65535), (5432, 5432), (8080, 8090)]
+
+
+def make_groups(count, permissions, ranges, seed):
+    rng = random.Random(seed)
+    groups = []
+    for i in range(count):
+        ip_permissions = []
+        for _ in range(permissions):
+            from_port, to_port = rng.choice(PORTS)
+            cidrs = [f"10.{rng.randrange(256)}.{rng.randrange(256)}.0/24" for _ in range(ranges)]
+            if rng.random() < 0.05:
+                cidrs[rng.randrange(ranges)] = '0.0.0.0/0'
+            ip_permissions.append({
+                'IpProtocol': 'tcp',
+                'FromPort': from_port,
+                'ToPort': to_port,
+                'IpRanges': [{'CidrIp': cidr} for cidr in cidrs]
+            })
+        groups.append({'GroupId': f"sg-{seed:04x}{i:013x}", 'GroupName': f"group-{i}", 'IpPermissions': ip_permissions})
+    return groups
+
+
+class SyntheticQuery(ResourceQuery):
+    """A region's security groups, generated wherever the query is fetched"""
+
+    def __init__(self, count, permissions, ranges, seed):
+        self.client = None
+        self.count = count
+        self.permissions = permissions
+        self.ranges = ranges
+        self.seed = seed
+
+    def fetch(self):
+        return make_groups(self.count, self.permissions, self.ranges, self.seed)
+
+
+def make_batches(args, collected):
+    per_region = args.groups // len(REGIONS)
+    batches = []
+    for seed, region in enumerate(REGIONS):
+        query = SyntheticQuery(per_region, args.permissions, args.ranges, seed)
+        resources = query.fetch() if collected else query
+        batches.append(('security_group', resources, {'region': region, 'timestamp': 'bench'}))
+    return batches
+
+
+def signature(results):
+    return [(f.rule_id, f.resource, f.region) for findings in results for f in findings]
+
+
+def timed(evaluator, batches, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        results = evaluator.evaluate_batches(batches)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def run(args, batches, label):
+    print(f"\n{label}")
+    baseline, expected = timed(RuleEvaluator(), batches, args.rounds)
+    print(f"{'in-process':>12}  {baseline:8.3f}s  {1:6.2f}x  findings: {sum(len(r) for r in expected)}")
+
+    workers = 1
+    while workers <= args.max_workers:
+        with ShardedRuleEvaluator(workers, shard_by=args.shard_by) as evaluator:
+            evaluator.evaluate_batches([('security_group', [], {})])  # Start the pool outside the timing
+            elapsed, results = timed(evaluator, batches, args.rounds)
+        assert signature(results) == signature(expected), "sharded findings differ from the serial run"
+        print(f"{workers:>4} workers  {elapsed:8.3f}s  {baseline / elapsed:6.2f}x")
+        workers *= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded rule evaluation")
+    parser.add_argument('--groups', type=int, default=20000)
+    parser.add_argument('--permissions', type=int, default=10)
+    parser.add_argument('--ranges', type=int, default=20)
+    parser.add_argument('--shard-by', choices=ShardedRuleEvaluator.SHARD_MODES, default='hash')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.groups} security groups x {args.permissions} permissions x {args.ranges} ranges "
+          f"over {len(REGIONS)} regions, {os.cpu_count()} cores")
+
+    run(args, make_batches(args, collected=False), "query batches (collected by the workers)")
+    run(args, make_batches(args, collected=True), f"collected batches (shard_by={args.shard_by})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/scan_results_benchmark.py
+"""
+/api/scan-results throughput before and after fast JSON, response caching
+and compression.
+
+Five synthetic scans are indexed into a temporary FindingsStore. Two apps
+serve them over real HTTP with uvicorn:
+
+  before   the original handler: rebuild the five scan documents on every
+           request and return them through FastAPI's default encoder,
+           uncompressed
+  after    dashboard.app itself: cached bytes per scan version, orjson when
+           installed, gzip/brotli by Accept-Encoding
+
+Each app is hit by --clients keep-alive connections for --seconds, once per
+Accept-Encoding.
+
+    python3 benchmarks/scan_results_benchmark.py --findings 2000 --seconds 5
+"""
+import argparse
+import http.client
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+import uvicorn
+from fastapi import FastAPI
+
+from utils.findings_store import FindingsStore
+
+SERVICES = ('EC2', 'S3', 'IAM', 'RDS', 'EBS')
+SEVERITIES = ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW')
+
+
+def populate(store, findings_per_scan):
+    for day in range(1, 6):
+        store.save_scan({
+            'scan_time': f"2024-01-0{day}T02:00:00", 'scan_type': 'enhanced',
+            'findings': [
+                {
+                    'rule_id': 'EC2_SSH_OPEN_TO_WORLD', 'severity': SEVERITIES[i % len(SEVERITIES)],
+                    'service': SERVICES[i % len(SERVICES)], 'region': 'us-east-1', 'account': '111111111111',
+                    'resource': f"sg-{i:08d}", 'title': "SSH Port Open to World",
+                    'description': f"Security group sg-{i:08d} allows SSH (22) from 0.0.0.0/0",
+                    'recommendation': "Restrict SSH access to specific IP ranges",
+                    'timestamp': f"2024-01-0{day}T02:00:00"
+                }
+                for i in range(findings_per_scan)
+            ]
+        }, filename=f"scan_{day}.json.gz")
+
+
+def before_app(store):
+    """The pre-cache handler, for comparison"""
+    app = FastAPI()
+
+    @app.get("/api/scan-results")
+    async def get_scan_results():
+        latest_results = []
+        for scan in store.recent_scans(limit=5):
+            data = store.load_scan(scan)
+            data['filename'] = scan['filename']
+            data['file_time'] = scan['created_at']
+            latest_results.append(data)
+        return {"scans": latest_results}
+
+    return app
+
+
+def after_app(store):
+    import dashboard.app as dashboard
+    from dashboard.response_cache import ResponseCache
+
+    dashboard.findings_store = store
+    dashboard.response_cache = ResponseCache(store)
+    return dashboard.app
+
+
+def serve(app):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    # lifespan off: the dashboard's startup tasks (scan worker, watcher) are not needed here
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='error', lifespan='off'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, port
+
+
+def hammer(port, accept_encoding, clients, seconds):
+    counts, sizes = [0] * clients, [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def client(index):
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {'Accept-Encoding': 'identity'}
+        while time.perf_counter() < deadline:
+            conn.request('GET', '/api/scan-results', headers=headers)
+            response = conn.getresponse()
+            sizes[index] = len(response.read())
+            counts[index] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds, max(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/scan-results throughput")
+    parser.add_argument('--findings', type=int, default=2000, help="Findings per scan (five scans are served)")
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--clients', type=int, default=4)
+    args = parser.parse_args()
+
+    from dashboard.compression import supported_encodings
+    from dashboard.fast_json import orjson
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = FindingsStore(os.path.join(directory, "findings.db"))
+        populate(store, args.findings)
+        print(f"{args.findings} findings x 5 scans, {args.clients} clients, "
+              f"JSON encoder: {'orjson' if orjson else 'json'}")
+        print(f"{'app':>8}  {'encoding':>9}  {'req/s':>8}  {'KB/response':>12}")
+
+        for label, make_app, encodings in (
+            ('before', before_app, [None]),
+            ('after', after_app, [None] + list(supported_encodings())),
+        ):
+            server, thread, port = serve(make_app(store))
+            try:
+                hammer(port, None, 1, 0.5)  # Warm up (and fill the cache)
+                for encoding in encodings:
+                    rate, size = hammer(port, encoding, args.clients, args.seconds)
+                    print(f"{label:>8}  {encoding or 'identity':>9}  {rate:>8.1f}  {size / 1024:>12.1f}")
+            finally:
+                server.should_exit = True
+                thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/scan_worker_benchmark.py
+"""
+Time to first AWS API call: a new python3 per scan vs the warm ScanWorker.
+
+Both paths are pointed at a local stub endpoint (AWS_ENDPOINT_URL) that
+records when each scan's first request arrives and answers every call with
+AccessDenied, so the scans end quickly without touching AWS.
+
+    python3 benchmarks/scan_worker_benchmark.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+ACCESS_DENIED = (b'<?xml version="1.0" encoding="UTF-8"?>'
+                 b'<Error><Code>AccessDenied</Code><Message>Access Denied</Message></Error>')
+
+
+class StubAWSHandler(BaseHTTPRequestHandler):
+    """Records request arrival times and denies everything"""
+    arrivals = []
+
+    def _deny(self):
+        StubAWSHandler.arrivals.append(time.perf_counter())
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+        self.send_response(403)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(ACCESS_DENIED)))
+        self.end_headers()
+        self.wfile.write(ACCESS_DENIED)
+
+    do_GET = do_POST = do_PUT = do_HEAD = _deny
+
+    def log_message(self, format, *args):
+        pass
+
+
+def first_call_after(start):
+    arrivals = [t for t in StubAWSHandler.arrivals if t >= start]
+    return min(arrivals) - start if arrivals else None
+
+
+def time_subprocess(env):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "scanner/enhanced_scanner.py"],
+        cwd=PROJECT_ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return first_call_after(start), time.perf_counter() - start
+
+
+def time_worker(worker):
+    start = time.perf_counter()
+    worker.run('enhanced', save=False)
+    return first_call_after(start), time.perf_counter() - start
+
+
+def report(label, samples):
+    first_calls = [first for first, _ in samples]
+    totals = [total for _, total in samples]
+    print(f"{label:>12}  first call {statistics.median(first_calls) * 1000:8.1f} ms   "
+          f"whole scan {statistics.median(totals) * 1000:8.1f} ms   (median of {len(samples)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark warm scan workers against python3 per scan")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubAWSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    env = dict(os.environ)
+    env.update({
+        'AWS_ENDPOINT_URL': f"http://127.0.0.1:{server.server_port}",
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'AWS_MAX_ATTEMPTS': '1'
+    })
+    os.environ.update(env)
+
+    try:
+        report("subprocess", [time_subprocess(env) for _ in range(args.runs)])
+
+        from scanner.scan_worker import ScanWorker
+        worker = ScanWorker(max_workers=1).warm()
+        time_worker(worker)  # First scan still builds the per-scan configured clients
+        report("warm worker", [time_worker(worker) for _ in range(args.runs)])
+        worker.shutdown()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,32 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 import json
 import asyncio
-import subprocess
-import os
+import sys
+import threading
 from datetime import datetime
 from pathlib import Path
 
-app = FastAPI(title="ThreatForge Dashboard", version="1.0.0")
+# Make the project root importable when run as `python3 dashboard/app.py`
+sys.path.append(str(Path(__file__).parent.parent))
+from dashboard.compression import CompressionMiddleware
+from dashboard.fast_json import FastJSONResponse
+from dashboard.request_metrics import RequestMetricsMiddleware
+from dashboard.response_cache import ResponseCache
+from dashboard.scan_jobs import ScanJobManager
+from dashboard.scan_watcher import ScanWatcher
+from scanner.scan_worker import ScanWorker
+from utils.findings_store import MAX_PAGE_SIZE, FindingsStore
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry, watch_scan_events
+from utils.security_reporter import SecurityReporter
+
+app = FastAPI(title="ThreatForge Dashboard", version="1.0.0", default_response_class=FastJSONResponse)
+# gzip/brotli for large bodies; cached endpoints arrive already compressed
+app.add_middleware(CompressionMiddleware)
+# Outermost, so request timings include compression
+app.add_middleware(RequestMetricsMiddleware)
 
 # Get the current directory and parent directory
 current_dir = Path(__file__).parent
@@ -19,138 +36,291 @@ parent_dir = current_dir.parent
 app.mount("/static", StaticFiles(directory=current_dir / "static"), name="static")
 templates = Jinja2Templates(directory=current_dir / "templates")
 
+results_dir = parent_dir / "results"
+findings_store = FindingsStore(results_dir / "findings.db")
+# Polled endpoints are rebuilt only when a new scan lands
+response_cache = ResponseCache(findings_store)
+
+class ClientConnection:
+    """A WebSocket client with its own bounded send queue"""
+    
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.sender = None
+        self.acked_version = None  # Last scan version the client confirmed it applied
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections = []
+    def __init__(self, queue_size=32):
+        self.queue_size = queue_size
+        self.active_connections = {}
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self.queue_size)
+        client.sender = asyncio.create_task(self._send_loop(client))
+        self.active_connections[websocket] = client
     
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            self._enqueue(client, message)
     
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        # Only enqueue here; each client's sender task drains its own queue,
+        # so one slow client cannot hold up the others
+        for client in list(self.active_connections.values()):
+            self._enqueue(client, message)
+    
+    async def broadcast_delta(self, base_version: int, message: str, tracker):
+        """Send a scan delta to clients that acknowledged its base version, and catch the rest up"""
+        for client in list(self.active_connections.values()):
+            if client.acked_version == base_version:
+                self._enqueue(client, message)
+            else:
+                self._catch_up(client, tracker)
+    
+    def resume(self, websocket: WebSocket, version, tracker):
+        """Catch a (re)connecting client up from the version it says it last applied"""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        client.acked_version = version
+        self._catch_up(client, tracker)
+    
+    def _catch_up(self, client: ClientConnection, tracker):
+        # Every delta after the client's acknowledged version, in order. Deltas
+        # still in flight may arrive twice; replaying the chain in order still
+        # ends at the current state. Too far behind gets a full resync.
+        messages = tracker.deltas_since(client.acked_version) if client.acked_version is not None else None
+        if messages is None:
+            messages = [tracker.resync_message()]
+        for message in messages:
+            self._enqueue(client, message)
+    
+    def acknowledge(self, websocket: WebSocket, version):
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            client.acked_version = version
+    
+    def _enqueue(self, client: ClientConnection, message: str):
+        try:
+            client.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client is not keeping up; drop it and let it reconnect
+            self.disconnect(client.websocket)
+            asyncio.create_task(self._close(client.websocket))
+    
+    async def _send_loop(self, client: ClientConnection):
+        try:
+            while True:
+                message = await client.queue.get()
+                await client.websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(client.websocket)
+    
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=1013)  # Try again later
+        except Exception:
+            pass
 
 manager = ConnectionManager()
 
+async def publish_scan_delta(base_version, version, message):
+    await manager.broadcast_delta(base_version, message, scan_watcher.tracker)
+
+scan_watcher = ScanWatcher(findings_store, publish_scan_delta)
+
+# Findings and scan durations from scans run in this process
+scan_event_metrics = watch_scan_events()
+
+def _store_bytes():
+    db_path = findings_store.db_path
+    paths = [db_path, db_path.with_name(db_path.name + "-wal"), db_path.with_name(db_path.name + "-shm")]
+    return sum(path.stat().st_size for path in paths if path.exists())
+
+def _store_rows():
+    counters = findings_store.counters()
+    return {("scans",): counters['scans'], ("findings",): sum(v for k, v in counters.items() if k != 'scans')}
+
+metrics_registry.gauge('threatforge_results_store_bytes', "Size of the findings database files", _store_bytes)
+metrics_registry.gauge('threatforge_results_store_rows', "Rows in the findings store", _store_rows, ('table',))
+metrics_registry.gauge('threatforge_websocket_clients', "Connected WebSocket clients",
+                       lambda: len(manager.active_connections))
+metrics_registry.gauge('threatforge_websocket_send_queue_depth', "Messages waiting in WebSocket send queues",
+                       lambda: {("total",): sum(c.queue.qsize() for c in manager.active_connections.values()),
+                                ("max",): max((c.queue.qsize() for c in manager.active_connections.values()), default=0)},
+                       ('aggregate',))
+
+# Markers printed by enhanced_scanner.py as it moves through its checks
+SCAN_STEPS = [
+    "Scanning S3 buckets",
+    "Scanning EC2 security groups",
+    "Checking IAM password policy",
+    "Checking for unencrypted EBS volumes",
+    "Detailed results saved to"
+]
+
+# Scans run in-process on a warm boto3 session instead of a new python3 per scan
+scan_worker = ScanWorker(max_workers=2)
+
+scan_jobs = ScanJobManager(
+    scan_worker,
+    scan_type='enhanced',
+    steps=SCAN_STEPS,
+    max_workers=2,
+    timeout=300  # 5 minute timeout
+)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    # Pick up scan files written before the findings store existed
+    await asyncio.to_thread(findings_store.import_results_dir, results_dir)
+    # Warm the scan worker in the background so boto3 does not hold up startup
+    asyncio.get_running_loop().run_in_executor(None, scan_worker.warm)
+    await scan_jobs.start()
+    await scan_watcher.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await scan_watcher.stop()
+    await scan_jobs.stop()
+    scan_worker.shutdown(wait=False)
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.get("/api/scan-results")
-async def get_scan_results():
-    """Get latest scan results from JSON files"""
-    results_dir = parent_dir / "results"
-    scan_files = list(results_dir.glob("*.json"))
-    scan_files.sort(key=os.path.getmtime, reverse=True)
-    
+async def get_scan_results(request: Request):
+    """Get latest scan results from the findings store"""
+    return await response_cache.respond(request, "scan-results", _build_scan_results)
+
+def _build_scan_results():
     latest_results = []
-    for file_path in scan_files[:5]:  # Last 5 scans
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                data['filename'] = file_path.name
-                data['file_time'] = datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-                latest_results.append(data)
-        except Exception as e:
-            continue
+    for scan in findings_store.recent_scans(limit=5):  # Last 5 scans
+        data = findings_store.load_scan(scan)
+        data['filename'] = scan['filename']
+        data['file_time'] = scan['created_at']
+        latest_results.append(data)
     
     return {"scans": latest_results}
 
 @app.post("/api/run-scan")
 async def run_scan():
-    """Execute security scan and return results"""
-    try:
-        # Run the enhanced scanner from the parent directory
-        scanner_path = parent_dir / "scanner" / "enhanced_scanner.py"
-        result = subprocess.run(
-            ["python3", str(scanner_path)],
-            capture_output=True,
-            text=True,
-            timeout=300,  # 5 minute timeout
-            cwd=str(parent_dir)  # Run from project root
-        )
-        
-        return {
-            "success": result.returncode == 0,
-            "output": result.stdout,
-            "error": result.stderr
-        }
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    """Queue a security scan and return its job ID immediately"""
+    job = scan_jobs.submit()
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/scans/{job.id}"
+    }
+
+@app.get("/api/scans/{job_id}")
+async def get_scan_job(job_id: str):
+    """Report status and progress of a queued scan"""
+    job = scan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job.to_dict()
+
+@app.post("/api/scans/{job_id}/cancel")
+async def cancel_scan_job(job_id: str):
+    """Cancel a queued or running scan"""
+    job = await scan_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job.to_dict()
 
 @app.websocket("/ws/scan-updates")
 async def websocket_endpoint(websocket: WebSocket):
+    # New scans are pushed by scan_watcher as deltas. Clients send
+    # {"type": "hello", "version": N} on connect to resume from the last
+    # version they applied, and {"type": "ack", "version": N} after each update.
     await manager.connect(websocket)
     try:
         while True:
-            # Send periodic updates about system status
-            await asyncio.sleep(10)
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
             
-            # Check for new scan results
-            results_dir = parent_dir / "results"
-            scan_files = list(results_dir.glob("*.json"))
-            if scan_files:
-                latest_file = max(scan_files, key=os.path.getmtime)
-                file_age = datetime.now().timestamp() - latest_file.stat().st_mtime
-                
-                if file_age < 30:  # File created in last 30 seconds
-                    with open(latest_file, 'r') as f:
-                        scan_data = json.load(f)
-                    
-                    await manager.send_personal_message(
-                        json.dumps({
-                            "type": "new_scan",
-                            "data": scan_data
-                        }),
-                        websocket
-                    )
+            if message.get('type') == 'hello':
+                manager.resume(websocket, message.get('version'), scan_watcher.tracker)
+            elif message.get('type') == 'ack':
+                manager.acknowledge(websocket, message.get('version'))
             
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
 @app.get("/api/security-metrics")
-async def get_security_metrics():
-    """Calculate security metrics from scan results"""
-    results_dir = parent_dir / "results"
-    scan_files = list(results_dir.glob("*scan*.json"))
-    
-    total_critical = 0
-    total_high = 0
-    total_medium = 0
-    scan_count = len(scan_files)
+async def get_security_metrics(request: Request):
+    """Calculate security metrics from the findings currently open"""
+    return await response_cache.respond(request, "security-metrics", _build_security_metrics)
+
+def _build_security_metrics():
+    counters = findings_store.counters()
+    # A finding reported by every daily scan still counts once
+    open_counts = findings_store.open_counts()
     
-    for file_path in scan_files:
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                for finding in data.get('findings', []):
-                    if finding['severity'] == 'CRITICAL':
-                        total_critical += 1
-                    elif finding['severity'] == 'HIGH':
-                        total_high += 1
-                    elif finding['severity'] == 'MEDIUM':
-                        total_medium += 1
-        except:
-            continue
+    total_critical = open_counts['CRITICAL']
+    total_high = open_counts['HIGH']
+    total_medium = open_counts['MEDIUM']
     
     return {
-        "total_scans": scan_count,
+        "total_scans": counters['scans'],
         "critical_findings": total_critical,
         "high_findings": total_high,
         "medium_findings": total_medium,
         "overall_risk_score": min(100, (total_critical * 10 + total_high * 7 + total_medium * 4))
     }
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+@app.get("/api/findings")
+async def get_findings(severity: str = None, service: str = None, region: str = None, account: str = None,
+                       resource_prefix: str = None, since: str = None, until: str = None, scan_id: int = None,
+                       fields: str = None, limit: int = 100, cursor: str = None):
+    """Query findings across scans with server-side filters, newest first, one page at a time"""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    
+    try:
+        return await asyncio.to_thread(
+            findings_store.query_findings,
+            severity=severity.upper() if severity else None, service=service, region=region, account=account,
+            resource_prefix=resource_prefix, since=since, until=until, scan_id=scan_id,
+            fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+            limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/trends")
+async def get_trends(period: str = "week", months: int = 12, account: str = None, region: str = None,
+                     service: str = None, severity: str = None):
+    """Open, new and resolved findings over time, from the daily and weekly rollups"""
+    if period not in ("day", "week"):
+        raise HTTPException(status_code=400, detail="period must be 'day' or 'week'")
+    if not 1 <= months <= 24:
+        raise HTTPException(status_code=400, detail="months must be between 1 and 24")
+    
+    buckets = await asyncio.to_thread(findings_store.trend, period, months, account=account, region=region,
+                                      service=service, severity=severity)
+    return {"period": period, "months": months, "buckets": buckets}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Scanner and dashboard metrics in the Prometheus text format"""
+    body = await asyncio.to_thread(metrics_registry.render)
+    return Response(body, media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/api/health")
 async def health_check():
@@ -162,36 +332,33 @@ async def health_check():
     }
 
 @app.get("/api/security-report")
-async def get_security_report():
-    """Generate comprehensive security report"""
+async def get_security_report(request: Request):
+    """Generate comprehensive security report, once per new scan"""
     try:
-        # Import and use the security reporter
-        import sys
-        sys.path.append('..')
-        from utils.security_reporter import SecurityReporter
-        
-        reporter = SecurityReporter()
-        report = reporter.generate_comprehensive_report()
-        
-        return report
+        return await response_cache.respond(request, "security-report", _build_security_report)
     except Exception as e:
         return {"error": f"Failed to generate report: {str(e)}"}
 
+def _build_security_report():
+    reporter = SecurityReporter(results_dir, store=findings_store)
+    return reporter.generate_comprehensive_report()
+
 @app.get("/api/fix-recommendations")
 async def get_fix_recommendations():
     """Get specific fix recommendations for critical issues"""
+    cancel = threading.Event()
     try:
-        import subprocess
-        result = subprocess.run(
-            ["python3", "scanner/enhanced_scanner.py"],
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
+        future = scan_worker.submit('enhanced', cancel=cancel)
+        try:
+            scanner = await asyncio.wait_for(asyncio.wrap_future(future), timeout=scan_jobs.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Stop the scan thread too, so it does not keep holding a worker
+            cancel.set()
+            raise
         
-        # Parse the output for critical issues and generate fixes
+        # Generate fixes for the critical issues found
         critical_issues = []
-        if "CRITICAL: SSH open to world" in result.stdout:
+        if any(finding.rule_id == 'EC2_SSH_OPEN_TO_WORLD' for finding in scanner.findings):
             critical_issues.append({
                 "issue": "Open SSH to world",
                 "fix_command": "aws ec2 revoke-security-group-ingress --group-id SG_ID --protocol tcp --port 22 --cidr 0.0.0.0/0",
@@ -202,5 +369,11 @@ async def get_fix_recommendations():
             "critical_issues": critical_issues,
             "total_critical": len(critical_issues)
         }
+    except asyncio.TimeoutError:
+        return {"error": f"Scan exceeded {scan_jobs.timeout} second timeout"}
     except Exception as e:
         return {"error": str(e)}
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,128 @@
+import asyncio
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+# Bodies smaller than this are sent as they are; compressing them saves too little
+MIN_COMPRESS_SIZE = 1024
+
+# Bodies at least this large are compressed on a worker thread, not on the event loop
+THREAD_COMPRESS_SIZE = 64 * 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in supported_encodings():  # Server preference breaks ties
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compresses complete responses with the client's preferred encoding
+
+    Applies to bodies of at least MIN_COMPRESS_SIZE with a text-like content
+    type that are not already encoded (ResponseCache sends its own
+    pre-compressed bytes). Streamed responses pass through untouched, and
+    bodies of THREAD_COMPRESS_SIZE or more are compressed on a worker thread.
+    """
+
+    def __init__(self, app, minimum_size=MIN_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if start is not None:
+                response_start, start = start, None
+                if message.get("more_body") or not self._compressible(response_start, body):
+                    passthrough = True
+                    await send(response_start)
+                    await send(message)
+                    return
+                if len(body) >= THREAD_COMPRESS_SIZE:
+                    body = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                vary = [value for name, value in response_start["headers"] if name.lower() == b"vary"]
+                response_headers = [
+                    (name, value) for name, value in response_start["headers"]
+                    if name.lower() not in (b"content-length", b"vary")
+                ]
+                response_headers += [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+                ]
+                await send(dict(response_start, headers=response_headers))
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, start, body):
+        if len(body) < self.minimum_size:
+            return False
+        headers = {name.lower(): value for name, value in start["headers"]}
+        if b"content-encoding" in headers:
+            return False
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
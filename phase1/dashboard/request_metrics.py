@@ -0,0 +1,48 @@
+import time
+
+from utils.metrics import registry
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    'threatforge_http_request_duration_seconds', "Dashboard HTTP request latency",
+    ('method', 'route', 'status'),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+
+def route_label(scope):
+    """The route template a request matched (never the raw path, which is unbounded)"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", type(endpoint).__name__)
+    return "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """Times every HTTP request by method, route and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, scope["method"], route_label(scope), str(status)
+            )
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi.responses import Response
+
+from dashboard.compression import MIN_COMPRESS_SIZE, compress, negotiate
+from dashboard.fast_json import dumps
+
+
+class CachedResponse:
+    """A serialized JSON body and the validators clients revalidate it with"""
+
+    def __init__(self, name, version, body, modified_at):
+        self.version = version
+        self.body = body
+        # Weak: the body is rebuilt from the same scan, not byte-for-byte identical
+        self.etag = f'W/"{name}-{version}"'
+        self.last_modified = modified_at.replace(microsecond=0) if modified_at else None
+        self.encoded = {}  # encoding -> compressed body, made on first request
+
+    async def body_for(self, encoding):
+        """The body in the given encoding (None for identity), compressing it once per entry"""
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body, None
+        if encoding not in self.encoded:
+            self.encoded[encoding] = await asyncio.to_thread(compress, self.body, encoding)
+        return self.encoded[encoding], encoding
+
+    def headers(self):
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def not_modified(self, request):
+        """True if the request's If-None-Match or If-Modified-Since already matches"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match wins over If-Modified-Since, and compares weakly
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag.removeprefix("W/") in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified <= since
+        return False
+
+
+class ResponseCache:
+    """Endpoint responses cached per findings store version
+
+    The version is the newest scan in the store, so a scan persisted by any
+    process (dashboard job, scheduler, CLI) invalidates every entry on the
+    next request. Until then each endpoint is built and serialized once,
+    compressed at most once per encoding, and clients holding the current
+    ETag get a 304 with no body.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._entries = {}
+        self._locks = {}
+
+    async def respond(self, request, name, build):
+        """Serve build()'s result for the current version, building it in a thread only on a miss"""
+        version, created_at = await asyncio.to_thread(self.store.version)
+        entry = self._entries.get(name)
+        if entry is None or entry.version != version:
+            # One build per version, however many clients are polling
+            async with self._locks.setdefault(name, asyncio.Lock()):
+                entry = self._entries.get(name)
+                if entry is None or entry.version != version:
+                    data = await asyncio.to_thread(build)
+                    body = await asyncio.to_thread(dumps, data)
+                    modified_at = datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc) if created_at else None
+                    entry = CachedResponse(name, version, body, modified_at)
+                    self._entries[name] = entry
+
+        headers = entry.headers()
+        if entry.not_modified(request):
+            return Response(status_code=304, headers=headers)
+
+        body, encoding = await entry.body_for(negotiate(request.headers.get("accept-encoding")))
+        headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        self._entries.clear()
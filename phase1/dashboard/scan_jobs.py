@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from scanner.scan_worker import ScanCancelled
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED, TIMED_OUT)
+
+
+class ScanJob:
+    """A single scan request and its progress"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.progress = 0
+        self.current_step = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self.total_findings = None
+        self.error = None
+        self.output = deque(maxlen=200)  # Keep only the tail of scanner output
+        self.steps_seen = 0
+        self.cancel_event = threading.Event()  # Stops the scan thread at its next output line or check
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "current_step": self.current_step,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total_findings": self.total_findings,
+            "error": self.error,
+            "output": "\n".join(self.output)
+        }
+
+
+class ScanJobManager:
+    """Runs scans on a warm ScanWorker from a bounded pool of asyncio workers
+
+    Jobs are queued and executed off the request path, so the event loop keeps
+    serving HTTP and WebSocket traffic while scans run. Progress is derived
+    from the step markers the scanner prints as it works.
+    """
+
+    def __init__(self, worker, scan_type='enhanced', steps=(), max_workers=2, timeout=300, max_history=100):
+        self.worker = worker
+        self.scan_type = scan_type
+        self.steps = list(steps)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_history = max_history
+        self.jobs = OrderedDict()
+        self._queue = None
+        self._workers = []
+
+    async def start(self):
+        """Start the worker tasks"""
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self):
+        """Cancel running scans and stop the workers"""
+        for job in self.jobs.values():
+            if job.status in (QUEUED, RUNNING):
+                await self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self):
+        """Queue a new scan and return its job immediately"""
+        job = ScanJob()
+        self.jobs[job.id] = job
+        self._prune_history()
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    async def cancel(self, job_id):
+        """Cancel a queued or running scan. Returns the job, or None if unknown"""
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+
+        job.status = CANCELLED
+        job.finished_at = datetime.utcnow().isoformat()
+        job.cancel_event.set()
+        return job
+
+    def _prune_history(self):
+        """Drop the oldest finished jobs once the history limit is reached"""
+        while len(self.jobs) > self.max_history:
+            for job_id, job in self.jobs.items():
+                if job.status in FINISHED_STATES:
+                    del self.jobs[job_id]
+                    break
+            else:
+                return
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == QUEUED:
+                    await self._run(job)
+            except Exception as e:
+                job.status = FAILED
+                job.error = str(e)
+                job.finished_at = datetime.utcnow().isoformat()
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        job.status = RUNNING
+        job.started_at = datetime.utcnow().isoformat()
+
+        # Output arrives on the scan thread; hand each line to the event loop
+        loop = asyncio.get_running_loop()
+        on_output = lambda line: loop.call_soon_threadsafe(self._handle_line, job, line)
+        future = self.worker.submit(self.scan_type, on_output=on_output, cancel=job.cancel_event)
+
+        try:
+            scanner = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+            job.total_findings = len(scanner.findings)
+        except asyncio.TimeoutError:
+            job.cancel_event.set()
+            job.status = TIMED_OUT
+            job.error = f"Scan exceeded {self.timeout} second timeout"
+        except asyncio.CancelledError:
+            job.cancel_event.set()
+            raise
+        except ScanCancelled:
+            pass  # cancel() has already recorded the job
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+
+        if job.status == RUNNING:
+            job.status = SUCCEEDED
+            job.progress = 100
+        if job.finished_at is None:
+            job.finished_at = datetime.utcnow().isoformat()
+
+    def _handle_line(self, job, line):
+        """Record a line of scanner output and advance progress on each step marker"""
+        job.output.append(line)
+
+        for index, step in enumerate(self.steps[job.steps_seen:], start=job.steps_seen):
+            if step in line:
+                job.steps_seen = index + 1
+                job.current_step = step
+                job.progress = int(job.steps_seen * 100 / (len(self.steps) + 1))
+                break
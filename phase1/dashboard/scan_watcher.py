@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+from collections import deque
+
+from utils.findings_store import finding_key
+
+# Finding fields that change on every scan without the finding itself changing
+VOLATILE_FIELDS = ('timestamp',)
+
+
+class DeltaTracker:
+    """Keeps the current set of open findings and the recent deltas between scans
+
+    The state holds the latest scan of every scan type, keyed by scan type and
+    finding identity. Each new scan becomes a versioned delta (added, changed
+    and resolved findings) against that state. The last few deltas are kept so
+    reconnecting clients can catch up without a full resync.
+    """
+
+    def __init__(self, history=20):
+        self.version = 0
+        self.state = {}
+        self.history = deque(maxlen=history)
+        self._resync_message = None
+
+    def bootstrap(self, store):
+        """Load the latest scan of every type as the starting state"""
+        for scan in store.latest_scans_by_type():
+            self._replace_scan_type(scan['scan_type'], store.load_scan(scan)['findings'])
+            self.version = scan['id']
+        self._resync_message = None
+
+    def apply_scan(self, scan, scan_data):
+        """Fold a newly persisted scan into the state and return its delta message"""
+        base_version = self.version
+        added, changed, resolved = self._replace_scan_type(scan['scan_type'], scan_data.get('findings', []))
+        self.version = scan['id']
+        self._resync_message = None
+
+        message = json.dumps({
+            "type": "delta",
+            "version": self.version,
+            "base_version": base_version,
+            "scan_type": scan['scan_type'],
+            "scan_time": scan['scan_time'],
+            "added": added,
+            "changed": changed,
+            "resolved": resolved
+        })
+        self.history.append((base_version, self.version, message))
+        return base_version, message
+
+    def _replace_scan_type(self, scan_type, findings):
+        previous = {
+            key: finding for (owner, key), finding in self.state.items() if owner == scan_type
+        }
+        added, changed = [], []
+        current = {}
+
+        for finding in findings:
+            key = finding_key(finding)
+            finding = dict(finding, key=key)
+            current[key] = finding
+
+            old = previous.get(key)
+            if old is None:
+                added.append(finding)
+            elif self._fingerprint(old) != self._fingerprint(finding):
+                changed.append(finding)
+
+        resolved = [key for key in previous if key not in current]
+
+        for key in resolved:
+            del self.state[(scan_type, key)]
+        for key, finding in current.items():
+            self.state[(scan_type, key)] = finding
+
+        return added, changed, resolved
+
+    def _fingerprint(self, finding):
+        return {field: value for field, value in finding.items() if field not in VOLATILE_FIELDS}
+
+    def deltas_since(self, version):
+        """Return the delta messages after version, or None if a resync is needed"""
+        if version == self.version:
+            return []
+
+        messages = []
+        expected = version
+        for base_version, delta_version, message in self.history:
+            if delta_version <= version:
+                continue
+            if base_version != expected:
+                return None
+            messages.append(message)
+            expected = delta_version
+
+        return messages if expected == self.version else None
+
+    def resync_message(self):
+        """Full snapshot of the current state, serialized once per version"""
+        if self._resync_message is None:
+            self._resync_message = json.dumps({
+                "type": "resync",
+                "version": self.version,
+                "findings": list(self.state.values())
+            })
+        return self._resync_message
+
+
+class ScanWatcher:
+    """Single process-wide poller that announces new scans
+
+    One task watches the findings store for newly persisted scans, loads each
+    new scan once, turns it into a delta and hands the same message to every
+    connected client. Connected clients no longer poll results/ themselves.
+    """
+
+    def __init__(self, store, publish, interval=2, history=20):
+        self.store = store
+        self.publish = publish
+        self.interval = interval
+        self.tracker = DeltaTracker(history)
+        self._task = None
+
+    async def start(self):
+        await asyncio.to_thread(self.tracker.bootstrap, self.store)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logging.error(f"Error watching for new scans: {e}")
+
+    async def poll(self):
+        """Publish a delta for every scan persisted since the last poll, oldest first"""
+        scans = await asyncio.to_thread(self.store.scans_since, self.tracker.version)
+        for scan in scans:
+            scan_data = await asyncio.to_thread(self.store.load_scan, scan)
+            base_version, message = self.tracker.apply_scan(scan, scan_data)
+            await self.publish(base_version, self.tracker.version, message)
@@ -3,16 +3,29 @@ import boto3
 import json
 from datetime import datetime
 import os
+import sys
 from colorama import Fore, Style, init
 
+# Allow running as `python3 scanner/basic_scanner.py` from the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.findings import Finding
+from utils.events import FINDING, SCAN_FINISHED, SCAN_STARTED, bus
+from utils.findings_store import persist_scan
+from utils.metrics import instrument_session, time_check
+from scanner.scan_worker import check_cancelled
+
 # Initialize colorama for colored output
 init(autoreset=True)
 
 class BasicSecurityScanner:
-    def __init__(self):
+    def __init__(self, session=None, account_id=None, event_bus=None, cancel=None):
         self.findings = []
-        self.session = boto3.Session()
+        self.session = instrument_session(session or boto3.Session())
+        self.account_id = account_id
         self.scan_time = datetime.utcnow().isoformat()
+        self.scan_type = 'basic_scan'
+        self.events = event_bus or bus
+        self.cancel = cancel  # threading.Event checked between checks
         
     def check_ec2_instances(self):
         """Check EC2 instances for basic information"""
@@ -34,15 +47,7 @@ class BasicSecurityScanner:
                     
                     # Check if instance is running
                     if state == 'running':
-                        self.findings.append({
-                            'severity': 'INFO',
-                            'service': 'EC2',
-                            'resource': instance_id,
-                            'title': 'Running EC2 Instance',
-                            'description': f'EC2 instance {instance_id} is running',
-                            'recommendation': 'Monitor for unnecessary running instances to save costs',
-                            'timestamp': self.scan_time
-                        })
+                        self._add_finding(Finding('EC2_RUNNING_INSTANCE', instance_id, (instance_id,), timestamp=self.scan_time, account=self.account_id))
             
             print(f"   Found {instance_count} EC2 instances")
             
@@ -76,19 +81,31 @@ class BasicSecurityScanner:
             print(f"   User ARN: {identity['Arn']}")
             
             # Store account info
-            self.findings.append({
-                'severity': 'INFO',
-                'service': 'IAM',
-                'resource': identity['Account'],
-                'title': 'AWS Account Information',
-                'description': f'Scanning account {identity["Account"]} as {identity["Arn"]}',
-                'recommendation': 'Regular security scanning helps maintain cloud security',
-                'timestamp': self.scan_time
-            })
+            self._add_finding(Finding(
+                'IAM_ACCOUNT_INFO', identity['Account'],
+                (identity['Account'], identity['Arn']), timestamp=self.scan_time, account=self.account_id
+            ))
             
         except Exception as e:
             print(f"{Fore.RED}❌ Error checking IAM: {e}")
     
+    def _add_finding(self, finding):
+        self.findings.append(finding)
+        self.events.publish(FINDING, finding=finding, scan_type=self.scan_type, scan_time=self.scan_time)
+    
+    def run_checks(self):
+        """Run available checks, collecting findings without saving them"""
+        self.events.publish(SCAN_STARTED, scan_type=self.scan_type, scan_time=self.scan_time)
+        try:
+            for check in (self.check_iam_basic, self.check_regions, self.check_ec2_instances):
+                check_cancelled(self.cancel)
+                with time_check(check.__name__, self.session.region_name, self.account_id):
+                    check()
+        finally:
+            self.events.publish(
+                SCAN_FINISHED, scan_type=self.scan_type, scan_time=self.scan_time, total_findings=len(self.findings)
+            )
+    
     def run_scan(self):
         """Run all available security checks"""
         print(f"{Fore.GREEN}🚀 Starting Basic AWS Security Scan...")
@@ -96,10 +113,7 @@ class BasicSecurityScanner:
         print(f"{Fore.YELLOW}📝 Note: Some checks may show limited access - this is normal")
         print("-" * 60)
         
-        # Run available checks
-        self.check_iam_basic()
-        self.check_regions()
-        self.check_ec2_instances()
+        self.run_checks()
         
         # Save results
         self.save_findings()
@@ -108,17 +122,16 @@ class BasicSecurityScanner:
         self.show_summary()
     
     def save_findings(self):
-        """Save findings to JSON file"""
+        """Save findings to a results file and the findings store"""
         try:
-            os.makedirs('results', exist_ok=True)
-            filename = f"results/scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            filename = f"results/scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
             
-            with open(filename, 'w') as f:
-                json.dump({
-                    'scan_time': self.scan_time,
-                    'findings': self.findings,
-                    'total_findings': len(self.findings)
-                }, f, indent=2)
+            persist_scan({
+                'scan_time': self.scan_time,
+                'findings': self.findings,
+                'total_findings': len(self.findings),
+                'scan_type': self.scan_type
+            }, filename)
             
             print(f"{Fore.GREEN}💾 Results saved to: {filename}")
             
@@ -134,7 +147,7 @@ class BasicSecurityScanner:
         # Count findings by severity
         severity_count = {}
         for finding in self.findings:
-            severity = finding['severity']
+            severity = finding.severity
             severity_count[severity] = severity_count.get(severity, 0) + 1
         
         # Print counts with colors
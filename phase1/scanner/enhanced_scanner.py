@@ -1,124 +1,153 @@
 import boto3
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
+import sys
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from colorama import Fore, Style, init
 
+# Allow running as `python3 scanner/enhanced_scanner.py` from the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.findings import Finding
+from utils.events import FINDING, SCAN_FINISHED, SCAN_STARTED, bus
+from utils.findings_store import persist_scan
+from utils.metrics import instrument_session, time_check
+from utils.pagination import iter_pages
+from scanner.rule_engine import ResourceQuery, frozen_credentials, make_evaluator
+from scanner.scan_worker import check_cancelled
+
 # Initialize colorama for colored output
 init(autoreset=True)
 
 class EnhancedSecurityScanner:
-    def __init__(self):
+    # Page sizes requested from AWS
+    S3_PAGE_SIZE = 1000
+    EC2_PAGE_SIZE = 500
+    
+    OPEN_PORT_LABELS = {
+        'EC2_SSH_OPEN_TO_WORLD': 'SSH',
+        'EC2_RDP_OPEN_TO_WORLD': 'RDP',
+        'EC2_ALL_PORTS_OPEN_TO_WORLD': 'ALL PORTS'
+    }
+    
+    # Rules each check reports; a check that fails leaves its rules out of coverage()
+    CHECK_RULES = {
+        'check_s3_public_buckets': ('S3_PUBLIC_BUCKET',),
+        'check_ec2_security_groups': ('EC2_SSH_OPEN_TO_WORLD', 'EC2_RDP_OPEN_TO_WORLD', 'EC2_ALL_PORTS_OPEN_TO_WORLD'),
+        'check_iam_password_policy': ('IAM_WEAK_PASSWORD_POLICY', 'IAM_NO_PASSWORD_POLICY'),
+        'check_unencrypted_volumes': ('EBS_UNENCRYPTED_VOLUME',),
+    }
+
+    def __init__(self, s3_workers=16, s3_timeout=10, session=None, account_id=None, eval_workers=None, evaluator=None,
+                 event_bus=None, cancel=None):
         self.findings = []
-        self.session = boto3.Session()
+        self.session = instrument_session(session or boto3.Session())
+        self.account_id = account_id  # Tagged on every finding when scanning several accounts
         self.scan_time = datetime.utcnow().isoformat()
+        self.scan_type = 'enhanced_security_scan'
+        # Each finding is published as it is found, for live alerting
+        self.events = event_bus or bus
+        # threading.Event checked between checks and S3 pages
+        self.cancel = cancel
+        
+        # Rules are evaluated in-process unless eval_workers asks for a process pool
+        self._owns_evaluator = evaluator is None
+        self.evaluator = evaluator or make_evaluator(eval_workers)
+        
+        # Bucket ACLs are probed concurrently; each call gets its own timeout
+        self.s3_workers = s3_workers
+        self.s3_config = Config(
+            connect_timeout=s3_timeout,
+            read_timeout=s3_timeout,
+            retries={'max_attempts': 3, 'mode': 'standard'},
+            max_pool_connections=s3_workers
+        )
+        self.s3_probe_errors = Counter()
+        self.check_errors = {}  # Checks that failed, so the scan does not cover their rules
         
     def check_s3_public_buckets(self):
         """Check for publicly accessible S3 buckets - CRITICAL SECURITY RISK"""
         print(f"{Fore.CYAN}Scanning S3 buckets for public access...")
         
         try:
-            s3 = self.session.client('s3')
-            buckets = s3.list_buckets()
+            s3 = self.session.client('s3', config=self.s3_config)
             
             public_buckets_found = 0
             
-            for bucket in buckets['Buckets']:
-                bucket_name = bucket['Name']
-                try:
-                    # Check bucket ACL for public access
-                    acl = s3.get_bucket_acl(Bucket=bucket_name)
-                    
-                    for grant in acl['Grants']:
-                        if 'URI' in grant['Grantee'] and 'AllUsers' in grant['Grantee']['URI']:
-                            public_buckets_found += 1
-                            self.findings.append({
-                                'severity': 'CRITICAL',
-                                'service': 'S3',
-                                'resource': bucket_name,
-                                'title': 'Public S3 Bucket',
-                                'description': f'Bucket "{bucket_name}" is publicly accessible to everyone on the internet',
-                                'recommendation': 'Immediately apply bucket policy to restrict public access. Enable S3 Block Public Access.',
-                                'timestamp': self.scan_time,
-                                'risk_score': 10
-                            })
-                            print(f"{Fore.RED}CRITICAL: Public S3 Bucket: {bucket_name}")
-                            
-                except Exception as e:
-                    # Some buckets might not be accessible, skip them
-                    continue
+            for finding in self._public_bucket_findings(s3):
+                public_buckets_found += 1
+                self._add_finding(finding)
             
             if public_buckets_found == 0:
                 print(f"{Fore.GREEN}No public S3 buckets found")
             else:
                 print(f"{Fore.RED}Found {public_buckets_found} public S3 buckets!")
+            
+            failed_probes = sum(self.s3_probe_errors.values())
+            if failed_probes > 0:
+                reasons = ", ".join(f"{code}: {count}" for code, count in self.s3_probe_errors.most_common())
+                print(f"{Fore.YELLOW}Could not check {failed_probes} S3 buckets ({reasons})")
+                # Unchecked buckets may still be public
+                self.check_errors['check_s3_public_buckets'] = f"Could not check {failed_probes} buckets ({reasons})"
                     
         except Exception as e:
+            self.check_errors['check_s3_public_buckets'] = str(e)
             print(f"{Fore.RED}Error scanning S3: {e}")
     
+    def _public_bucket_findings(self, s3):
+        """Yield a finding for every bucket whose ACL grants access to AllUsers"""
+        with ThreadPoolExecutor(max_workers=self.s3_workers) as executor:
+            for page in iter_pages(s3, 'list_buckets', page_size=self.S3_PAGE_SIZE):
+                check_cancelled(self.cancel)
+                bucket_names = [bucket['Name'] for bucket in page.get('Buckets', [])]
+                
+                # map() keeps bucket order, so findings merge deterministically
+                probes = executor.map(lambda name: self._probe_bucket_acl(s3, name), bucket_names)
+                
+                bucket_acls = []
+                for bucket_name, (acl, error) in zip(bucket_names, probes):
+                    if error:
+                        self.s3_probe_errors[error] += 1
+                    else:
+                        bucket_acls.append((bucket_name, acl))
+                
+                # Evaluated a page at a time, so only one page of ACLs is held
+                for finding in self.evaluator.evaluate('bucket_acl', bucket_acls, **self._rule_context()):
+                    print(f"{Fore.RED}CRITICAL: Public S3 Bucket: {finding.resource}")
+                    yield finding
+    
+    def _probe_bucket_acl(self, s3, bucket_name):
+        """Fetch a bucket ACL, returning (acl, error_code) instead of raising"""
+        try:
+            return s3.get_bucket_acl(Bucket=bucket_name), None
+        except ClientError as e:
+            return None, e.response.get('Error', {}).get('Code', 'Unknown')
+        except Exception as e:
+            return None, type(e).__name__
+    
     def check_ec2_security_groups(self):
         """Check security groups for overly permissive rules - HIGH SECURITY RISK"""
         print(f"{Fore.CYAN}Scanning EC2 security groups for open ports...")
         
         try:
             ec2 = self.session.client('ec2')
-            security_groups = ec2.describe_security_groups()
             
-            open_ssh_found = 0
-            open_rdp_found = 0
-            open_all_ports_found = 0
+            found = {
+                'EC2_SSH_OPEN_TO_WORLD': 0,
+                'EC2_RDP_OPEN_TO_WORLD': 0,
+                'EC2_ALL_PORTS_OPEN_TO_WORLD': 0
+            }
             
-            for sg in security_groups['SecurityGroups']:
-                sg_id = sg['GroupId']
-                sg_name = sg['GroupName']
-                
-                for permission in sg.get('IpPermissions', []):
-                    for ip_range in permission.get('IpRanges', []):
-                        if ip_range.get('CidrIp') == '0.0.0.0/0':
-                            # SSH (Port 22) open to world - CRITICAL
-                            if permission.get('FromPort') == 22 and permission.get('ToPort') == 22:
-                                open_ssh_found += 1
-                                self.findings.append({
-                                    'severity': 'CRITICAL',
-                                    'service': 'EC2',
-                                    'resource': sg_id,
-                                    'title': 'SSH Port Open to World',
-                                    'description': f'Security group "{sg_name}" ({sg_id}) allows SSH access from ANY IP address (0.0.0.0/0)',
-                                    'recommendation': 'Immediately restrict SSH to specific IP ranges only. Use VPN or bastion host.',
-                                    'timestamp': self.scan_time,
-                                    'risk_score': 9
-                                })
-                                print(f"{Fore.RED}CRITICAL: SSH open to world: {sg_name} ({sg_id})")
-                            
-                            # RDP (Port 3389) open to world - CRITICAL
-                            if permission.get('FromPort') == 3389 and permission.get('ToPort') == 3389:
-                                open_rdp_found += 1
-                                self.findings.append({
-                                    'severity': 'CRITICAL',
-                                    'service': 'EC2',
-                                    'resource': sg_id,
-                                    'title': 'RDP Port Open to World',
-                                    'description': f'Security group "{sg_name}" ({sg_id}) allows RDP access from ANY IP address (0.0.0.0/0)',
-                                    'recommendation': 'Immediately restrict RDP to specific IP ranges only. Use VPN for remote access.',
-                                    'timestamp': self.scan_time,
-                                    'risk_score': 9
-                                })
-                                print(f"{Fore.RED}CRITICAL: RDP open to world: {sg_name} ({sg_id})")
-                            
-                            # All ports open to world - CRITICAL
-                            if permission.get('FromPort') == 0 and permission.get('ToPort') == 65535:
-                                open_all_ports_found += 1
-                                self.findings.append({
-                                    'severity': 'CRITICAL',
-                                    'service': 'EC2',
-                                    'resource': sg_id,
-                                    'title': 'ALL PORTS Open to World',
-                                    'description': f'Security group "{sg_name}" ({sg_id}) allows ALL ports from ANY IP address (0.0.0.0/0)',
-                                    'recommendation': 'IMMEDIATE ACTION REQUIRED: Remove this rule. Use specific port ranges only.',
-                                    'timestamp': self.scan_time,
-                                    'risk_score': 10
-                                })
-                                print(f"{Fore.RED}CRITICAL: ALL PORTS open to world: {sg_name} ({sg_id})")
+            for finding in self._security_group_findings(ec2):
+                found[finding.rule_id] += 1
+                self._add_finding(finding)
+            
+            open_ssh_found = found['EC2_SSH_OPEN_TO_WORLD']
+            open_rdp_found = found['EC2_RDP_OPEN_TO_WORLD']
+            open_all_ports_found = found['EC2_ALL_PORTS_OPEN_TO_WORLD']
             
             # Summary
             if open_ssh_found == 0 and open_rdp_found == 0 and open_all_ports_found == 0:
@@ -133,8 +162,23 @@ class EnhancedSecurityScanner:
                     print(f"{Fore.RED}   ALL PORTS open to world: {open_all_ports_found}")
                     
         except Exception as e:
+            self.check_errors['check_ec2_security_groups'] = str(e)
             print(f"{Fore.RED}Error scanning security groups: {e}")
     
+    def _security_group_findings(self, ec2):
+        """Yield findings for security group rules open to 0.0.0.0/0"""
+        groups = self.evaluator.resources(ResourceQuery(
+            ec2, frozen_credentials(self.session),
+            'describe_security_groups', 'SecurityGroups',
+            page_size=self.EC2_PAGE_SIZE
+        ))
+        
+        # SSH (22), RDP (3389) and all ports open to the world are all CRITICAL
+        for finding in self.evaluator.evaluate('security_group', groups, **self._rule_context()):
+            sg_name, sg_id = finding.params
+            print(f"{Fore.RED}CRITICAL: {self.OPEN_PORT_LABELS[finding.rule_id]} open to world: {sg_name} ({sg_id})")
+            yield finding
+    
     def check_iam_password_policy(self):
         """Check IAM password policy - MEDIUM SECURITY RISK"""
         print(f"{Fore.CYAN}Checking IAM password policy...")
@@ -161,34 +205,20 @@ class EnhancedSecurityScanner:
                         weak_policies.append(check_name)
                 
                 if weak_policies:
-                    self.findings.append({
-                        'severity': 'MEDIUM',
-                        'service': 'IAM',
-                        'resource': 'AccountPasswordPolicy',
-                        'title': 'Weak IAM Password Policy',
-                        'description': f'Password policy has weak settings: {", ".join(weak_policies)}',
-                        'recommendation': 'Strengthen IAM password policy to meet security best practices',
-                        'timestamp': self.scan_time,
-                        'risk_score': 5
-                    })
+                    self._add_finding(Finding(
+                        'IAM_WEAK_PASSWORD_POLICY', 'AccountPasswordPolicy',
+                        (", ".join(weak_policies),), timestamp=self.scan_time, account=self.account_id
+                    ))
                     print(f"{Fore.YELLOW}Weak IAM password policy: {', '.join(weak_policies)}")
                 else:
                     print(f"{Fore.GREEN}IAM password policy is strong")
                     
             except iam.exceptions.NoSuchEntityException:
-                self.findings.append({
-                    'severity': 'HIGH',
-                    'service': 'IAM',
-                    'resource': 'AccountPasswordPolicy',
-                    'title': 'No IAM Password Policy',
-                    'description': 'No IAM password policy configured for the account',
-                    'recommendation': 'Create an IAM password policy with strong requirements',
-                    'timestamp': self.scan_time,
-                    'risk_score': 7
-                })
+                self._add_finding(Finding('IAM_NO_PASSWORD_POLICY', 'AccountPasswordPolicy', timestamp=self.scan_time, account=self.account_id))
                 print(f"{Fore.RED}No IAM password policy configured!")
                 
         except Exception as e:
+            self.check_errors['check_iam_password_policy'] = str(e)
             print(f"{Fore.RED}Error checking IAM password policy: {e}")
     
     def check_unencrypted_volumes(self):
@@ -197,33 +227,76 @@ class EnhancedSecurityScanner:
         
         try:
             ec2 = self.session.client('ec2')
-            volumes = ec2.describe_volumes()
             
-            unencrypted_volumes = []
+            unencrypted_count = 0
             
-            for volume in volumes['Volumes']:
-                if not volume.get('Encrypted', False):
-                    unencrypted_volumes.append(volume['VolumeId'])
-                    self.findings.append({
-                        'severity': 'MEDIUM',
-                        'service': 'EC2',
-                        'resource': volume['VolumeId'],
-                        'title': 'Unencrypted EBS Volume',
-                        'description': f'EBS volume {volume["VolumeId"]} is not encrypted',
-                        'recommendation': 'Enable encryption for EBS volumes to protect data at rest',
-                        'timestamp': self.scan_time,
-                        'risk_score': 6
-                    })
-                    print(f"{Fore.YELLOW}Unencrypted EBS volume: {volume['VolumeId']}")
+            for finding in self._unencrypted_volume_findings(ec2):
+                unencrypted_count += 1
+                self._add_finding(finding)
             
-            if not unencrypted_volumes:
+            if unencrypted_count == 0:
                 print(f"{Fore.GREEN}All EBS volumes are encrypted")
             else:
-                print(f"{Fore.YELLOW}Found {len(unencrypted_volumes)} unencrypted EBS volumes")
+                print(f"{Fore.YELLOW}Found {unencrypted_count} unencrypted EBS volumes")
                 
         except Exception as e:
+            self.check_errors['check_unencrypted_volumes'] = str(e)
             print(f"{Fore.RED}Error checking EBS volumes: {e}")
     
+    def _unencrypted_volume_findings(self, ec2):
+        """Yield a finding for every EBS volume without encryption"""
+        # Only unencrypted volumes are fetched, the API filters the rest out
+        volumes = self.evaluator.resources(ResourceQuery(
+            ec2, frozen_credentials(self.session),
+            'describe_volumes', 'Volumes',
+            page_size=self.EC2_PAGE_SIZE,
+            Filters=[{'Name': 'encrypted', 'Values': ['false']}]
+        ))
+        
+        for finding in self.evaluator.evaluate('volume', volumes, **self._rule_context()):
+            print(f"{Fore.YELLOW}Unencrypted EBS volume: {finding.resource}")
+            yield finding
+    
+    def coverage(self):
+        """Rules of the checks that completed, and the account when this scan was told one"""
+        coverage = {'rules': [
+            rule_id for check, rule_ids in self.CHECK_RULES.items()
+            if check not in self.check_errors for rule_id in rule_ids
+        ]}
+        if self.account_id:
+            coverage['accounts'] = [self.account_id]
+        return coverage
+    
+    def _rule_context(self):
+        return {'account': self.account_id, 'timestamp': self.scan_time}
+    
+    def _add_finding(self, finding):
+        self.findings.append(finding)
+        self.events.publish(FINDING, finding=finding, scan_type=self.scan_type, scan_time=self.scan_time)
+    
+    def run_checks(self, lifecycle_events=True):
+        """Run all security checks, collecting findings without saving them
+        
+        With lifecycle_events=False no scan started/finished events are
+        published, for account scans that are part of an organization scan.
+        """
+        if lifecycle_events:
+            self.events.publish(SCAN_STARTED, scan_type=self.scan_type, scan_time=self.scan_time)
+        try:
+            for check in (self.check_s3_public_buckets, self.check_ec2_security_groups,
+                          self.check_iam_password_policy, self.check_unencrypted_volumes):
+                check_cancelled(self.cancel)
+                with time_check(check.__name__, self.session.region_name, self.account_id):
+                    check()
+                print()
+        finally:
+            if self._owns_evaluator:
+                self.evaluator.close()
+            if lifecycle_events:
+                self.events.publish(
+                    SCAN_FINISHED, scan_type=self.scan_type, scan_time=self.scan_time, total_findings=len(self.findings)
+                )
+    
     def run_scan(self):
         """Run enhanced security scan"""
         print(f"{Fore.GREEN}Starting ENHANCED AWS Security Scan...")
@@ -231,18 +304,7 @@ class EnhancedSecurityScanner:
         print(f"{Fore.CYAN}Scanning for CRITICAL security misconfigurations...")
         print("-" * 70)
         
-        # Run all security checks
-        self.check_s3_public_buckets()
-        print()
-        
-        self.check_ec2_security_groups() 
-        print()
-        
-        self.check_iam_password_policy()
-        print()
-        
-        self.check_unencrypted_volumes()
-        print()
+        self.run_checks()
         
         # Save results
         self.save_findings()
@@ -251,18 +313,19 @@ class EnhancedSecurityScanner:
         self.show_summary()
     
     def save_findings(self):
-        """Save findings to JSON file"""
+        """Save findings to a results file and the findings store"""
         try:
-            os.makedirs('results', exist_ok=True)
-            filename = f"results/enhanced_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            filename = f"results/enhanced_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
             
-            with open(filename, 'w') as f:
-                json.dump({
-                    'scan_time': self.scan_time,
-                    'findings': self.findings,
-                    'total_findings': len(self.findings),
-                    'scan_type': 'enhanced_security_scan'
-                }, f, indent=2)
+            persist_scan({
+                'scan_time': self.scan_time,
+                'findings': self.findings,
+                'total_findings': len(self.findings),
+                's3_probe_errors': sum(self.s3_probe_errors.values()),
+                'check_errors': self.check_errors,
+                'coverage': self.coverage(),
+                'scan_type': self.scan_type
+            }, filename)
             
             print(f"{Fore.GREEN}Detailed results saved to: {filename}")
             
@@ -287,8 +350,8 @@ class EnhancedSecurityScanner:
         total_risk_score = 0
         
         for finding in self.findings:
-            severity_count[finding['severity']] += 1
-            total_risk_score += finding.get('risk_score', 0)
+            severity_count[finding.severity] += 1
+            total_risk_score += finding.risk_score or 0
         
         # Print counts with colors
         print(f"{Fore.RED}CRITICAL: {severity_count['CRITICAL']}")
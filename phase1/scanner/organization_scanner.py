@@ -0,0 +1,241 @@
+import boto3
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from botocore.credentials import RefreshableCredentials
+from botocore.session import get_session
+
+# Allow running as `python3 scanner/organization_scanner.py` from the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scanner.enhanced_scanner import EnhancedSecurityScanner
+from scanner.production_scanner import ProductionSecurityScanner
+from scanner.rule_engine import make_evaluator
+from utils.events import SCAN_FINISHED, SCAN_STARTED, bus
+from utils.findings_store import persist_scan
+from utils.metrics import instrument_session
+
+
+def account_id_from_arn(role_arn):
+    """Account ID of a role ARN (arn:aws:iam::123456789012:role/Name)"""
+    return role_arn.split(':')[4]
+
+
+class AssumeRoleSessionFactory:
+    """Builds one boto3 session per role ARN from cached, auto-refreshing AssumeRole credentials"""
+
+    def __init__(self, base_session=None, session_name="threatforge-scan", duration_seconds=3600,
+                 external_id=None, sts_endpoint_url=None, region_name=None):
+        self.base_session = instrument_session(base_session or boto3.Session())
+        self.session_name = session_name
+        self.duration_seconds = duration_seconds
+        self.external_id = external_id
+        self.sts_endpoint_url = sts_endpoint_url
+        self.region_name = region_name or self.base_session.region_name
+        self._sts = None
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _sts_client(self):
+        with self._lock:
+            if self._sts is None:
+                self._sts = self.base_session.client('sts', endpoint_url=self.sts_endpoint_url)
+            return self._sts
+
+    def _fetch_credentials(self, role_arn):
+        params = {
+            'RoleArn': role_arn,
+            'RoleSessionName': self.session_name,
+            'DurationSeconds': self.duration_seconds
+        }
+        if self.external_id:
+            params['ExternalId'] = self.external_id
+
+        credentials = self._sts_client().assume_role(**params)['Credentials']
+        return {
+            'access_key': credentials['AccessKeyId'],
+            'secret_key': credentials['SecretAccessKey'],
+            'token': credentials['SessionToken'],
+            'expiry_time': credentials['Expiration'].isoformat()
+        }
+
+    def session_for(self, role_arn):
+        """Return the cached session for a role, assuming it on first use"""
+        with self._lock:
+            session = self._sessions.get(role_arn)
+        if session is not None:
+            return session
+
+        # botocore refreshes these shortly before they expire
+        credentials = RefreshableCredentials.create_from_metadata(
+            metadata=self._fetch_credentials(role_arn),
+            refresh_using=lambda: self._fetch_credentials(role_arn),
+            method='sts-assume-role'
+        )
+        botocore_session = get_session()
+        botocore_session._credentials = credentials
+        session = boto3.Session(botocore_session=botocore_session, region_name=self.region_name)
+
+        with self._lock:
+            return self._sessions.setdefault(role_arn, session)
+
+
+class OrganizationScanner:
+    """Scans many AWS accounts in parallel by assuming a role in each one
+
+    Accounts run on a thread pool of max_accounts workers. The global
+    max_concurrency budget is split evenly between them, so the number of
+    in-flight AWS calls stays bounded however many accounts are listed.
+    """
+
+    MODES = ('enhanced', 'production')
+
+    def __init__(self, role_arns, mode='enhanced', max_accounts=8, max_concurrency=64,
+                 session_factory=None, scanner_factory=None, eval_workers=None, event_bus=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown scan mode: {mode}")
+        self.role_arns = list(role_arns)
+        self.mode = mode
+        self.max_accounts = max_accounts
+        self.max_concurrency = max_concurrency
+        self.session_factory = session_factory or AssumeRoleSessionFactory()
+        self.scanner_factory = scanner_factory or self._build_scanner
+        self.eval_workers = eval_workers
+        self.evaluator = None  # One rule evaluator shared by every account during run_checks()
+        self.scan_time = datetime.utcnow().isoformat()
+        self.scan_type = f'organization_{mode}'
+        # Account scanners publish their findings here as they find them
+        self.events = event_bus or bus
+        self.findings = []
+        self.account_totals = {}
+        self.account_errors = {}
+        self.partial_accounts = {}  # Account -> regions or checks it could not be fully checked in
+
+    def _build_scanner(self, session, account_id):
+        per_account = max(1, self.max_concurrency // self.max_accounts)
+        if self.mode == 'production':
+            scanner = ProductionSecurityScanner(
+                max_concurrency=per_account,
+                max_per_region=min(4, per_account),
+                session=session,
+                account_id=account_id,
+                evaluator=self.evaluator,
+                event_bus=self.events
+            )
+        else:
+            scanner = EnhancedSecurityScanner(
+                s3_workers=per_account,
+                session=session,
+                account_id=account_id,
+                evaluator=self.evaluator,
+                event_bus=self.events
+            )
+        # Findings published live carry the organization scan's identity
+        scanner.scan_type = self.scan_type
+        scanner.scan_time = self.scan_time
+        return scanner
+
+    def scan_account(self, role_arn):
+        """Scan one account and return its findings"""
+        account_id = account_id_from_arn(role_arn)
+        session = self.session_factory.session_for(role_arn)
+        scanner = self.scanner_factory(session, account_id)
+        # Only the organization scan itself publishes scan started/finished
+        scanner.run_checks(lifecycle_events=False)
+        failed = getattr(scanner, 'region_errors', None) or getattr(scanner, 'check_errors', None)
+        if failed:
+            self.partial_accounts[account_id] = sorted(failed)
+        return scanner.findings
+
+    def run_checks(self):
+        """Scan every account, merging findings in the order the roles were given"""
+        self.evaluator = make_evaluator(self.eval_workers)
+        self.events.publish(SCAN_STARTED, scan_type=self.scan_type, scan_time=self.scan_time)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_accounts, thread_name_prefix='tf-account') as executor:
+                futures = [executor.submit(self.scan_account, role_arn) for role_arn in self.role_arns]
+
+                for role_arn, future in zip(self.role_arns, futures):
+                    account_id = account_id_from_arn(role_arn)
+                    try:
+                        findings = future.result()
+                    except Exception as e:
+                        self.account_errors[account_id] = str(e)
+                        print(f"Error scanning account {account_id}: {e}")
+                        continue
+                    self.account_totals[account_id] = len(findings)
+                    self.findings.extend(findings)
+        finally:
+            self.evaluator.close()
+            self.events.publish(
+                SCAN_FINISHED, scan_type=self.scan_type, scan_time=self.scan_time, total_findings=len(self.findings)
+            )
+
+    def coverage(self):
+        """Accounts scanned without errors; findings elsewhere are not resolved by this scan"""
+        return {'accounts': [account_id for account_id in self.account_totals if account_id not in self.partial_accounts]}
+
+    def run_scan(self):
+        """Scan all accounts and save the combined results"""
+        print(f"Starting organization scan of {len(self.role_arns)} accounts...")
+
+        self.run_checks()
+
+        self.save_results()
+
+        print(f"Scan complete. Found {len(self.findings)} security issues "
+              f"across {len(self.account_totals)} accounts ({len(self.account_errors)} failed).")
+
+    def save_results(self):
+        """Save combined scan results"""
+        filename = f"results/organization_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
+
+        persist_scan({
+            'scan_time': self.scan_time,
+            'findings': self.findings,
+            'total_findings': len(self.findings),
+            'accounts': self.account_totals,
+            'account_errors': self.account_errors,
+            'partial_accounts': self.partial_accounts,
+            'coverage': self.coverage(),
+            'scan_type': self.scan_type
+        }, filename)
+
+        print(f"Results saved to: {filename}")
+
+
+def load_role_arns(path):
+    """Read role ARNs from a file, one per line; blank lines and # comments are skipped"""
+    with open(path, 'r') as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith('#')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan many AWS accounts through AssumeRole")
+    parser.add_argument('role_arns', nargs='*', help="Role ARNs to assume")
+    parser.add_argument('--roles-file', help="File with one role ARN per line")
+    parser.add_argument('--mode', choices=OrganizationScanner.MODES, default='enhanced')
+    parser.add_argument('--max-accounts', type=int, default=8)
+    parser.add_argument('--max-concurrency', type=int, default=64)
+    parser.add_argument('--external-id')
+    parser.add_argument('--eval-workers', type=int, help="Processes for rule evaluation (0 evaluates in-process)")
+    args = parser.parse_args()
+
+    role_arns = list(args.role_arns)
+    if args.roles_file:
+        role_arns.extend(load_role_arns(args.roles_file))
+    if not role_arns:
+        parser.error("no role ARNs given")
+
+    scanner = OrganizationScanner(
+        role_arns,
+        mode=args.mode,
+        max_accounts=args.max_accounts,
+        max_concurrency=args.max_concurrency,
+        eval_workers=args.eval_workers,
+        session_factory=AssumeRoleSessionFactory(external_id=args.external_id)
+    )
+    scanner.run_scan()
@@ -1,97 +1,226 @@
 import boto3
+import argparse
 import json
 import asyncio
+import functools
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from botocore.config import Config
 
+# Allow running as `python3 scanner/production_scanner.py` from the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.events import FINDING, SCAN_FINISHED, SCAN_STARTED, bus
+from utils.findings_store import persist_scan
+from utils.metrics import instrument_session, time_check
+from scanner.rule_engine import ResourceQuery, frozen_credentials, make_evaluator
+from scanner.scan_worker import check_cancelled
+
 class ProductionSecurityScanner:
-    def __init__(self):
+    EC2_PAGE_SIZE = 500
+    RDS_PAGE_SIZE = 100
+
+    # Only SSH is flagged by the multi-region scan
+    SECURITY_GROUP_RULES = ('EC2_SSH_OPEN_TO_WORLD',)
+
+    def __init__(self, max_concurrency=32, max_per_region=4, session=None, account_id=None,
+                 eval_workers=None, evaluator=None, regions=None, event_bus=None, cancel=None):
         self.findings = []
+        self.session = instrument_session(session or boto3.Session())
+        self.account_id = account_id
+        self.scan_time = datetime.utcnow().isoformat()
+        self.scan_type = 'production_multi_region'
+        # Findings are published per check as each region reports, for live alerting
+        self.events = event_bus or bus
+        self.regions = regions  # Scan only these regions; None scans every enabled region
+        self.regions_scanned = []
+        self.region_errors = {}  # Regions where a check failed, so the scan does not cover them
+        self.cancel = cancel  # threading.Event checked before each blocking call
+        # Each region's resources are evaluated as one batch; with eval_workers
+        # a process pool collects and evaluates the regions instead
+        self._owns_evaluator = evaluator is None
+        self.evaluator = evaluator or make_evaluator(eval_workers)
+        # Sessions are not thread-safe; client creation is serialized on this lock
+        self._session_lock = threading.Lock()
         self.config = Config(
             retries={'max_attempts': 10, 'mode': 'adaptive'},
             max_pool_connections=50
         )
+        # boto3 calls block, so they run on a thread pool. The global cap
+        # bounds in-flight calls across all regions, the per-region cap keeps
+        # one region from taking every worker.
+        self.max_concurrency = max_concurrency
+        self.max_per_region = max_per_region
+        self._executor = None
+        self._global_limit = None
         
     async def scan_all_regions(self):
         """Scan all enabled regions concurrently"""
-        ec2 = boto3.client('ec2', config=self.config)
-        regions = [region['RegionName'] for region in ec2.describe_regions()['Regions']]
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='tf-scan')
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
         
-        tasks = [self.scan_region(region) for region in regions]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            regions = await self._run_blocking(self._list_regions)
+            self.regions_scanned = regions
+            
+            tasks = [self.scan_region(region) for region in regions]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # A cancelled region returns ScanCancelled rather than raising it
+            check_cancelled(self.cancel)
+            
+            # Each region returns its own findings; merge them in region order
+            for region, region_findings in zip(regions, results):
+                if isinstance(region_findings, Exception):
+                    self.region_errors[region] = str(region_findings)
+                    print(f"Error scanning region {region}: {region_findings}")
+                else:
+                    self.findings.extend(region_findings)
+        finally:
+            self._executor.shutdown(wait=True)
+    
+    async def _run_blocking(self, func, *args, region_limit=None):
+        """Run a blocking boto3 call on the executor under the region and global caps
+
+        The region slot is taken first, so a call waiting on its region's cap
+        does not hold a global slot that another region could use.
+        """
+        check_cancelled(self.cancel)
+        loop = asyncio.get_running_loop()
+        if region_limit is None:
+            async with self._global_limit:
+                return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+        async with region_limit:
+            async with self._global_limit:
+                return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+    
+    def _list_regions(self):
+        if self.regions:
+            return list(self.regions)
+        with self._session_lock:
+            ec2 = self.session.client('ec2', config=self.config)
+        return [region['RegionName'] for region in ec2.describe_regions()['Regions']]
     
     async def scan_region(self, region):
         """Scan a specific AWS region"""
         print(f"Scanning region: {region}")
         
+        region_limit = asyncio.Semaphore(self.max_per_region)
+        findings = []
+        
         try:
-            session = boto3.Session(region_name=region)
+            # Each region builds its clients in a single worker call and
+            # then shares them between its checks
+            clients = await self._run_blocking(self._create_clients, region, region_limit=region_limit)
             
-            await asyncio.gather(
-                self.check_regional_ec2(session),
-                self.check_regional_rds(session),
+            results = await asyncio.gather(
+                self.check_regional_ec2(clients['ec2'], region, region_limit),
+                self.check_regional_rds(clients['rds'], region, region_limit),
                 return_exceptions=True
             )
+            check_cancelled(self.cancel)
+            
+            for result in results:
+                if isinstance(result, Exception):
+                    self.region_errors[region] = str(result)
+                    print(f"Error scanning region {region}: {result}")
+                else:
+                    findings.extend(result)
             
         except Exception as e:
+            self.region_errors[region] = str(e)
             print(f"Error scanning region {region}: {e}")
+        
+        return findings
     
-    async def check_regional_ec2(self, session):
+    def _create_clients(self, region):
+        with self._session_lock:
+            return {
+                'ec2': self.session.client('ec2', region_name=region, config=self.config),
+                'rds': self.session.client('rds', region_name=region, config=self.config)
+            }
+    
+    async def check_regional_ec2(self, ec2, region, region_limit):
         """Check EC2 security for region"""
-        ec2 = session.client('ec2', config=self.config)
-        
         try:
-            sgs = ec2.describe_security_groups()
-            for sg in sgs['SecurityGroups']:
-                self._check_security_group_rules(sg, session.region_name)
-                
+            with time_check('check_regional_ec2', region, self.account_id):
+                findings = await self._run_blocking(self._collect_ec2_findings, ec2, region, region_limit=region_limit)
         except Exception as e:
-            print(f"Error checking EC2 in {session.region_name}: {e}")
+            self.region_errors[region] = f"EC2: {e}"
+            print(f"Error checking EC2 in {region}: {e}")
+            return []
+        return self._publish(findings)
+    
+    def _collect_ec2_findings(self, ec2, region):
+        groups = self.evaluator.resources(ResourceQuery(
+            ec2, self._credentials(), 'describe_security_groups', 'SecurityGroups', page_size=self.EC2_PAGE_SIZE
+        ))
+        # Collected here, on the executor thread, since the in-process evaluator pages lazily
+        return list(self.evaluator.evaluate(
+            'security_group', groups,
+            rule_ids=self.SECURITY_GROUP_RULES, **self._rule_context(region)
+        ))
     
-    async def check_regional_rds(self, session):
+    async def check_regional_rds(self, rds, region, region_limit):
         """Check RDS security for region"""
-        rds = session.client('rds', config=self.config)
-        
         try:
-            instances = rds.describe_db_instances()
-            for instance in instances['DBInstances']:
-                if instance['PubliclyAccessible']:
-                    self.findings.append({
-                        'severity': 'CRITICAL',
-                        'service': 'RDS',
-                        'resource': instance['DBInstanceIdentifier'],
-                        'title': 'Public RDS Instance',
-                        'description': f'RDS instance {instance["DBInstanceIdentifier"]} is publicly accessible',
-                        'recommendation': 'Modify RDS instance to be private',
-                        'region': session.region_name,
-                        'timestamp': datetime.utcnow().isoformat()
-                    })
-                    
+            with time_check('check_regional_rds', region, self.account_id):
+                findings = await self._run_blocking(self._collect_rds_findings, rds, region, region_limit=region_limit)
         except Exception as e:
-            print(f"Error checking RDS in {session.region_name}: {e}")
+            self.region_errors[region] = f"RDS: {e}"
+            print(f"Error checking RDS in {region}: {e}")
+            return []
+        return self._publish(findings)
+    
+    def _publish(self, findings):
+        for finding in findings:
+            self.events.publish(FINDING, finding=finding, scan_type=self.scan_type, scan_time=self.scan_time)
+        return findings
+    
+    def _collect_rds_findings(self, rds, region):
+        instances = self.evaluator.resources(ResourceQuery(
+            rds, self._credentials(), 'describe_db_instances', 'DBInstances', page_size=self.RDS_PAGE_SIZE
+        ))
+        return list(self.evaluator.evaluate('db_instance', instances, **self._rule_context(region)))
     
-    def _check_security_group_rules(self, sg, region):
-        """Check individual security group rules"""
-        for permission in sg.get('IpPermissions', []):
-            for ip_range in permission.get('IpRanges', []):
-                if ip_range.get('CidrIp') == '0.0.0.0/0':
-                    if permission.get('FromPort') == 22 and permission.get('ToPort') == 22:
-                        self.findings.append({
-                            'severity': 'CRITICAL',
-                            'service': 'EC2',
-                            'resource': sg['GroupId'],
-                            'title': 'SSH Open to World',
-                            'description': f'Security group {sg["GroupName"]} allows SSH from anywhere',
-                            'recommendation': 'Restrict SSH to specific IP ranges',
-                            'region': region,
-                            'timestamp': datetime.utcnow().isoformat()
-                        })
+    def _credentials(self):
+        with self._session_lock:
+            return frozen_credentials(self.session)
+    
+    def _rule_context(self, region):
+        return {'region': region, 'account': self.account_id, 'timestamp': datetime.utcnow().isoformat()}
+    
+    def coverage(self):
+        """Regions (and account) every check completed in; only findings there can be resolved by this scan"""
+        coverage = {'regions': [region for region in self.regions_scanned if region not in self.region_errors]}
+        if self.account_id:
+            coverage['accounts'] = [self.account_id]
+        return coverage
+    
+    def run_checks(self, lifecycle_events=True):
+        """Scan every region, collecting findings without saving them
+        
+        With lifecycle_events=False no scan started/finished events are
+        published, for account scans that are part of an organization scan.
+        """
+        if lifecycle_events:
+            self.events.publish(SCAN_STARTED, scan_type=self.scan_type, scan_time=self.scan_time)
+        try:
+            asyncio.run(self.scan_all_regions())
+        finally:
+            if self._owns_evaluator:
+                self.evaluator.close()
+            if lifecycle_events:
+                self.events.publish(
+                    SCAN_FINISHED, scan_type=self.scan_type, scan_time=self.scan_time, total_findings=len(self.findings)
+                )
     
     def run_scan(self):
         """Main scan execution method"""
         print("Starting production security scan...")
         
-        asyncio.run(self.scan_all_regions())
+        self.run_checks()
         
         self.save_results()
         
@@ -99,17 +228,23 @@ class ProductionSecurityScanner:
     
     def save_results(self):
         """Save scan results"""
-        filename = f"results/production_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        filename = f"results/production_scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz"
         
-        with open(filename, 'w') as f:
-            json.dump({
-                'scan_time': datetime.utcnow().isoformat(),
-                'findings': self.findings,
-                'scan_type': 'production_multi_region'
-            }, f, indent=2)
+        persist_scan({
+            'scan_time': self.scan_time,
+            'findings': self.findings,
+            'total_findings': len(self.findings),
+            'coverage': self.coverage(),
+            'region_errors': self.region_errors,
+            'scan_type': self.scan_type
+        }, filename)
         
         print(f"Results saved to: {filename}")
 
 if __name__ == "__main__":
-    scanner = ProductionSecurityScanner()
+    parser = argparse.ArgumentParser(description="Multi-region AWS security scan")
+    parser.add_argument('--region', action='append', dest='regions', help="Region to scan (repeatable, default: all)")
+    args = parser.parse_args()
+
+    scanner = ProductionSecurityScanner(regions=args.regions)
     scanner.run_scan()
@@ -0,0 +1,292 @@
+# scanner/rule_engine.py
+"""
+Rule evaluation over collected AWS resources.
+
+Scanners collect raw API resources (security groups, volumes, bucket ACLs,
+DB instances) and hand them to an evaluator in batches. A batch is one
+resource kind from one region. The evaluators turn each batch into Finding
+objects.
+
+RuleEvaluator runs in the calling process and streams each batch: a
+ResourceQuery is paged through while it is evaluated, so only one page of
+resources is held at a time, and evaluate() yields each finding as soon as
+its resource has been evaluated. ShardedRuleEvaluator splits the
+batches into shards and evaluates them on a process pool, either one shard
+per batch (shard_by='region') or by a stable hash of the resource ID
+(shard_by='hash'). Each finding keeps the position of the resource it came
+from, so the merged output is identical to a serial run whatever the worker
+count.
+
+Pickling raw API responses into a worker costs more than the rule loops
+themselves, so a batch can also be a ResourceQuery. The worker then makes
+the describe calls, parses the responses and evaluates them locally, and
+only the findings cross the process boundary. Query batches are always
+evaluated whole, one shard per region.
+"""
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.findings import Finding
+from utils.pagination import iter_resources
+
+# Worker processes used when a scanner is not given an explicit count; 0 evaluates in-process
+DEFAULT_EVAL_WORKERS = int(os.getenv('THREATFORGE_EVAL_WORKERS', '0'))
+
+WORLD_CIDR = '0.0.0.0/0'
+
+# (rule, FromPort, ToPort) for security group rules open to the world
+OPEN_PORT_RULES = (
+    ('EC2_SSH_OPEN_TO_WORLD', 22, 22),
+    ('EC2_RDP_OPEN_TO_WORLD', 3389, 3389),
+    ('EC2_ALL_PORTS_OPEN_TO_WORLD', 0, 65535),
+)
+
+
+def security_group_findings(sg, context):
+    rule_ids = context.get('rule_ids')
+    findings = []
+    for permission in sg.get('IpPermissions', []):
+        for ip_range in permission.get('IpRanges', []):
+            if ip_range.get('CidrIp') != WORLD_CIDR:
+                continue
+            for rule_id, from_port, to_port in OPEN_PORT_RULES:
+                if rule_ids is not None and rule_id not in rule_ids:
+                    continue
+                if permission.get('FromPort') == from_port and permission.get('ToPort') == to_port:
+                    findings.append(_finding(rule_id, sg['GroupId'], (sg['GroupName'], sg['GroupId']), context))
+    return findings
+
+
+def volume_findings(volume, context):
+    if volume.get('Encrypted', False):
+        return []
+    return [_finding('EBS_UNENCRYPTED_VOLUME', volume['VolumeId'], (volume['VolumeId'],), context)]
+
+
+def bucket_acl_findings(bucket, context):
+    # bucket is a (name, acl) pair from get_bucket_acl
+    bucket_name, acl = bucket
+    findings = []
+    for grant in acl.get('Grants', []):
+        if 'AllUsers' in grant['Grantee'].get('URI', ''):
+            findings.append(_finding('S3_PUBLIC_BUCKET', bucket_name, (bucket_name,), context))
+    return findings
+
+
+def db_instance_findings(instance, context):
+    if not instance.get('PubliclyAccessible'):
+        return []
+    instance_id = instance['DBInstanceIdentifier']
+    return [_finding('RDS_PUBLIC_INSTANCE', instance_id, (instance_id,), context)]
+
+
+def _finding(rule_id, resource, params, context):
+    return Finding(
+        rule_id, resource, params,
+        region=context.get('region'),
+        account=context.get('account'),
+        timestamp=context.get('timestamp')
+    )
+
+
+# Resource kind -> (evaluator, resource ID)
+EVALUATORS = {
+    'security_group': (security_group_findings, lambda sg: sg['GroupId']),
+    'volume': (volume_findings, lambda volume: volume['VolumeId']),
+    'bucket_acl': (bucket_acl_findings, lambda bucket: bucket[0]),
+    'db_instance': (db_instance_findings, lambda instance: instance['DBInstanceIdentifier']),
+}
+
+
+class ResourceQuery:
+    """A paginated describe call that can run here or in a worker process
+
+    Pickling drops the client and keeps its service, region and config plus
+    frozen credentials, so a worker can rebuild an equivalent client.
+    """
+
+    def __init__(self, client, credentials, operation, result_key, page_size=None, **kwargs):
+        self.client = client
+        self.credentials = credentials  # botocore ReadOnlyCredentials
+        self.service = client.meta.service_model.service_name
+        self.region = client.meta.region_name
+        self.config = client.meta.config
+        self.operation = operation
+        self.result_key = result_key
+        self.page_size = page_size
+        self.kwargs = kwargs
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['client'] = None
+        return state
+
+    def fetch(self):
+        client = self.client or _worker_client(self.credentials, self.region, self.service, self.config)
+        return iter_resources(client, self.operation, self.result_key, page_size=self.page_size, **self.kwargs)
+
+
+def frozen_credentials(session):
+    """Picklable snapshot of a session's credentials, or None if it has none"""
+    credentials = session.get_credentials()
+    return credentials.get_frozen_credentials() if credentials is not None else None
+
+
+# Clients built by this process for ResourceQuery, reused across shards
+_clients = {}
+
+
+def _worker_client(credentials, region, service, config):
+    key = (credentials, region, service)
+    client = _clients.get(key)
+    if client is None:
+        import boto3
+        session = boto3.Session(
+            aws_access_key_id=credentials.access_key,
+            aws_secret_access_key=credentials.secret_key,
+            aws_session_token=credentials.token,
+            region_name=region
+        )
+        client = _clients[key] = session.client(service, config=config)
+    return client
+
+
+def _shard_items(resources):
+    if isinstance(resources, ResourceQuery):
+        return resources
+    return list(enumerate(resources))
+
+
+def evaluate_shard(shard):
+    """Evaluate one shard of [(batch_index, kind, context, items), ...]
+
+    items is either an iterable of (position, resource) pairs or a
+    ResourceQuery to run here; both are consumed one resource at a time.
+    Runs in worker processes, so it only takes and returns picklable
+    values. Returns ((batch_index, position), findings) pairs for the merge.
+    """
+    results = []
+    for batch_index, kind, context, items in shard:
+        evaluate = EVALUATORS[kind][0]
+        if isinstance(items, ResourceQuery):
+            items = enumerate(items.fetch())
+        for position, resource in items:
+            findings = evaluate(resource, context)
+            if findings:
+                results.append(((batch_index, position), findings))
+    return results
+
+
+class RuleEvaluator:
+    """Evaluates batches in the calling process"""
+
+    workers = 0
+
+    def resources(self, query):
+        """Resources for a query, left unfetched so evaluation pages through them"""
+        return query
+
+    def evaluate(self, kind, resources, **context):
+        """Yield the findings for one batch of resources of a single kind, a resource at a time"""
+        evaluate = EVALUATORS[kind][0]
+        if isinstance(resources, ResourceQuery):
+            resources = resources.fetch()
+        for resource in resources:
+            yield from evaluate(resource, context)
+
+    def evaluate_batches(self, batches):
+        """Evaluate [(kind, resources, context), ...] and return one findings list per batch"""
+        # Nothing is pickled here, so positions are counted as resources stream past
+        shard = (
+            (batch_index, kind, context, resources if isinstance(resources, ResourceQuery) else enumerate(resources))
+            for batch_index, (kind, resources, context) in enumerate(batches)
+        )
+        return self._merge(len(batches), evaluate_shard(shard))
+
+    def _merge(self, batch_count, results):
+        # Sorting by (batch, position) restores the serial order
+        merged = [[] for _ in range(batch_count)]
+        for (batch_index, _), findings in sorted(results, key=lambda result: result[0]):
+            merged[batch_index].extend(findings)
+        return merged
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ShardedRuleEvaluator(RuleEvaluator):
+    """Evaluates batches on a process pool, sharded by region or by resource ID hash"""
+
+    SHARD_MODES = ('hash', 'region')
+
+    def __init__(self, workers=None, shard_by='hash', shards_per_worker=4):
+        if shard_by not in self.SHARD_MODES:
+            raise ValueError(f"Unknown shard mode: {shard_by}")
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_by = shard_by
+        self.shard_count = self.workers * shards_per_worker
+        self._pool = None
+        self._lock = threading.Lock()  # Regions may evaluate from several threads at once
+
+    def evaluate(self, kind, resources, **context):
+        """Findings for one batch of resources of a single kind, once every shard is merged"""
+        return self.evaluate_batches([(kind, resources, context)])[0]
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def evaluate_batches(self, batches):
+        shards = self._shard(batches)
+        results = []
+        for shard_results in self._executor().map(evaluate_shard, shards):
+            results.extend(shard_results)
+        return self._merge(len(batches), results)
+
+    def _shard(self, batches):
+        if self.shard_by == 'region':
+            return [
+                [(batch_index, kind, context, _shard_items(resources))]
+                for batch_index, (kind, resources, context) in enumerate(batches)
+            ]
+
+        # crc32 rather than hash(): it is stable across processes and runs
+        shards = [[] for _ in range(self.shard_count)]
+        queries = []
+        for batch_index, (kind, resources, context) in enumerate(batches):
+            if isinstance(resources, ResourceQuery):
+                queries.append([(batch_index, kind, context, resources)])
+                continue
+            resource_id = EVALUATORS[kind][1]
+            items = [[] for _ in range(self.shard_count)]
+            for position, resource in enumerate(resources):
+                key = zlib.crc32(str(resource_id(resource)).encode()) % self.shard_count
+                items[key].append((position, resource))
+            for key, shard_items in enumerate(items):
+                if shard_items:
+                    shards[key].append((batch_index, kind, context, shard_items))
+        return queries + [shard for shard in shards if shard]
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+def make_evaluator(workers=None, shard_by='hash'):
+    """In-process evaluator for 0 workers, otherwise a process-pool evaluator"""
+    workers = DEFAULT_EVAL_WORKERS if workers is None else workers
+    if workers <= 0:
+        return RuleEvaluator()
+    return ShardedRuleEvaluator(workers, shard_by=shard_by)
@@ -0,0 +1,210 @@
+# scanner/scan_worker.py
+"""
+Long-lived, in-process scan worker.
+
+Spawning `python3 scanner/enhanced_scanner.py` for every scan pays for
+interpreter startup, the boto3/botocore import, endpoint and service model
+loading and credential resolution each time. A ScanWorker does that once:
+it keeps one boto3 session with resolved credentials and a cache of
+clients, and runs scans on its own threads against them.
+
+Scanners report progress with print(). While a scan runs on a worker
+thread its output is routed to that scan's on_output callback, so
+concurrent scans do not mix their output and the dashboard can still
+follow the step markers.
+
+Cancellation is cooperative. Once a scan's cancel event is set, the scan
+thread raises ScanCancelled at its next line of output, and scanners also
+call check_cancelled() between checks and pages. A boto3 call already in
+flight is not interrupted, so a cancelled scan may still finish its
+current API call (and, for the production scanner, the calls other
+regions have in flight) before it stops.
+"""
+import importlib
+import io
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import instrument_session
+
+# Scanner classes by scan type. They are imported on first use, since
+# importing a scanner imports boto3.
+SCANNERS = {
+    'basic': 'scanner.basic_scanner:BasicSecurityScanner',
+    'enhanced': 'scanner.enhanced_scanner:EnhancedSecurityScanner',
+    'production': 'scanner.production_scanner:ProductionSecurityScanner',
+}
+
+# Clients created by warm() so the first scan finds them ready
+WARM_SERVICES = ('s3', 'ec2', 'iam', 'sts')
+
+
+def load_scanner(scan_type):
+    """Import and return the scanner class for a scan type"""
+    if scan_type not in SCANNERS:
+        raise ValueError(f"Unknown scan type: {scan_type}")
+    module_name, class_name = SCANNERS[scan_type].split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class ScanCancelled(BaseException):
+    """Raised inside a scan thread to stop it
+
+    A BaseException, like asyncio.CancelledError, so the scanners'
+    `except Exception` handlers do not swallow it.
+    """
+
+
+def check_cancelled(cancel):
+    """Raise ScanCancelled if a scan's cancel event has been set"""
+    if cancel is not None and cancel.is_set():
+        raise ScanCancelled()
+
+
+class WarmSession:
+    """A boto3 session that hands out one shared client per service, region and config
+
+    Clients are thread-safe once built; only their creation is serialized.
+    """
+
+    def __init__(self, session=None):
+        if session is None:
+            import boto3
+            session = boto3.Session()
+        # Clients are created here, so this is where API calls get instrumented
+        self.session = instrument_session(session)
+        self.region_name = self.session.region_name
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client(self, service_name, region_name=None, config=None, **kwargs):
+        key = (service_name, region_name, self._config_key(config), tuple(sorted(kwargs.items())))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self.session.client(
+                    service_name, region_name=region_name, config=config, **kwargs
+                )
+            return client
+
+    def _config_key(self, config):
+        # Scanners build a fresh but equal Config per scan; compare by value
+        return None if config is None else repr(sorted(vars(config).items()))
+
+    def get_credentials(self):
+        return self.session.get_credentials()
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+class _ScanOutput(io.TextIOBase):
+    """sys.stdout replacement that sends each scan thread's lines to its own callback"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        sink = getattr(self.local, 'sink', None)
+        if sink is None:
+            return self.stream.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class _LineSink:
+    def __init__(self, on_output, cancel):
+        self.on_output = on_output
+        self.cancel = cancel
+        self.buffer = ""
+
+    def __call__(self, text):
+        check_cancelled(self.cancel)
+        self.buffer += text
+        while "\n" in self.buffer:
+            line, self.buffer = self.buffer.split("\n", 1)
+            if self.on_output is not None:
+                self.on_output(line)
+
+    def close(self):
+        if self.buffer and self.on_output is not None:
+            self.on_output(self.buffer)
+        self.buffer = ""
+
+
+class ScanWorker:
+    """Runs scans in this process against a warm, shared session"""
+
+    def __init__(self, max_workers=2, session=None):
+        self._session = session
+        self._session_lock = threading.Lock()
+        self._warm_session = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tf-scan-worker')
+        self._output = None
+        self._output_lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Built on first use so importing the worker does not import boto3
+        with self._session_lock:
+            if self._warm_session is None:
+                self._warm_session = WarmSession(self._session)
+            return self._warm_session
+
+    def warm(self):
+        """Resolve credentials and build the common clients ahead of the first scan"""
+        try:
+            self.session.get_credentials()
+            for service in WARM_SERVICES:
+                self.session.client(service)
+        except Exception as e:
+            # Scans will report the real problem (no region, no credentials)
+            logging.warning(f"Could not warm scan worker: {e}")
+        return self
+
+    def submit(self, scan_type='enhanced', options=None, on_output=None, cancel=None, save=True):
+        """Queue a scan and return a concurrent.futures.Future for its scanner
+
+        on_output is called from the scan thread with each line the scanner
+        prints. Setting the threading.Event passed as cancel stops the scan
+        at its next line of output or check boundary, whichever comes first.
+        """
+        if scan_type not in SCANNERS:
+            raise ValueError(f"Unknown scan type: {scan_type}")
+        self._install_output()
+        return self._executor.submit(self._run, scan_type, dict(options or {}), on_output, cancel, save)
+
+    def run(self, scan_type='enhanced', options=None, on_output=None, cancel=None, save=True):
+        """Run a scan and wait for it"""
+        return self.submit(scan_type, options, on_output, cancel, save).result()
+
+    def _run(self, scan_type, options, on_output, cancel, save):
+        sink = _LineSink(on_output, cancel)
+        self._output.local.sink = sink
+        try:
+            check_cancelled(cancel)
+            scanner = load_scanner(scan_type)(session=self.session, cancel=cancel, **options)
+            if save:
+                scanner.run_scan()
+            else:
+                scanner.run_checks()
+            return scanner
+        finally:
+            self._output.local.sink = None
+            sink.close()
+
+    def _install_output(self):
+        # Wraps whatever sys.stdout is now (colorama's wrapper included)
+        with self._output_lock:
+            if self._output is None:
+                self._output = _ScanOutput(sys.stdout)
+                sys.stdout = self._output
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
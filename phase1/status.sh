@@ -29,6 +29,6 @@ fi
 
 # Recent scans
 echo -e "\nRecent Scans:"
-ls -lt results/*.json 2>/dev/null | head -3 | awk '{print "  " $6 " " $7 " " $8 " " $9}' || echo "  No scans found"
+ls -lt results/*.json results/*.ndjson.gz 2>/dev/null | head -3 | awk '{print "  " $6 " " $7 " " $8 " " $9}' || echo "  No scans found"
 
 echo -e "\nAccess: http://localhost:8000"
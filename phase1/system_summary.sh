@@ -24,7 +24,7 @@ fi
 
 # Recent activity
 echo -e "\nRECENT ACTIVITY:"
-ls -lt results/*.json 2>/dev/null | head -3 | awk '{print "  " $6 " " $7 " " $8 " - " $9}' || echo "  No recent activity"
+ls -lt results/*.json results/*.ndjson.gz 2>/dev/null | head -3 | awk '{print "  " $6 " " $7 " " $8 " - " $9}' || echo "  No recent activity"
 
 # Access information
 echo -e "\nACCESS:"
@@ -0,0 +1,131 @@
+import sys
+import os
+import asyncio
+import json
+import socketserver
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from alerts.channels import Alert, Channel, SpoolChannel, SyslogChannel, WebhookChannel
+from alerts.dispatcher import AlertDispatcher, deliver_alerts
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    """Local chat webhook that records posted payloads; /missing answers 404"""
+    payloads = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        StubWebhookHandler.payloads.append(json.loads(body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubSyslogHandler(socketserver.BaseRequestHandler):
+    """Local UDP syslog receiver"""
+    messages = []
+
+    def handle(self):
+        StubSyslogHandler.messages.append(self.request[0].decode())
+
+
+class SlowChannel(Channel):
+    """A channel that never answers in time, like a hung SMTP server"""
+    name = 'slow'
+
+    def __init__(self):
+        super().__init__(timeout=0.2)
+        self.attempts = 0
+
+    async def send(self, alert):
+        self.attempts += 1
+        await asyncio.sleep(10)
+
+
+def make_alert():
+    finding = {
+        'rule_id': 'EC2_RDP_OPEN_TO_WORLD', 'severity': 'CRITICAL', 'title': 'RDP Port Open to World',
+        'resource': 'sg-0003', 'region': 'eu-west-1', 'reason': 'new'
+    }
+    return Alert("ThreatForge Alert: 1 Critical Security Issues Found", "\n- RDP Port Open to World (sg-0003)",
+                 [finding], critical_count=1, scan_time='2024-01-01T00:00:00')
+
+
+def start(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def test_alert_dispatcher():
+    """Fan an alert out to webhook, syslog and spool while a hung channel times out"""
+    webhook = start(HTTPServer(('127.0.0.1', 0), StubWebhookHandler))
+    syslog = start(socketserver.UDPServer(('127.0.0.1', 0), StubSyslogHandler))
+    StubWebhookHandler.payloads.clear()
+    StubSyslogHandler.messages.clear()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            spool_file = os.path.join(directory, "alerts.ndjson")
+            slow = SlowChannel()
+            channels = [
+                slow,
+                WebhookChannel(f"http://127.0.0.1:{webhook.server_address[1]}/hook"),
+                SyslogChannel('127.0.0.1', syslog.server_address[1]),
+                SpoolChannel(spool_file),
+            ]
+            alert = make_alert()
+
+            async def run():
+                dispatcher = AlertDispatcher(channels, max_retries=3, backoff=0.01, breaker_failures=2)
+                async with dispatcher:
+                    started = time.monotonic()
+                    dispatcher.dispatch(alert)
+                    # The hung channel does not hold up the others
+                    while len(dispatcher.delivered[alert]) < 3:
+                        await asyncio.sleep(0.01)
+                    assert time.monotonic() - started < 1
+                return dispatcher
+
+            dispatcher = asyncio.run(run())
+            assert dispatcher.delivered[alert] == {'webhook', 'syslog', 'spool'}
+            assert 'slow' in dispatcher.failed[alert]
+            # Two timeouts open the circuit; the remaining retries fail without calling the channel
+            assert slow.attempts == 2
+            assert dispatcher.lanes['slow'].breaker.state == 'open'
+
+            assert "sg-0003" in StubWebhookHandler.payloads[0]['text']
+            time.sleep(0.1)
+            assert len(StubSyslogHandler.messages) == 1
+            assert StubSyslogHandler.messages[0].startswith("<130>1 ")
+            assert 'resource="sg-0003"' in StubSyslogHandler.messages[0]
+            with open(spool_file) as f:
+                assert json.loads(f.readline())['findings'][0]['resource'] == 'sg-0003'
+
+            # A 404 is permanent and is not retried
+            missing = WebhookChannel(f"http://127.0.0.1:{webhook.server_address[1]}/missing")
+            dispatcher = deliver_alerts([missing], [alert], max_retries=3, backoff=5)
+            assert dispatcher.delivered[alert] == set()
+            assert "404" in dispatcher.failed[alert]['webhook']
+    finally:
+        for server in (webhook, syslog):
+            server.shutdown()
+            server.server_close()
+
+    print("Alert dispatcher test passed")
+
+
+if __name__ == "__main__":
+    test_alert_dispatcher()
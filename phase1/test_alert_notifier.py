@@ -0,0 +1,284 @@
+import sys
+import os
+import json
+import smtplib
+import socketserver
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from email import message_from_bytes
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import boto3
+
+from alerts.notifier import AlertNotifier
+from alerts.smtp_sender import SMTPSender
+from scanner.enhanced_scanner import EnhancedSecurityScanner
+from utils.findings import Finding
+from utils.findings_store import FindingsStore
+from utils.results_format import write_scan_results
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal local SMTP server that keeps every message it accepts"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+
+            if command.startswith("EHLO"):
+                self.wfile.write(b"250-stub\r\n250 8BITMIME\r\n")
+            elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                if server.drop_next_data:
+                    # Simulate a server that goes away mid-conversation
+                    server.drop_next_data = False
+                    return
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b".\r\n", b""):
+                        break
+                    data += line
+                server.messages.append(message_from_bytes(data))
+                self.reply("250 Queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubSMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.drop_next_data = False
+
+
+def write_config(directory, port=25, deduplicate=False):
+    config_file = os.path.join(directory, "alerts.json")
+    config = {
+        "email": {
+            "enabled": True,
+            "smtp_server": "127.0.0.1",
+            "smtp_port": port,
+            "use_tls": False,
+            "sender_email": "threatforge@example.com",
+            "sender_password": "",
+            "recipients": ["security@example.com"],
+            "retry_backoff_seconds": 0.01
+        },
+        "critical_severity_threshold": 1,
+        "deduplicate": deduplicate
+    }
+    with open(config_file, 'w') as f:
+        json.dump(config, f)
+    return config_file
+
+
+def write_scan(directory, open_groups=('sg-0001', 'sg-0002'), name="enhanced_scan_test", region='us-east-1',
+               coverage=None):
+    scan_file = os.path.join(directory, f"{name}.ndjson.gz")
+    findings = [
+        Finding('EC2_SSH_OPEN_TO_WORLD', group_id, ('web', group_id), region=region)
+        for group_id in open_groups
+    ]
+    findings.append(Finding('IAM_NO_PASSWORD_POLICY', 'AccountPasswordPolicy'))
+    scan_data = {'scan_time': '2024-01-01T00:00:00', 'scan_type': 'enhanced_security_scan', 'findings': findings}
+    if coverage is not None:
+        scan_data['coverage'] = coverage
+    return write_scan_results(scan_file, scan_data)
+
+
+class RecordingSender:
+    """Stands in for SMTPSender and keeps the subjects it was asked to send"""
+
+    def __init__(self):
+        self.subjects = []
+
+    def send(self, messages):
+        self.subjects.extend(msg['Subject'] for msg in messages)
+        return len(messages), []
+
+    def close(self):
+        pass
+
+
+def test_alert_notifier():
+    """Send alerts to a local stub SMTP server over pooled, retried connections"""
+    server = StubSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            notifier = AlertNotifier(write_config(directory, server.server_address[1]))
+            scan_file = write_scan(directory)
+
+            notifier.process_scan_alerts(scan_file)
+            assert len(server.messages) == 1
+            alert = server.messages[0]
+            assert alert['Subject'] == "ThreatForge Alert: 2 Critical Security Issues Found"
+            body = alert.get_payload()[0].get_payload()
+            assert "sg-0001" in body and "sg-0002" in body
+            assert "AccountPasswordPolicy" not in body
+
+            # Queued alerts go out together over the connection already open
+            for _ in range(3):
+                notifier.process_scan_alerts(scan_file, flush=False)
+            assert notifier.flush()
+            assert len(server.messages) == 4
+            assert notifier.sender.connections_opened == 1
+
+            # A dropped connection is retried on a fresh one
+            server.drop_next_data = True
+            notifier.process_scan_alerts(scan_file)
+            assert len(server.messages) == 5
+            assert notifier.sender.connections_opened == 2
+
+            notifier.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print("Alert notifier test passed")
+
+
+def test_alert_deduplication():
+    """Findings alert once, then again only when they reopen or a reminder is due"""
+    with tempfile.TemporaryDirectory() as directory:
+        sender = RecordingSender()
+        store = FindingsStore(os.path.join(directory, "findings.db"))
+        notifier = AlertNotifier(write_config(directory, deduplicate=True), sender=sender, store=store)
+
+        notifier.process_scan_alerts(write_scan(directory))
+        notifier.process_scan_alerts(write_scan(directory))
+        assert sender.subjects == ["ThreatForge Alert: 2 Critical Security Issues Found"]
+
+        # sg-0002 is fixed, then opened again
+        notifier.process_scan_alerts(write_scan(directory, ('sg-0001',)))
+        notifier.process_scan_alerts(write_scan(directory))
+        assert sender.subjects[1:] == ["ThreatForge Alert: 1 Critical Security Issues Found"]
+
+        # Everything still open is due a reminder once the interval has passed
+        later = datetime.utcnow() + timedelta(hours=25)
+        due = store.track_fingerprints(
+            [f"EC2_SSH_OPEN_TO_WORLD||us-east-1|{group_id}" for group_id in ('sg-0001', 'sg-0002')],
+            scan_type='enhanced_security_scan', reminder_interval=timedelta(hours=24), now=later
+        )
+        assert set(due.values()) == {'reminder'}
+
+
+def test_resolution_follows_scan_coverage():
+    """Scans without criticals still resolve, but only inside the regions they covered"""
+    with tempfile.TemporaryDirectory() as directory:
+        sender = RecordingSender()
+        store = FindingsStore(os.path.join(directory, "findings.db"))
+        notifier = AlertNotifier(write_config(directory, deduplicate=True), sender=sender, store=store)
+
+        notifier.process_scan_alerts(write_scan(directory, ('sg-0001',)))
+        # Fixed: a scan with no criticals at all, below the alert threshold
+        assert notifier.build_alert(write_scan(directory, ())) is None
+        alert = notifier.build_alert(write_scan(directory, ('sg-0001',)))
+        assert alert is not None and alert.findings[0]['reason'] == 'reopened'
+        notifier.queue_alert(alert)
+        notifier.flush()
+
+        # An eu-west-1 finding is left open by a scan covering only us-east-1
+        notifier.process_scan_alerts(write_scan(directory, ('sg-0003',), region='eu-west-1'))
+        assert notifier.build_alert(write_scan(directory, (), coverage={'regions': ['us-east-1']})) is None
+        assert notifier.build_alert(write_scan(directory, ('sg-0003',), region='eu-west-1')) is None
+        assert len(sender.subjects) == 3
+
+
+def test_failed_check_resolves_nothing():
+    """A check that errors leaves the findings it reports open"""
+    with tempfile.TemporaryDirectory() as directory:
+        sender = RecordingSender()
+        store = FindingsStore(os.path.join(directory, "findings.db"))
+        notifier = AlertNotifier(write_config(directory, deduplicate=True), sender=sender, store=store)
+        notifier.process_scan_alerts(write_scan(directory))
+
+        def throttled(ec2):
+            raise RuntimeError("Rate exceeded")
+
+        scanner = EnhancedSecurityScanner(session=boto3.Session(
+            region_name='us-east-1', aws_access_key_id='testing', aws_secret_access_key='testing'
+        ))
+        scanner._security_group_findings = throttled
+        scanner.check_ec2_security_groups()
+        assert 'check_ec2_security_groups' in scanner.check_errors
+        assert 'EC2_SSH_OPEN_TO_WORLD' not in scanner.coverage()['rules']
+
+        # The security groups were not checked, so they are neither resolved nor re-alerted
+        assert notifier.build_alert(write_scan(directory, (), coverage=scanner.coverage())) is None
+        assert notifier.build_alert(write_scan(directory)) is None
+        assert len(sender.subjects) == 1
+
+
+def test_send_email_alert_uses_email_only():
+    """send_email_alert() leaves the other enabled channels alone"""
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = write_config(directory)
+        spool_path = os.path.join(directory, "alerts.ndjson")
+        with open(config_file) as f:
+            config = json.load(f)
+        config['channels'] = {'spool': {'enabled': True, 'path': spool_path}}
+        with open(config_file, 'w') as f:
+            json.dump(config, f)
+
+        sender = RecordingSender()
+        notifier = AlertNotifier(config_file, sender=sender)
+        notifier.send_email_alert(write_scan(directory))
+        assert sender.subjects == ["ThreatForge Alert: 2 Critical Security Issues Found"]
+        assert not os.path.exists(spool_path)
+
+        notifier.process_scan_alerts(write_scan(directory))
+        assert len(sender.subjects) == 2 and os.path.exists(spool_path)
+
+
+def test_permanent_failure_is_not_retried():
+    """A refused message fails at once without retries"""
+    class RejectingSMTP:
+        opened = 0
+
+        def __init__(self, *args, **kwargs):
+            RejectingSMTP.opened += 1
+
+        def send_message(self, message):
+            raise smtplib.SMTPDataError(554, b"Rejected")
+
+        def close(self):
+            pass
+
+    sender = SMTPSender('127.0.0.1', 25, starttls=False, smtp_class=RejectingSMTP)
+    sent, failed = sender.send(["first", "second"])
+    assert sent == 0 and len(failed) == 2
+    assert RejectingSMTP.opened == 1
+
+
+if __name__ == "__main__":
+    test_alert_notifier()
+    test_alert_deduplication()
+    test_resolution_follows_scan_coverage()
+    test_failed_check_resolves_nothing()
+    test_send_email_alert_uses_email_only()
+    test_permanent_failure_is_not_retried()
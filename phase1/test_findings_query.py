@@ -0,0 +1,47 @@
+import sys
+import os
+import tempfile
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.findings_store import FindingsStore
+
+
+def test_findings_query():
+    """Filter findings across scans and page through them with a cursor"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = FindingsStore(os.path.join(directory, "findings.db"))
+        for day in range(1, 4):
+            store.save_scan({'scan_type': 'enhanced', 'scan_time': f"2024-01-0{day}T02:00:00", 'findings': [
+                {'severity': 'CRITICAL' if i % 2 else 'LOW', 'service': 'EC2', 'region': 'us-east-1',
+                 'resource': f"sg-{i}", 'title': "SSH Port Open to World"}
+                for i in range(5)
+            ]})
+
+        page = store.query_findings(severity='CRITICAL', fields=['resource'], limit=4)
+        assert [(f['scan_id'], f['resource']) for f in page['findings']] == [(3, 'sg-3'), (3, 'sg-1'), (2, 'sg-3'), (2, 'sg-1')]
+        assert set(page['findings'][0]) == {'id', 'scan_id', 'resource'}
+
+        # A scan saved between pages does not shift the next page
+        store.save_scan({'scan_type': 'enhanced', 'scan_time': "2024-01-04T02:00:00",
+                         'findings': [{'severity': 'CRITICAL', 'service': 'EC2', 'resource': 'sg-9'}]})
+        rest = store.query_findings(severity='CRITICAL', fields=['resource'], limit=4, cursor=page['next_cursor'])
+        assert [(f['scan_id'], f['resource']) for f in rest['findings']] == [(1, 'sg-3'), (1, 'sg-1')]
+        assert rest['next_cursor'] is None
+
+        by_day = store.query_findings(since="2024-01-02", until="2024-01-03")
+        assert {f['scan_id'] for f in by_day['findings']} == {2}
+        assert [f['scan_id'] for f in store.query_findings(resource_prefix='sg-4')['findings']] == [3, 2, 1]
+
+        try:
+            store.query_findings(cursor="not-a-cursor")
+            assert False, "bad cursor accepted"
+        except ValueError:
+            pass
+
+    print("Findings query test passed")
+
+
+if __name__ == "__main__":
+    test_findings_query()
@@ -0,0 +1,47 @@
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.findings_store import FindingsStore
+from utils.security_reporter import SecurityReporter
+
+
+def test_html_report():
+    """Render a paginated report from the store and check values are escaped"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = FindingsStore(os.path.join(directory, "findings.db"))
+        findings = [
+            {'severity': 'CRITICAL', 'service': 'EC2', 'resource': f"sg-{i:04d}",
+             'title': "SSH Port Open to World", 'description': "Allows <script>alert(1)</script>"}
+            for i in range(7)
+        ] + [{'severity': 'MEDIUM', 'service': 'EBS', 'resource': 'vol-1', 'title': "EBS Volume Not Encrypted"}]
+        store.save_scan({'scan_time': '2024-01-01T00:00:00', 'scan_type': 'enhanced', 'findings': findings})
+
+        output_file = Path(directory) / "security_report.html"
+        SecurityReporter(directory, store=store).write_html_report(output_file, page_size=3)
+
+        index = output_file.read_text()
+        assert "<script>" not in index
+        assert "&lt;script&gt;" in index
+        assert index.count('class="finding"') == 3
+        assert 'href="security_report_pages/critical-ec2-2.html"' in index
+        assert "Risk Score: 74/100" in index
+
+        pages = sorted(path.name for path in (Path(directory) / "security_report_pages").iterdir())
+        # 7 critical findings: 3 on the index, then 3 + 1; 8 recommendations: 3, then 3 + 2
+        assert pages == ["critical-ec2-2.html", "critical-ec2-3.html",
+                         "recommendations-2.html", "recommendations-3.html"]
+        last_page = (Path(directory) / "security_report_pages" / "critical-ec2-3.html").read_text()
+        assert last_page.count('class="finding"') == 1
+        assert "Next" not in last_page
+        assert "Encrypt EBS volume vol-1" in (Path(directory) / "security_report_pages" / "recommendations-3.html").read_text()
+
+    print("HTML report test passed")
+
+
+if __name__ == "__main__":
+    test_html_report()
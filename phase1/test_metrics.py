@@ -0,0 +1,109 @@
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import boto3
+from botocore.stub import Stubber
+
+from scanner.enhanced_scanner import EnhancedSecurityScanner
+from scanner.organization_scanner import OrganizationScanner
+from utils.events import FINDING, SCAN_FINISHED, SCAN_STARTED, EventBus
+from utils.findings import Finding
+from utils.metrics import (
+    AWS_API_CALLS, FINDINGS, SCAN_DURATION, SCANS, MetricsRegistry, instrument_session, watch_scan_events
+)
+
+
+def test_metrics():
+    """Render the exposition format and record AWS calls and findings"""
+    registry = MetricsRegistry()
+    calls = registry.counter('test_calls_total', "Calls", ('route',))
+    latency = registry.histogram('test_latency_seconds', "Latency", ('route',), buckets=(0.1, 1))
+    registry.gauge('test_clients', "Clients", lambda: 3)
+    calls.inc('/a "quoted"')
+    latency.observe(0.05, '/a')
+    latency.observe(5, '/a')
+
+    text = registry.render()
+    assert '# TYPE test_calls_total counter' in text
+    assert 'test_calls_total{route="/a \\"quoted\\""} 1' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 'test_latency_seconds_count{route="/a"} 2' in text
+    assert 'test_clients 3' in text
+
+    # botocore hooks count calls made by clients of an instrumented session
+    session = instrument_session(boto3.Session(aws_access_key_id='x', aws_secret_access_key='x', region_name='us-east-1'))
+    ec2 = session.client('ec2')
+    before = AWS_API_CALLS.value('ec2', 'DescribeRegions', 'ok')
+    with Stubber(ec2) as stubber:
+        stubber.add_response('describe_regions', {'Regions': []})
+        ec2.describe_regions()
+    assert AWS_API_CALLS.value('ec2', 'DescribeRegions', 'ok') == before + 1
+
+    # Findings are counted from the event bus
+    bus = EventBus()
+    scan_metrics = watch_scan_events(bus)
+    before = FINDINGS.value('test_scan', 'CRITICAL')
+    bus.publish(SCAN_STARTED, scan_type='test_scan', scan_time='t')
+    bus.publish(FINDING, finding=Finding('EC2_SSH_OPEN_TO_WORLD', 'sg-1', ('web', 'sg-1')), scan_type='test_scan', scan_time='t')
+    bus.publish(SCAN_FINISHED, scan_type='test_scan', scan_time='t')
+    scan_metrics.close()
+    assert FINDINGS.value('test_scan', 'CRITICAL') == before + 1
+
+    print("Metrics test passed")
+
+
+class OfflineAccountScanner(EnhancedSecurityScanner):
+    """EnhancedSecurityScanner whose checks report one finding without calling AWS"""
+
+    def check_s3_public_buckets(self):
+        self._add_finding(Finding('S3_PUBLIC_BUCKET', f"bucket-{self.account_id}", account=self.account_id))
+
+    def check_ec2_security_groups(self):
+        pass
+
+    def check_iam_password_policy(self):
+        pass
+
+    def check_unencrypted_volumes(self):
+        pass
+
+
+class StaticSessionFactory:
+    def session_for(self, role_arn):
+        return boto3.Session(aws_access_key_id='x', aws_secret_access_key='x', region_name='us-east-1')
+
+
+def test_organization_scan_metrics():
+    """An organization scan counts as one scan, however many accounts it covers"""
+    bus = EventBus()
+    scan_metrics = watch_scan_events(bus)
+    role_arns = [f"arn:aws:iam::{account:012d}:role/ThreatForgeScan" for account in range(1, 4)]
+    organization = OrganizationScanner(role_arns, session_factory=StaticSessionFactory(), event_bus=bus)
+
+    def account_scanner(session, account_id):
+        scanner = OfflineAccountScanner(session=session, account_id=account_id, evaluator=organization.evaluator,
+                                        event_bus=bus)
+        scanner.scan_type = organization.scan_type
+        scanner.scan_time = organization.scan_time
+        return scanner
+
+    organization.scanner_factory = account_scanner
+    scans = SCANS.value('organization_enhanced')
+    durations = SCAN_DURATION.count('organization_enhanced')
+    findings = FINDINGS.value('organization_enhanced', 'CRITICAL')
+    organization.run_checks()
+    scan_metrics.close()
+
+    assert SCANS.value('organization_enhanced') == scans + 1
+    assert SCAN_DURATION.count('organization_enhanced') == durations + 1
+    # Findings still carry the organization scan's identity
+    assert FINDINGS.value('organization_enhanced', 'CRITICAL') == findings + 3
+
+
+if __name__ == "__main__":
+    test_metrics()
+    test_organization_scan_metrics()
@@ -0,0 +1,130 @@
+import sys
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs
+
+import boto3
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scanner.organization_scanner import AssumeRoleSessionFactory, OrganizationScanner, load_role_arns
+from utils.findings import Finding
+
+ASSUME_ROLE_RESPONSE = """<AssumeRoleResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">
+  <AssumeRoleResult>
+    <Credentials>
+      <AccessKeyId>ASIA{account}</AccessKeyId>
+      <SecretAccessKey>secret-{account}</SecretAccessKey>
+      <SessionToken>token-{account}</SessionToken>
+      <Expiration>2099-01-01T00:00:00Z</Expiration>
+    </Credentials>
+    <AssumedRoleUser>
+      <AssumedRoleId>AROA{account}:threatforge-scan</AssumedRoleId>
+      <Arn>{role_arn}</Arn>
+    </AssumedRoleUser>
+  </AssumeRoleResult>
+  <ResponseMetadata><RequestId>stub</RequestId></ResponseMetadata>
+</AssumeRoleResponse>"""
+
+
+class StubSTSHandler(BaseHTTPRequestHandler):
+    """Minimal local STS that answers AssumeRole for any role"""
+    calls = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        params = {key: values[0] for key, values in parse_qs(body).items()}
+        role_arn = params.get('RoleArn', '')
+        StubSTSHandler.calls.append(role_arn)
+
+        response = ASSUME_ROLE_RESPONSE.format(account=role_arn.split(':')[4], role_arn=role_arn).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeAccountScanner:
+    """Stands in for EnhancedSecurityScanner so no AWS service is called"""
+
+    def __init__(self, session, account_id):
+        self.session = session
+        self.account_id = account_id
+        self.findings = []
+
+    def run_checks(self, lifecycle_events=True):
+        access_key = self.session.get_credentials().access_key
+        self.findings.append(Finding(
+            'IAM_NO_PASSWORD_POLICY', 'AccountPasswordPolicy',
+            account=self.account_id, timestamp=access_key
+        ))
+
+
+def test_organization_scan():
+    """Assume roles against a local stub STS and check caching and account tagging"""
+    server = HTTPServer(('127.0.0.1', 0), StubSTSHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        StubSTSHandler.calls.clear()
+        base_session = boto3.Session(
+            aws_access_key_id='testing',
+            aws_secret_access_key='testing',
+            region_name='us-east-1'
+        )
+        factory = AssumeRoleSessionFactory(
+            base_session=base_session,
+            sts_endpoint_url=f"http://127.0.0.1:{server.server_port}"
+        )
+        role_arns = [f"arn:aws:iam::{account:012d}:role/ThreatForgeScan" for account in range(1, 6)]
+
+        scanner = OrganizationScanner(
+            role_arns,
+            max_accounts=3,
+            session_factory=factory,
+            scanner_factory=FakeAccountScanner
+        )
+        scanner.run_checks()
+
+        accounts = [finding.account for finding in scanner.findings]
+        assert accounts == [role_arn.split(':')[4] for role_arn in role_arns]
+        assert all(finding.timestamp == f"ASIA{finding.account}" for finding in scanner.findings)
+        assert sorted(StubSTSHandler.calls) == sorted(role_arns)
+
+        # Cached sessions do not call STS again
+        factory.session_for(role_arns[0])
+        assert len(StubSTSHandler.calls) == len(role_arns)
+
+        print(f"✅ Scanned {len(scanner.account_totals)} accounts through stub STS")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_load_role_arns():
+    """Blank lines and comments are skipped, indented ones included"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "roles.txt")
+        with open(path, 'w') as f:
+            f.write("# Production\n"
+                    "  arn:aws:iam::111111111111:role/ThreatForgeScan\n"
+                    "\n"
+                    "    # arn:aws:iam::222222222222:role/ThreatForgeScan\n"
+                    "arn:aws:iam::333333333333:role/ThreatForgeScan  \n")
+        assert load_role_arns(path) == [
+            "arn:aws:iam::111111111111:role/ThreatForgeScan",
+            "arn:aws:iam::333333333333:role/ThreatForgeScan",
+        ]
+
+
+if __name__ == "__main__":
+    test_organization_scan()
+    test_load_role_arns()
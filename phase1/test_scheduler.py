@@ -0,0 +1,156 @@
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from automation.cron import CronSchedule
+from automation.scheduler import ScanScheduler
+
+
+def test_cron_parsing():
+    """Fields, names, ranges, steps and aliases parse into the right fire times"""
+    schedule = CronSchedule("*/15 9-17 * * mon-fri")
+    assert schedule.minutes == {0, 15, 30, 45}
+    assert schedule.hours == set(range(9, 18))
+    assert schedule.weekdays == {1, 2, 3, 4, 5}
+    # Friday 17:50 -> Monday 09:00
+    assert schedule.next_after(datetime(2024, 1, 5, 17, 50)) == datetime(2024, 1, 8, 9, 0)
+
+    assert CronSchedule("0 6 * * 7").weekdays == {0}
+    assert CronSchedule("0 0 1 jan,jul *").months == {1, 7}
+    assert CronSchedule("0-30/10 * * * *").minutes == {0, 10, 20, 30}
+    assert CronSchedule("5/20 * * * *").minutes == {5, 25, 45}
+    assert CronSchedule("@daily").next_after(datetime(2024, 1, 1, 0, 0)) == datetime(2024, 1, 2, 0, 0)
+
+    # Strictly after, with seconds dropped
+    assert CronSchedule("0 2 * * *").next_after(datetime(2024, 1, 1, 2, 0, 30)) == datetime(2024, 1, 2, 2, 0)
+    # Both day fields restricted: either one matches (the 13th, or a Friday)
+    assert CronSchedule("0 0 13 * fri").next_after(datetime(2024, 1, 1)) == datetime(2024, 1, 5)
+    assert CronSchedule("0 0 29 2 *").next_after(datetime(2024, 3, 1)) == datetime(2028, 2, 29)
+
+    for expression in ("* * * *", "60 * * * *", "0 0 0 * *", "*/0 * * * *", "5-1 * * * *", "0 0 * * xyz"):
+        try:
+            CronSchedule(expression)
+        except ValueError:
+            continue
+        raise AssertionError(f"{expression!r} should not parse")
+    try:
+        CronSchedule("0 0 31 2 *").next_after(datetime(2024, 1, 1))
+        raise AssertionError("February 31st should never fire")
+    except ValueError:
+        pass
+
+
+def make_scheduler(directory, state=None):
+    state_file = os.path.join(directory, "scheduler_state.json")
+    if state is not None:
+        with open(state_file, 'w') as f:
+            json.dump({'jobs': state}, f)
+    config_file = os.path.join(directory, "schedules.json")
+    with open(config_file, 'w') as f:
+        json.dump({'state_file': state_file, 'jobs': []}, f)
+    return ScanScheduler(config_file)
+
+
+async def noop():
+    pass
+
+
+def test_catch_up_and_jitter_planning():
+    """Missed runs collapse into one catch-up run; jitter delays within its bound"""
+    now = datetime(2024, 1, 10, 12, 0)
+    with tempfile.TemporaryDirectory() as directory:
+        scheduler = make_scheduler(directory, {
+            'daily': {'last_scheduled': '2024-01-07T02:00:00'},
+            'no-catch-up': {'last_scheduled': '2024-01-07T02:00:00'},
+        })
+        scheduler.add_job('daily', "0 2 * * *", noop)
+        scheduler.add_job('no-catch-up', "0 2 * * *", noop, catch_up=False)
+        scheduler.add_job('never-run', "0 2 * * *", noop)
+
+        # Runs due on the 8th, 9th and 10th were missed; the latest runs now
+        daily = scheduler.jobs['daily']
+        scheduler._plan(daily, now)
+        assert daily.next_fire == datetime(2024, 1, 10, 2, 0)
+        assert daily.next_run == now
+
+        skipped = scheduler.jobs['no-catch-up']
+        scheduler._plan(skipped, now)
+        assert skipped.next_fire == skipped.next_run == datetime(2024, 1, 11, 2, 0)
+
+        fresh = scheduler.jobs['never-run']
+        scheduler._plan(fresh, now)
+        assert fresh.next_fire == datetime(2024, 1, 11, 2, 0)
+
+        scheduler.add_job('jittered', "0 2 * * *", noop, jitter=300)
+        jittered = scheduler.jobs['jittered']
+        delays = set()
+        for _ in range(50):
+            scheduler._plan(jittered, now)
+            delay = (jittered.next_run - jittered.next_fire).total_seconds()
+            assert 0 <= delay <= 300
+            delays.add(delay)
+        assert len(delays) > 1
+
+        # Dispatching plans the next fire time after now, skipping ones already passed
+        async def dispatch():
+            scheduler._slots = asyncio.Semaphore(1)
+            scheduler._dispatch(daily, now)
+            await scheduler._running['daily']
+        asyncio.run(dispatch())
+        assert daily.next_fire == datetime(2024, 1, 11, 2, 0)
+        assert scheduler.state.get('daily')['last_scheduled'] == '2024-01-10T02:00:00'
+        assert scheduler.state.get('daily')['last_status'] == 'succeeded'
+
+
+class SlowStoppingWorker:
+    """Stands in for ScanWorker: a scan that takes a while to notice it was cancelled"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stopped_at = None
+
+    def submit(self, scan_type, options=None, cancel=None):
+        def scan():
+            cancel.wait()
+            time.sleep(0.3)  # Finishing the API call in flight
+            self.stopped_at = time.monotonic()
+            raise RuntimeError("cancelled")
+        return self.executor.submit(scan)
+
+
+def test_timed_out_scan_keeps_its_lock_until_it_stops():
+    """The job lock is released only after the scan thread has finished"""
+    with tempfile.TemporaryDirectory() as directory:
+        scheduler = make_scheduler(directory)
+        scheduler.scan_worker = SlowStoppingWorker()
+        scheduler.add_job('scan', "* * * * *", lambda: scheduler.run_scan('enhanced'), timeout=0.1)
+        job = scheduler.jobs['scan']
+
+        async def execute():
+            scheduler._slots = asyncio.Semaphore(1)
+            await scheduler._execute(job, datetime.now())
+            return time.monotonic()
+
+        released_at = asyncio.run(execute())
+        assert scheduler.state.get('scan')['last_status'] == 'timed_out'
+        assert scheduler.scan_worker.stopped_at is not None
+        assert scheduler.scan_worker.stopped_at <= released_at
+        lock = scheduler._try_lock('scan')
+        assert lock is not None
+        scheduler._unlock(lock)
+        scheduler.scan_worker.executor.shutdown()
+
+
+if __name__ == "__main__":
+    test_cron_parsing()
+    test_catch_up_and_jitter_planning()
+    test_timed_out_scan_keeps_its_lock_until_it_stops()
+    print("Scheduler tests passed")
@@ -0,0 +1,93 @@
+import sys
+import os
+import sqlite3
+import tempfile
+from datetime import date
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.findings_store import FindingsStore
+
+
+def finding(resource, severity='CRITICAL', service='EC2', region='us-east-1', account='111111111111'):
+    return {'rule_id': 'EC2_SSH_OPEN_TO_WORLD', 'resource': resource, 'severity': severity,
+            'service': service, 'region': region, 'account': account}
+
+
+def test_trend_rollups():
+    """Daily and weekly rollups count open, new and resolved findings as scans land"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "findings.db")
+        store = FindingsStore(db_path)
+        store.save_scan({'scan_type': 'enhanced', 'scan_time': '2024-01-01T02:00:00',
+                         'findings': [finding('sg-a'), finding('sg-b'), finding('user-c', 'HIGH', 'IAM')]})
+        store.save_scan({'scan_type': 'enhanced', 'scan_time': '2024-01-02T02:00:00',
+                         'findings': [finding('sg-a'), finding('sg-d'), finding('user-c', 'HIGH', 'IAM')]})
+        # Another scan type does not resolve what the enhanced scans report
+        store.save_scan({'scan_type': 'production', 'scan_time': '2024-01-09T02:00:00',
+                         'findings': [finding('sg-x')]})
+        store.save_scan({'scan_type': 'enhanced', 'scan_time': '2024-01-09T03:00:00',
+                         'findings': [finding('sg-a'), finding('sg-b')]})
+
+        today = date(2024, 2, 1)
+        days = store.trend('day', today=today)
+        assert days == [
+            {'bucket': '2024-01-01', 'open': 3, 'new': 3, 'resolved': 0},
+            {'bucket': '2024-01-02', 'open': 3, 'new': 1, 'resolved': 1},
+            # sg-b reopened and sg-x appeared; sg-d and user-c were fixed
+            {'bucket': '2024-01-09', 'open': 3, 'new': 2, 'resolved': 2},
+        ]
+        weeks = store.trend('week', today=today)
+        assert [week['bucket'] for week in weeks] == ['2024-01-01', '2024-01-08']
+        assert store.trend('week', today=today, service='IAM')[-1] == \
+            {'bucket': '2024-01-08', 'open': 0, 'new': 0, 'resolved': 1}
+        assert store.open_counts()['CRITICAL'] == 3
+        assert store.open_counts()['HIGH'] == 0
+
+        # A database from before rollups existed is backfilled from its scans
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript("DROP TABLE rollups; DROP TABLE finding_lifecycle;")
+        assert FindingsStore(db_path).trend('day', today=today) == days
+
+    print("Trend rollups test passed")
+
+
+def test_partial_scans_resolve_only_what_they_covered():
+    """A single-region scan, or one with a failed account or check, leaves findings elsewhere open"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = FindingsStore(os.path.join(directory, "findings.db"))
+        store.save_scan({'scan_type': 'production', 'scan_time': '2024-01-01T02:00:00',
+                         'coverage': {'regions': ['us-east-1', 'eu-west-1']},
+                         'findings': [finding('sg-a'), finding('sg-b', region='eu-west-1')]})
+        store.save_scan({'scan_type': 'production', 'scan_time': '2024-01-02T02:00:00',
+                         'coverage': {'regions': ['us-east-1']}, 'findings': []})
+        assert store.trend('day', today=date(2024, 2, 1))[-1] == \
+            {'bucket': '2024-01-02', 'open': 1, 'new': 0, 'resolved': 1}
+
+        # The second account's AssumeRole failed, so only the first is covered
+        store.save_scan({'scan_type': 'organization', 'scan_time': '2024-01-03T02:00:00',
+                         'coverage': {'accounts': ['111111111111', '222222222222']},
+                         'findings': [finding('sg-c'), finding('sg-d', account='222222222222')]})
+        store.save_scan({'scan_type': 'organization', 'scan_time': '2024-01-04T02:00:00',
+                         'coverage': {'accounts': ['111111111111']}, 'findings': []})
+        assert store.trend('day', today=date(2024, 2, 1))[-1] == \
+            {'bucket': '2024-01-04', 'open': 2, 'new': 0, 'resolved': 1}
+        assert store.open_counts()['CRITICAL'] == 2
+
+        # The security group check failed, so its rules were not covered
+        store.save_scan({'scan_type': 'organization', 'scan_time': '2024-01-05T02:00:00',
+                         'coverage': {'accounts': ['111111111111', '222222222222'], 'rules': ['S3_PUBLIC_BUCKET']},
+                         'findings': []})
+        store.save_scan({'scan_type': 'organization', 'scan_time': '2024-01-06T02:00:00',
+                         'coverage': {'accounts': ['111111111111', '222222222222']},
+                         'findings': [finding('sg-d', account='222222222222')]})
+        assert store.trend('day', today=date(2024, 2, 1))[-2:] == [
+            {'bucket': '2024-01-05', 'open': 2, 'new': 0, 'resolved': 0},
+            {'bucket': '2024-01-06', 'open': 2, 'new': 0, 'resolved': 0},
+        ]
+
+
+if __name__ == "__main__":
+    test_trend_rollups()
+    test_partial_scans_resolve_only_what_they_covered()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+ThreatForge command line.
+
+    threatforge scan [--type enhanced|basic|production] [--region REGION] [--eval-workers N] [--alert]
+    threatforge report [--view]
+    threatforge alert
+    threatforge serve [--host HOST] [--port PORT] [--reload]
+    threatforge schedule [--config FILE]
+
+Only argparse is imported up front. Each subcommand imports its modules
+when it runs, so `threatforge report` never loads boto3 and `threatforge
+alert` never loads FastAPI.
+"""
+import argparse
+import importlib
+import os
+import sys
+
+# Allow running as `python3 threatforge.py` from anywhere
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules each subcommand needs, loaded when it runs
+COMMAND_MODULES = {
+    'scan': ['scanner.scan_worker'],
+    'report': ['utils.security_reporter', 'view_security_report'],
+    'alert': ['alerts.notifier'],
+    'serve': ['uvicorn', 'dashboard.app'],
+    'schedule': ['automation.scheduler'],
+}
+
+
+def command_modules(args):
+    """Every module a parsed command will import, scanner included"""
+    modules = list(COMMAND_MODULES[args.command])
+    if args.command == 'scan':
+        from scanner.scan_worker import SCANNERS
+        modules.append(SCANNERS[args.type].split(':')[0])
+        if args.alert:
+            modules.append('alerts.live')
+    return modules
+
+
+def cmd_scan(args):
+    from scanner.scan_worker import load_scanner
+
+    options = {}
+    if args.type == 'production':
+        options['regions'] = args.regions
+    elif args.regions:
+        print("--region only applies to production scans", file=sys.stderr)
+        return 2
+    if args.eval_workers is not None and args.type != 'basic':
+        options['eval_workers'] = args.eval_workers
+
+    scanner = load_scanner(args.type)(**options)
+    if not args.alert:
+        scanner.run_scan()
+        return 0
+
+    from alerts.live import LiveAlerter
+    from alerts.notifier import notify_latest_scan
+
+    # Critical findings are alerted while the scan runs
+    alerter = LiveAlerter().start()
+    try:
+        scanner.run_scan()
+    finally:
+        alerter.stop()
+    # Then the saved scan catches anything missed and resolves fixed findings
+    notify_latest_scan()
+    return 0
+
+
+def cmd_report(args):
+    from utils.security_reporter import write_reports
+
+    if not write_reports():
+        return 1
+    if args.view:
+        from view_security_report import display_security_report
+        print()
+        display_security_report()
+    return 0
+
+
+def cmd_alert(args):
+    from alerts.notifier import notify_latest_scan
+
+    notify_latest_scan()
+    return 0
+
+
+def cmd_serve(args):
+    import uvicorn
+
+    uvicorn.run("dashboard.app:app", host=args.host, port=args.port, reload=args.reload)
+    return 0
+
+
+def cmd_schedule(args):
+    from automation.scheduler import ScanScheduler
+
+    ScanScheduler(args.config).start_scheduler()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="threatforge", description="ThreatForge AWS security scanner")
+    # Import the subcommand's modules and exit; used by benchmarks/cli_startup_benchmark.py
+    parser.add_argument('--import-only', action='store_true', help=argparse.SUPPRESS)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help="Run a security scan and save the results")
+    scan.add_argument('--type', choices=['enhanced', 'basic', 'production'], default='enhanced')
+    scan.add_argument('--region', action='append', dest='regions', help="Region to scan (production, repeatable)")
+    scan.add_argument('--eval-workers', type=int, help="Processes for rule evaluation (0 evaluates in-process)")
+    scan.add_argument('--alert', action='store_true', help="Send alerts for critical findings as they are found")
+    scan.set_defaults(handler=cmd_scan)
+
+    report = commands.add_parser('report', help="Generate the JSON and HTML security reports")
+    report.add_argument('--view', action='store_true', help="Print the report summary afterwards")
+    report.set_defaults(handler=cmd_report)
+
+    alert = commands.add_parser('alert', help="Send alerts for the latest scan")
+    alert.set_defaults(handler=cmd_alert)
+
+    serve = commands.add_parser('serve', help="Start the dashboard")
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--reload', action='store_true')
+    serve.set_defaults(handler=cmd_serve)
+
+    schedule = commands.add_parser('schedule', help="Run scheduled scans and reports")
+    schedule.add_argument('--config', default="config/schedules.json")
+    schedule.set_defaults(handler=cmd_schedule)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.import_only:
+        for module in command_modules(args):
+            importlib.import_module(module)
+        return 0
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
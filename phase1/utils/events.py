@@ -0,0 +1,63 @@
+# utils/events.py
+"""
+In-process publish/subscribe for scan events.
+
+Scanners publish every finding the moment a check produces it, plus
+scan_started and scan_finished around each scan, on the shared `bus`.
+Anything in the same process can subscribe, so alerting no longer has to
+wait for the results file to be written.
+
+Subscribers run synchronously on the publishing thread, which is often a
+scan worker thread. They should only hand the event off (for example with
+loop.call_soon_threadsafe) and return. A subscriber that raises is logged
+and does not affect the scan. Publishing to a topic nobody subscribes to
+costs one dict lookup.
+"""
+import logging
+import threading
+
+SCAN_STARTED = 'scan_started'
+FINDING = 'finding'
+SCAN_FINISHED = 'scan_finished'
+
+
+class EventBus:
+    """Topic-based fan-out of events to callbacks"""
+
+    def __init__(self):
+        # topic -> tuple of callbacks, replaced on change so publish never locks
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic, callback):
+        """Call callback(event) for every event on topic. Returns a function that unsubscribes"""
+        with self._lock:
+            self._subscribers[topic] = self._subscribers.get(topic, ()) + (callback,)
+        return lambda: self.unsubscribe(topic, callback)
+
+    def unsubscribe(self, topic, callback):
+        with self._lock:
+            callbacks = tuple(cb for cb in self._subscribers.get(topic, ()) if cb is not callback)
+            if callbacks:
+                self._subscribers[topic] = callbacks
+            else:
+                self._subscribers.pop(topic, None)
+
+    def has_subscribers(self, topic):
+        return topic in self._subscribers
+
+    def publish(self, topic, **event):
+        """Deliver an event (keyword fields, plus 'topic') to the topic's subscribers"""
+        callbacks = self._subscribers.get(topic)
+        if not callbacks:
+            return
+        event['topic'] = topic
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception:
+                logging.exception(f"Event subscriber failed on {topic}")
+
+
+# Shared by scanners and subscribers in this process
+bus = EventBus()
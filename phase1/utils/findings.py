@@ -0,0 +1,198 @@
+# utils/findings.py
+"""
+Finding records and the rule catalogue they reference.
+
+A Finding stores only a rule ID, the affected resource and the
+resource-specific parameters for that rule. Severity, service, title,
+description and recommendation live once on the Rule and are rendered
+when the finding is serialized with to_dict().
+"""
+
+
+class Rule:
+    """A security check outcome with its shared text"""
+
+    __slots__ = ('id', 'severity', 'service', 'title', 'description', 'recommendation', 'risk_score', 'params')
+
+    def __init__(self, id, severity, service, title, description, recommendation, risk_score=None, params=()):
+        self.id = id
+        self.severity = severity
+        self.service = service
+        self.title = title
+        self.description = description  # str.format template over `params`
+        self.recommendation = recommendation
+        self.risk_score = risk_score
+        self.params = params
+
+
+RULES = {rule.id: rule for rule in (
+    Rule(
+        'S3_PUBLIC_BUCKET', 'CRITICAL', 'S3', 'Public S3 Bucket',
+        'Bucket "{bucket_name}" is publicly accessible to everyone on the internet',
+        'Immediately apply bucket policy to restrict public access. Enable S3 Block Public Access.',
+        risk_score=10, params=('bucket_name',)
+    ),
+    Rule(
+        'EC2_SSH_OPEN_TO_WORLD', 'CRITICAL', 'EC2', 'SSH Port Open to World',
+        'Security group "{group_name}" ({group_id}) allows SSH access from ANY IP address (0.0.0.0/0)',
+        'Immediately restrict SSH to specific IP ranges only. Use VPN or bastion host.',
+        risk_score=9, params=('group_name', 'group_id')
+    ),
+    Rule(
+        'EC2_RDP_OPEN_TO_WORLD', 'CRITICAL', 'EC2', 'RDP Port Open to World',
+        'Security group "{group_name}" ({group_id}) allows RDP access from ANY IP address (0.0.0.0/0)',
+        'Immediately restrict RDP to specific IP ranges only. Use VPN for remote access.',
+        risk_score=9, params=('group_name', 'group_id')
+    ),
+    Rule(
+        'EC2_ALL_PORTS_OPEN_TO_WORLD', 'CRITICAL', 'EC2', 'ALL PORTS Open to World',
+        'Security group "{group_name}" ({group_id}) allows ALL ports from ANY IP address (0.0.0.0/0)',
+        'IMMEDIATE ACTION REQUIRED: Remove this rule. Use specific port ranges only.',
+        risk_score=10, params=('group_name', 'group_id')
+    ),
+    Rule(
+        'EBS_UNENCRYPTED_VOLUME', 'MEDIUM', 'EC2', 'Unencrypted EBS Volume',
+        'EBS volume {volume_id} is not encrypted',
+        'Enable encryption for EBS volumes to protect data at rest',
+        risk_score=6, params=('volume_id',)
+    ),
+    Rule(
+        'IAM_WEAK_PASSWORD_POLICY', 'MEDIUM', 'IAM', 'Weak IAM Password Policy',
+        'Password policy has weak settings: {weak_settings}',
+        'Strengthen IAM password policy to meet security best practices',
+        risk_score=5, params=('weak_settings',)
+    ),
+    Rule(
+        'IAM_NO_PASSWORD_POLICY', 'HIGH', 'IAM', 'No IAM Password Policy',
+        'No IAM password policy configured for the account',
+        'Create an IAM password policy with strong requirements',
+        risk_score=7
+    ),
+    Rule(
+        'RDS_PUBLIC_INSTANCE', 'CRITICAL', 'RDS', 'Public RDS Instance',
+        'RDS instance {instance_id} is publicly accessible',
+        'Modify RDS instance to be private',
+        params=('instance_id',)
+    ),
+    Rule(
+        'EC2_RUNNING_INSTANCE', 'INFO', 'EC2', 'Running EC2 Instance',
+        'EC2 instance {instance_id} is running',
+        'Monitor for unnecessary running instances to save costs',
+        params=('instance_id',)
+    ),
+    Rule(
+        'IAM_ACCOUNT_INFO', 'INFO', 'IAM', 'AWS Account Information',
+        'Scanning account {account_id} as {arn}',
+        'Regular security scanning helps maintain cloud security',
+        params=('account_id', 'arn')
+    ),
+)}
+
+
+class Finding:
+    """A single finding: rule reference plus resource-specific parameters"""
+
+    __slots__ = ('rule_id', 'resource', 'params', 'region', 'account', 'timestamp')
+
+    def __init__(self, rule_id, resource, params=(), region=None, account=None, timestamp=None):
+        if rule_id not in RULES:
+            raise KeyError(f"Unknown rule: {rule_id}")
+        self.rule_id = rule_id
+        self.resource = resource
+        self.params = tuple(params)  # Values for the rule's `params`, in order
+        self.region = region
+        self.account = account
+        self.timestamp = timestamp
+
+    @property
+    def rule(self):
+        return RULES[self.rule_id]
+
+    @property
+    def severity(self):
+        return self.rule.severity
+
+    @property
+    def service(self):
+        return self.rule.service
+
+    @property
+    def title(self):
+        return self.rule.title
+
+    @property
+    def recommendation(self):
+        return self.rule.recommendation
+
+    @property
+    def risk_score(self):
+        return self.rule.risk_score
+
+    @property
+    def description(self):
+        rule = self.rule
+        return rule.description.format(**dict(zip(rule.params, self.params)))
+
+    def to_dict(self):
+        """Render the finding in the scan document format"""
+        rule = self.rule
+        data = {
+            'rule_id': self.rule_id,
+            'severity': rule.severity,
+            'service': rule.service,
+            'resource': self.resource,
+            'title': rule.title,
+            'description': self.description,
+            'recommendation': rule.recommendation,
+            'timestamp': self.timestamp
+        }
+        if rule.risk_score is not None:
+            data['risk_score'] = rule.risk_score
+        if self.region is not None:
+            data['region'] = self.region
+        if self.account is not None:
+            data['account'] = self.account
+        if rule.params:
+            data['params'] = dict(zip(rule.params, self.params))
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a Finding from its serialized form. Returns None for legacy findings without a known rule"""
+        rule = RULES.get(data.get('rule_id'))
+        if rule is None:
+            return None
+        params = data.get('params') or {}
+        return cls(
+            rule.id,
+            data.get('resource'),
+            params=[params.get(name) for name in rule.params],
+            region=data.get('region'),
+            account=data.get('account'),
+            timestamp=data.get('timestamp')
+        )
+
+    def __repr__(self):
+        return f"Finding({self.rule_id!r}, {self.resource!r})"
+
+
+def rule_description(data):
+    """Description of a serialized finding rendered from its rule and params, or None without a known rule"""
+    rule = RULES.get(data.get('rule_id'))
+    if rule is None:
+        return None
+    params = data.get('params') or {}
+    return rule.description.format(**{name: params.get(name) for name in rule.params})
+
+
+def as_dict(finding):
+    """Serialized form of a finding that may be a Finding or an already rendered dict"""
+    return finding.to_dict() if isinstance(finding, Finding) else finding
+
+
+def field_value(finding, field, default=None):
+    """Read one field from a Finding or a rendered dict without rendering the whole finding"""
+    if isinstance(finding, Finding):
+        value = getattr(finding, field, None)
+        return default if value is None else value
+    return finding.get(field, default)
@@ -0,0 +1,691 @@
+# utils/findings_store.py
+"""
+Indexed findings store backed by SQLite.
+
+Every scan is written once through persist_scan(), which saves the compact
+results file (see utils/results_format.py) and indexes it here. Dashboard endpoints,
+reports and alerts then query indexed tables instead of globbing results/
+and parsing every JSON file on every request. Severity totals are
+maintained at write time so metrics lookups cost the same regardless of
+how much scan history is kept.
+
+Each saved scan also updates daily and weekly trend rollups of open, new and
+resolved findings per account, region, service and severity (see
+_update_rollups). trend() reads history from those rollups without touching
+raw findings.
+"""
+import base64
+import binascii
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from utils.findings import as_dict, field_value
+from utils.results_format import load_scan_results, results_files, write_scan_results
+
+DEFAULT_DB_PATH = "results/findings.db"
+
+SEVERITIES = ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW', 'INFO')
+
+# Finding keys stored in their own columns; anything else goes in `extra`
+FINDING_COLUMNS = (
+    'severity', 'service', 'region', 'account', 'resource', 'title',
+    'description', 'recommendation', 'risk_score', 'timestamp', 'rule_id'
+)
+
+# Fields that identify the same finding across scans
+IDENTITY_FIELDS = ('account', 'region', 'resource')
+
+# Keys of a scan's 'coverage' and the columns they restrict. Rules are read
+# from the fingerprint, which starts with the rule ID (see finding_key()).
+COVERAGE_DIMENSIONS = (
+    ('accounts', 'account'),
+    ('regions', 'region'),
+    ('rules', "substr(fingerprint, 1, instr(fingerprint, '|') - 1)"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT UNIQUE,
+    path TEXT,
+    scan_type TEXT,
+    scan_time TEXT,
+    created_at TEXT NOT NULL,
+    total_findings INTEGER NOT NULL DEFAULT 0,
+    critical INTEGER NOT NULL DEFAULT 0,
+    high INTEGER NOT NULL DEFAULT 0,
+    medium INTEGER NOT NULL DEFAULT 0,
+    low INTEGER NOT NULL DEFAULT 0,
+    info INTEGER NOT NULL DEFAULT 0,
+    metadata TEXT
+);
+
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_id INTEGER NOT NULL REFERENCES scans(id),
+    severity TEXT NOT NULL,
+    service TEXT,
+    region TEXT,
+    account TEXT,
+    resource TEXT,
+    title TEXT,
+    description TEXT,
+    recommendation TEXT,
+    risk_score INTEGER,
+    timestamp TEXT,
+    rule_id TEXT,
+    extra TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_findings_scan ON findings(scan_id);
+CREATE INDEX IF NOT EXISTS idx_findings_severity ON findings(severity, scan_id);
+CREATE INDEX IF NOT EXISTS idx_findings_service ON findings(service, scan_id);
+CREATE INDEX IF NOT EXISTS idx_findings_region ON findings(region, scan_id);
+CREATE INDEX IF NOT EXISTS idx_findings_resource_scan ON findings(resource, scan_id);
+CREATE INDEX IF NOT EXISTS idx_findings_account ON findings(account, scan_id);
+CREATE INDEX IF NOT EXISTS idx_scans_scan_time ON scans(scan_time);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS alert_fingerprints (
+    fingerprint TEXT PRIMARY KEY,
+    scan_type TEXT,
+    account TEXT NOT NULL DEFAULT '',
+    region TEXT NOT NULL DEFAULT '',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    last_alerted TEXT,
+    resolved_at TEXT,
+    times_reopened INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_alert_fingerprints_open ON alert_fingerprints(scan_type, resolved_at);
+
+CREATE TABLE IF NOT EXISTS finding_lifecycle (
+    fingerprint TEXT PRIMARY KEY,
+    scan_type TEXT,
+    account TEXT NOT NULL,
+    region TEXT NOT NULL,
+    service TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    last_scan_id INTEGER NOT NULL,
+    opened_scan_id INTEGER NOT NULL,
+    resolved_at TEXT,
+    resolved_scan_id INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_finding_lifecycle_open ON finding_lifecycle(resolved_at, scan_type);
+CREATE INDEX IF NOT EXISTS idx_finding_lifecycle_opened ON finding_lifecycle(opened_scan_id);
+CREATE INDEX IF NOT EXISTS idx_finding_lifecycle_resolved ON finding_lifecycle(resolved_scan_id);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    account TEXT NOT NULL,
+    region TEXT NOT NULL,
+    service TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    open_count INTEGER NOT NULL DEFAULT 0,
+    new_count INTEGER NOT NULL DEFAULT 0,
+    resolved_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, bucket, account, region, service, severity)
+);
+"""
+
+# Rollup periods and the first day of the bucket a date falls in ('week' buckets start on Monday)
+ROLLUP_PERIODS = {
+    'day': lambda day: day,
+    'week': lambda day: day - timedelta(days=day.weekday()),
+}
+
+# Dimensions rollups are kept by, in rollups primary key order
+ROLLUP_DIMENSIONS = ('account', 'region', 'service', 'severity')
+
+# Largest page query_findings() returns
+MAX_PAGE_SIZE = 1000
+
+# Fingerprints looked up per query, under SQLite's bound-parameter limit
+FINGERPRINT_CHUNK = 500
+
+
+class FindingsStore:
+    """Persistence API for scan results"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            has_rollups = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'"
+            ).fetchone() is not None
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            if not has_rollups:
+                # Databases from before rollups existed: replay their scans once
+                for row in conn.execute("SELECT id, scan_type, scan_time, metadata FROM scans ORDER BY id").fetchall():
+                    metadata = json.loads(row['metadata']) if row['metadata'] else {}
+                    self._update_rollups(conn, row['id'], row['scan_type'], row['scan_time'], metadata.get('coverage'))
+
+    def _migrate(self, conn):
+        """Add columns introduced after a database was first created, and drop retired indexes"""
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_findings_resource'"
+        ).fetchone() is not None:
+            # Superseded by idx_findings_resource_scan
+            conn.execute("DROP INDEX idx_findings_resource")
+
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(findings)")}
+        if 'rule_id' not in columns:
+            conn.execute("ALTER TABLE findings ADD COLUMN rule_id TEXT")
+
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(alert_fingerprints)")}
+        if 'account' not in columns:
+            conn.execute("ALTER TABLE alert_fingerprints ADD COLUMN account TEXT NOT NULL DEFAULT ''")
+            conn.execute("ALTER TABLE alert_fingerprints ADD COLUMN region TEXT NOT NULL DEFAULT ''")
+            rows = conn.execute("SELECT fingerprint FROM alert_fingerprints").fetchall()
+            conn.executemany(
+                "UPDATE alert_fingerprints SET account = ?, region = ? WHERE fingerprint = ?",
+                (key_location(row['fingerprint']) + (row['fingerprint'],) for row in rows)
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save_scan(self, scan_data, filename=None, path=None):
+        """Index a scan document and update the running counters. Returns the scan ID"""
+        findings = scan_data.get('findings', [])
+        severity_count = dict.fromkeys(SEVERITIES, 0)
+        for finding in findings:
+            severity = field_value(finding, 'severity', 'INFO')
+            severity_count[severity] = severity_count.get(severity, 0) + 1
+
+        metadata = {
+            key: value for key, value in scan_data.items()
+            if key not in ('findings', 'scan_time', 'scan_type', 'total_findings')
+        }
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """INSERT INTO scans (filename, path, scan_type, scan_time, created_at, total_findings,
+                                      critical, high, medium, low, info, metadata)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    filename, str(path) if path else None,
+                    scan_data.get('scan_type'), scan_data.get('scan_time'),
+                    datetime.utcnow().isoformat(), len(findings),
+                    severity_count['CRITICAL'], severity_count['HIGH'], severity_count['MEDIUM'],
+                    severity_count['LOW'], severity_count['INFO'],
+                    json.dumps(metadata) if metadata else None
+                )
+            )
+            scan_id = cursor.lastrowid
+
+            conn.executemany(
+                """INSERT INTO findings (scan_id, severity, service, region, account, resource, title,
+                                         description, recommendation, risk_score, timestamp, rule_id, extra)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (self._finding_row(scan_id, finding) for finding in findings)
+            )
+
+            self._update_rollups(
+                conn, scan_id, scan_data.get('scan_type'), scan_data.get('scan_time'), scan_data.get('coverage')
+            )
+
+            counter_updates = [('scans', 1)] + [(severity, count) for severity, count in severity_count.items() if count]
+            conn.executemany(
+                """INSERT INTO counters (name, value) VALUES (?, ?)
+                   ON CONFLICT(name) DO UPDATE SET value = value + excluded.value""",
+                counter_updates
+            )
+
+        return scan_id
+
+    def _finding_row(self, scan_id, finding):
+        finding = as_dict(finding)
+        extra = {key: value for key, value in finding.items() if key not in FINDING_COLUMNS}
+        return (scan_id,) + tuple(finding.get(column) for column in FINDING_COLUMNS) + (
+            json.dumps(extra) if extra else None,
+        )
+
+    def _update_rollups(self, conn, scan_id, scan_type, scan_time, coverage=None):
+        """Fold a newly inserted scan into the finding lifecycle and the trend rollups
+
+        A finding is new when it was not open before this scan, and resolved
+        when an earlier scan of the same type reported it and this one,
+        although it covered the finding's account, region and rule, does not.
+        coverage is the scan document's 'coverage' (see coverage_clause()).
+        The work is proportional to the size of this scan and of the open
+        set, never to the scan history.
+        """
+        try:
+            seen_at = datetime.fromisoformat(scan_time)
+        except (TypeError, ValueError):
+            seen_at = datetime.utcnow()
+        seen_text = seen_at.isoformat()
+
+        rows = conn.execute(
+            "SELECT rule_id, title, account, region, resource, service, severity FROM findings WHERE scan_id = ?",
+            (scan_id,)
+        )
+        conn.executemany(
+            """INSERT INTO finding_lifecycle (fingerprint, scan_type, account, region, service, severity,
+                                              first_seen, last_seen, last_scan_id, opened_scan_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(fingerprint) DO UPDATE SET
+                   scan_type = excluded.scan_type, account = excluded.account, region = excluded.region,
+                   service = excluded.service, severity = excluded.severity, last_seen = excluded.last_seen,
+                   last_scan_id = excluded.last_scan_id,
+                   opened_scan_id = CASE WHEN resolved_at IS NULL THEN opened_scan_id ELSE excluded.opened_scan_id END,
+                   resolved_at = NULL, resolved_scan_id = NULL""",
+            (
+                (finding_key(dict(row)), scan_type) + tuple(row[dimension] or '' for dimension in ROLLUP_DIMENSIONS)
+                + (seen_text, seen_text, scan_id, scan_id)
+                for row in rows
+            )
+        )
+        covered, covered_params = coverage_clause(coverage)
+        conn.execute(
+            f"""UPDATE finding_lifecycle SET resolved_at = ?, resolved_scan_id = ?
+                WHERE resolved_at IS NULL AND scan_type IS ? AND last_scan_id != ?{covered}""",
+            [seen_text, scan_id, scan_type, scan_id] + covered_params
+        )
+
+        dimensions = ", ".join(ROLLUP_DIMENSIONS)
+        changes = {}  # dimension values -> [open, new, resolved]
+        for index, query in enumerate((
+            f"SELECT {dimensions}, COUNT(*) FROM finding_lifecycle WHERE resolved_at IS NULL GROUP BY {dimensions}",
+            f"SELECT {dimensions}, COUNT(*) FROM finding_lifecycle WHERE opened_scan_id = ? GROUP BY {dimensions}",
+            f"SELECT {dimensions}, COUNT(*) FROM finding_lifecycle WHERE resolved_scan_id = ? GROUP BY {dimensions}",
+        )):
+            for row in conn.execute(query, () if index == 0 else (scan_id,)):
+                changes.setdefault(tuple(row)[:-1], [0, 0, 0])[index] = row[-1]
+
+        # open_count is the open set as of the bucket's latest scan; new and resolved add up
+        conn.executemany(
+            f"""INSERT INTO rollups (period, bucket, {dimensions}, open_count, new_count, resolved_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(period, bucket, {dimensions}) DO UPDATE SET
+                    open_count = excluded.open_count,
+                    new_count = new_count + excluded.new_count,
+                    resolved_count = resolved_count + excluded.resolved_count""",
+            (
+                (period, bucket_start(seen_at.date()).isoformat()) + key + tuple(counts)
+                for period, bucket_start in ROLLUP_PERIODS.items()
+                for key, counts in changes.items()
+            )
+        )
+
+    def trend(self, period='week', months=12, account=None, region=None, service=None, severity=None, today=None):
+        """Open, new and resolved findings per day or week bucket, oldest first
+
+        Buckets without a scan are left out. Filters narrow the history to
+        one account, region, service and/or severity.
+        """
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown trend period: {period}")
+        since = ROLLUP_PERIODS[period]((today or datetime.utcnow().date()) - timedelta(days=round(months * 365 / 12)))
+
+        query = """SELECT bucket, SUM(open_count) AS open, SUM(new_count) AS new, SUM(resolved_count) AS resolved
+                   FROM rollups WHERE period = ? AND bucket >= ?"""
+        params = [period, since.isoformat()]
+        for dimension, value in zip(ROLLUP_DIMENSIONS, (account, region, service, severity)):
+            if value is not None:
+                query += f" AND {dimension} = ?"
+                params.append(value)
+        query += " GROUP BY bucket ORDER BY bucket"
+
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def open_counts(self):
+        """Findings currently open per severity, each counted once however many scans report it"""
+        totals = dict.fromkeys(SEVERITIES, 0)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT severity, COUNT(*) AS count FROM finding_lifecycle WHERE resolved_at IS NULL GROUP BY severity"
+            )
+            totals.update({row['severity']: row['count'] for row in rows})
+        return totals
+
+    def counters(self):
+        """Return the running totals: scan count plus findings per severity"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name, value FROM counters").fetchall()
+        totals = {'scans': 0}
+        totals.update(dict.fromkeys(SEVERITIES, 0))
+        totals.update({row['name']: row['value'] for row in rows})
+        return totals
+
+    def version(self):
+        """(ID, created_at) of the newest scan, or (0, None); changes whenever a scan is saved"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT id, created_at FROM scans ORDER BY id DESC LIMIT 1").fetchone()
+        return (row['id'], row['created_at']) if row else (0, None)
+
+    def latest_scan(self, scan_type=None):
+        """Return the most recent scan row as a dict, or None"""
+        scans = self.recent_scans(limit=1, scan_type=scan_type)
+        return scans[0] if scans else None
+
+    def recent_scans(self, limit=5, scan_type=None):
+        """Return the most recent scan rows, newest first"""
+        query = "SELECT * FROM scans"
+        params = []
+        if scan_type:
+            query += " WHERE scan_type = ?"
+            params.append(scan_type)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        with self._connect() as conn:
+            return [self._scan_dict(row) for row in conn.execute(query, params)]
+
+    def latest_scans_by_type(self):
+        """Return the newest scan row of every scan type, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM scans WHERE id IN (SELECT MAX(id) FROM scans GROUP BY scan_type) ORDER BY id"
+            )
+            return [self._scan_dict(row) for row in rows]
+
+    def scans_since(self, scan_id):
+        """Return scan rows written after scan_id, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM scans WHERE id > ? ORDER BY id", (scan_id,))
+            return [self._scan_dict(row) for row in rows]
+
+    def _scan_dict(self, row):
+        scan = dict(row)
+        metadata = scan.pop('metadata')
+        scan['metadata'] = json.loads(metadata) if metadata else {}
+        return scan
+
+    def iter_findings(self, scan_id, severity=None, by_service=False):
+        """Yield the findings of a scan as dicts, in the order they were written
+
+        With by_service they are grouped by service first; SQLite does the
+        sorting, so memory stays flat however many findings there are.
+        """
+        query = "SELECT * FROM findings WHERE scan_id = ?"
+        params = [scan_id]
+        if severity:
+            query += " AND severity = ?"
+            params.append(severity)
+        query += " ORDER BY service, id" if by_service else " ORDER BY id"
+
+        with self._connect() as conn:
+            for row in conn.execute(query, params):
+                yield self._finding_dict(row)
+
+    def query_findings(self, severity=None, service=None, region=None, account=None, resource_prefix=None,
+                       since=None, until=None, scan_id=None, fields=None, limit=100, cursor=None):
+        """One page of findings across scans, newest first, filtered in SQL
+
+        Returns {'findings': [...], 'next_cursor': str or None}. Pass
+        next_cursor back to get the following page; pages stay stable while
+        new scans are written. since and until bound the scan time
+        (until is exclusive). fields limits each finding to those keys;
+        'id' and 'scan_id' are always included. Each filter maps to an index
+        already ordered by scan, so a page costs the same however much
+        history is kept. A resource prefix sorts the matching index entries
+        (never whole rows), so broad prefixes cost more than exact resources.
+        """
+        conditions, params = [], []
+        for column, value in (('severity', severity), ('service', service), ('region', region), ('account', account)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if resource_prefix:
+            # A range rather than LIKE, so idx_findings_resource_scan is usable
+            conditions.append("resource >= ? AND resource < ?")
+            params.extend([resource_prefix, resource_prefix + '\U0010ffff'])
+        if scan_id is not None:
+            conditions.append("scan_id = ?")
+            params.append(scan_id)
+        if since or until:
+            scan_conditions, scan_params = [], []
+            if since:
+                scan_conditions.append("scan_time >= ?")
+                scan_params.append(since)
+            if until:
+                scan_conditions.append("scan_time < ?")
+                scan_params.append(until)
+            conditions.append(f"scan_id IN (SELECT id FROM scans WHERE {' AND '.join(scan_conditions)})")
+            params.extend(scan_params)
+        if cursor:
+            conditions.append("(scan_id, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        # The page is picked from index entries alone; only its rows are read
+        page = "SELECT id FROM findings"
+        if conditions:
+            page += " WHERE " + " AND ".join(conditions)
+        page += " ORDER BY scan_id DESC, id DESC LIMIT ?"
+        query = f"SELECT * FROM findings WHERE id IN ({page}) ORDER BY scan_id DESC, id DESC"
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['scan_id'], rows[-1]['id'])
+
+        findings = []
+        for row in rows:
+            finding = self._finding_dict(row)
+            if fields:
+                finding = {field: finding[field] for field in fields if field in finding}
+            finding['id'] = row['id']
+            finding['scan_id'] = row['scan_id']
+            findings.append(finding)
+        return {'findings': findings, 'next_cursor': next_cursor}
+
+    def _finding_dict(self, row):
+        finding = {}
+        for column in FINDING_COLUMNS:
+            value = row[column]
+            if value is not None:
+                finding[column] = value
+        if row['extra']:
+            finding.update(json.loads(row['extra']))
+        return finding
+
+    def load_scan(self, scan):
+        """Rebuild the scan document for a scan row (or scan ID)"""
+        if not isinstance(scan, dict):
+            with self._connect() as conn:
+                row = conn.execute("SELECT * FROM scans WHERE id = ?", (scan,)).fetchone()
+            if row is None:
+                return None
+            scan = self._scan_dict(row)
+
+        scan_data = dict(scan['metadata'])
+        scan_data.update({
+            'scan_time': scan['scan_time'],
+            'findings': list(self.iter_findings(scan['id'])),
+            'total_findings': scan['total_findings'],
+            'scan_type': scan['scan_type']
+        })
+        return scan_data
+
+    def track_fingerprints(self, fingerprints, scan_type=None, reminder_interval=None, now=None, resolve=True,
+                           coverage=None):
+        """Record the alerting findings of a new scan and return the ones that need an alert
+
+        fingerprints are finding_key() values. Returns {fingerprint: reason},
+        where reason is 'new', 'reopened' (resolved earlier and now back) or
+        'reminder' (still open and last alerted more than reminder_interval,
+        a timedelta, ago). Open fingerprints of the same scan type, inside
+        the scan's coverage (see coverage_clause()), that this scan no longer
+        reports are marked resolved, unless resolve is False because
+        fingerprints are only part of a scan still in progress. Call
+        mark_alerted() once the alert is delivered; until then a fingerprint
+        keeps coming back as needing one.
+        """
+        now = now or datetime.utcnow()
+        now_text = now.isoformat()
+        remind_before = (now - reminder_interval).isoformat() if reminder_interval else None
+        fingerprints = list(dict.fromkeys(fingerprints))
+        due = {}
+
+        with self._connect() as conn:
+            known = {}
+            for start in range(0, len(fingerprints), FINGERPRINT_CHUNK):
+                chunk = fingerprints[start:start + FINGERPRINT_CHUNK]
+                rows = conn.execute(
+                    f"SELECT * FROM alert_fingerprints WHERE fingerprint IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                known.update((row['fingerprint'], row) for row in rows)
+
+            new_rows, reopened, seen = [], [], []
+            for fingerprint in fingerprints:
+                row = known.get(fingerprint)
+                if row is None:
+                    new_rows.append((fingerprint, scan_type) + key_location(fingerprint) + (now_text, now_text))
+                    due[fingerprint] = 'new'
+                    continue
+
+                if row['resolved_at'] is not None:
+                    reopened.append((scan_type, now_text, fingerprint))
+                    due[fingerprint] = 'reopened'
+                    continue
+
+                seen.append((scan_type, now_text, fingerprint))
+                if row['last_alerted'] is None:
+                    # The earlier alert was never delivered
+                    due[fingerprint] = 'reopened' if row['times_reopened'] else 'new'
+                elif remind_before and row['last_alerted'] <= remind_before:
+                    due[fingerprint] = 'reminder'
+
+            conn.executemany(
+                """INSERT INTO alert_fingerprints (fingerprint, scan_type, account, region, first_seen, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                new_rows
+            )
+            conn.executemany(
+                """UPDATE alert_fingerprints
+                   SET scan_type = ?, last_seen = ?, last_alerted = NULL, resolved_at = NULL,
+                       times_reopened = times_reopened + 1
+                   WHERE fingerprint = ?""",
+                reopened
+            )
+            conn.executemany(
+                "UPDATE alert_fingerprints SET scan_type = ?, last_seen = ? WHERE fingerprint = ?",
+                seen
+            )
+            if resolve:
+                covered, covered_params = coverage_clause(coverage)
+                conn.execute(
+                    f"""UPDATE alert_fingerprints SET resolved_at = ?
+                        WHERE scan_type IS ? AND resolved_at IS NULL AND last_seen < ?{covered}""",
+                    [now_text, scan_type, now_text] + covered_params
+                )
+
+        return due
+
+    def mark_alerted(self, fingerprints, now=None):
+        """Record that an alert covering these fingerprints was delivered"""
+        now_text = (now or datetime.utcnow()).isoformat()
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE alert_fingerprints SET last_alerted = ? WHERE fingerprint = ?",
+                ((now_text, fingerprint) for fingerprint in fingerprints)
+            )
+
+    def import_results_dir(self, results_dir):
+        """Index scan files written before the store existed. Returns the number imported"""
+        with self._connect() as conn:
+            known = {row['filename'] for row in conn.execute("SELECT filename FROM scans")}
+
+        scan_files = [path for path in results_files(results_dir) if path.name not in known]
+        scan_files.sort(key=os.path.getmtime)
+
+        imported = 0
+        for path in scan_files:
+            try:
+                scan_data = load_scan_results(path)
+            except (OSError, EOFError, ValueError):
+                continue
+            if not isinstance(scan_data, dict) or 'findings' not in scan_data:
+                continue
+            self.save_scan(scan_data, filename=path.name, path=path)
+            imported += 1
+        return imported
+
+
+def finding_key(finding):
+    """Stable identity of a finding across scans: rule, account, region and resource"""
+    rule = finding.get('rule_id') or finding.get('title') or ''
+    return "|".join([rule] + [str(finding.get(field) or '') for field in IDENTITY_FIELDS])
+
+
+def key_location(fingerprint):
+    """(account, region) of a finding_key() value"""
+    parts = fingerprint.split("|", 3)
+    return (parts[1], parts[2]) if len(parts) == 4 else ('', '')
+
+
+def coverage_clause(coverage):
+    """SQL conditions (and their params) matching only rows inside a scan's coverage
+
+    coverage holds optional 'accounts', 'regions' and 'rules' lists: the
+    accounts, regions and rules a scan checked completely. A missing list
+    means the scan was not limited in that dimension. Returns a string of
+    " AND ..." conditions against account, region and fingerprint columns.
+    """
+    conditions, params = "", []
+    for key, column in COVERAGE_DIMENSIONS:
+        values = (coverage or {}).get(key)
+        if values is not None:
+            # One JSON parameter, however many accounts a scan covered
+            conditions += f" AND {column} IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps([str(value) for value in values]))
+    return conditions, params
+
+
+def encode_cursor(scan_id, finding_id):
+    """Opaque pagination cursor for the position after a finding"""
+    return base64.urlsafe_b64encode(f"{scan_id}:{finding_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(scan_id, finding_id) from a cursor; ValueError if it was not made by encode_cursor()"""
+    try:
+        text = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        scan_id, finding_id = text.split(':')
+        return int(scan_id), int(finding_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def persist_scan(scan_data, filename, db_path=DEFAULT_DB_PATH):
+    """Write a scan document to disk and index it in the findings store"""
+    path = Path(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    write_scan_results(path, scan_data)
+
+    FindingsStore(db_path).save_scan(scan_data, filename=path.name, path=path)
+    return path
@@ -0,0 +1,221 @@
+# utils/html_report.py
+"""
+Streaming, paginated HTML security report.
+
+HTMLReportWriter writes the report to disk as findings arrive, one <div>
+at a time, so rendering memory does not grow with the number of findings.
+Every value is HTML-escaped.
+
+Each service's critical findings, and the recommendations, go on the index
+page up to page_size entries. Anything beyond that continues on numbered
+pages in a "<report name>_pages" directory next to the index, linked from
+the index and from each other. A report of any size therefore opens
+quickly in a browser.
+
+write_html_report() renders straight from the FindingsStore;
+generate_html_report() in utils/security_reporter.py renders a report dict
+that is already in memory.
+"""
+import re
+import shutil
+from datetime import datetime
+from html import escape
+from itertools import groupby
+from pathlib import Path
+
+from utils.report_aggregator import DETAIL_SEVERITIES, ReportAggregator, recommendation_for
+
+DEFAULT_PAGE_SIZE = 500
+
+STYLE = """
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        .header { background: #2c3e50; color: white; padding: 20px; border-radius: 5px; }
+        .critical { color: #e74c3c; font-weight: bold; }
+        .high { color: #e67e22; }
+        .medium { color: #f39c12; }
+        .finding { border-left: 4px solid; padding: 10px; margin: 10px 0; background: #f8f9fa; }
+        .recommendation { background: #e8f4fd; padding: 15px; margin: 10px 0; border-radius: 5px; }
+        .pages a { margin-right: 8px; }
+"""
+
+
+def _text(value):
+    return escape('' if value is None else str(value))
+
+
+def _head(title):
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{_text(title)}</title>
+    <style>{STYLE}    </style>
+</head>
+<body>
+"""
+
+
+def finding_html(finding):
+    return f"""<div class="finding">
+    <strong>{_text(finding.get('title'))}</strong>
+    <p>Resource: {_text(finding.get('resource'))}</p>
+    <p>{_text(finding.get('description'))}</p>
+    <p><em>Recommendation: {_text(finding.get('recommendation'))}</em></p>
+</div>
+"""
+
+
+def recommendation_html(rec):
+    return f"""<div class="recommendation">
+    <strong>{_text(rec['priority'])} Priority: {_text(rec['action'])}</strong>
+    <p>{_text(rec['description'])}</p>
+    <p>Impact: {_text(rec['impact'])}</p>
+</div>
+"""
+
+
+def _slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', str(name).lower()).strip('-') or 'other'
+
+
+class HTMLReportWriter:
+    """Writes the HTML report incrementally, paginating long sections"""
+
+    def __init__(self, output_file, page_size=DEFAULT_PAGE_SIZE):
+        self.output_file = Path(output_file)
+        self.page_size = max(1, page_size)
+        self.pages_dir = self.output_file.with_name(self.output_file.stem + "_pages")
+        self.pages_written = 0
+
+    def write(self, header, critical_findings, recommendations):
+        """Render the report
+
+        header holds report_generated, executive_summary and risk_assessment.
+        critical_findings yields (service, finding dict) pairs grouped by
+        service; recommendations yields recommendation dicts. Both are
+        consumed once, as they are written.
+        """
+        # Continuation pages from an earlier, longer report would be left dangling
+        if self.pages_dir.exists():
+            shutil.rmtree(self.pages_dir)
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        summary = header['executive_summary']
+        risk = header['risk_assessment']
+        with open(self.output_file, 'w', encoding='utf-8') as index:
+            index.write(_head("ThreatForge Security Report"))
+            index.write(f"""<div class="header">
+    <h1>ThreatForge Security Assessment Report</h1>
+    <p>Generated: {_text(header['report_generated'])}</p>
+</div>
+
+<h2>Executive Summary</h2>
+<p>Total Findings: {_text(summary['total_findings'])}</p>
+<p class="critical">Critical: {_text(summary['critical_findings'])}</p>
+<p class="high">High: {_text(summary['high_findings'])}</p>
+<p class="medium">Medium: {_text(summary['medium_findings'])}</p>
+
+<h2>Critical Findings</h2>
+""")
+            for service, group in groupby(critical_findings, key=lambda item: item[0]):
+                index.write(f"<h3>{_text(service)}</h3>\n")
+                self._write_section(index, f"critical-{_slug(service)}", f"Critical Findings: {service}",
+                                    (finding for _, finding in group), finding_html)
+
+            index.write("\n<h2>Recommendations</h2>\n")
+            self._write_section(index, "recommendations", "Recommendations", recommendations, recommendation_html)
+
+            index.write(f"""
+<h2>Risk Assessment</h2>
+<p>Risk Score: {_text(risk['risk_score'])}/100</p>
+<p>Risk Level: {_text(risk['risk_level'])}</p>
+<p>Compliance Status: {_text(risk['compliance_status'])}</p>
+</body>
+</html>
+""")
+        return self.output_file
+
+    def _write_section(self, index, name, title, items, render):
+        """Write the first page_size items into the index and the rest onto continuation pages"""
+        items = iter(items)
+        written = 0
+        for item in items:
+            index.write(render(item))
+            written += 1
+            if written == self.page_size:
+                break
+        else:
+            return
+
+        pages = self._write_pages(name, title, items, render)
+        if pages:
+            links = " ".join(f'<a href="{self._page_href(name, number)}">{number}</a>' for number in pages)
+            index.write(f'<p class="pages">More pages: {links}</p>\n')
+
+    def _write_pages(self, name, title, items, render):
+        """Stream the remaining items onto pages 2, 3, ...; returns the page numbers written"""
+        numbers = []
+        page = None
+        count = 0
+        try:
+            for item in items:
+                if page is None or count == self.page_size:
+                    number = len(numbers) + 2
+                    if page is not None:
+                        self._close_page(page, name, number - 1, has_next=True)
+                    page = self._open_page(name, title, number)
+                    numbers.append(number)
+                    count = 0
+                page.write(render(item))
+                count += 1
+        finally:
+            if page is not None:
+                self._close_page(page, name, numbers[-1], has_next=False)
+        return numbers
+
+    def _page_href(self, name, number):
+        return f"{self.pages_dir.name}/{name}-{number}.html"
+
+    def _open_page(self, name, title, number):
+        self.pages_dir.mkdir(parents=True, exist_ok=True)
+        page = open(self.pages_dir / f"{name}-{number}.html", 'w', encoding='utf-8')
+        self.pages_written += 1
+        page.write(_head(f"ThreatForge Security Report - {title} ({number})"))
+        page.write(f"<h2>{_text(title)} - page {number}</h2>\n{self._nav(name, number, has_next=False)}")
+        return page
+
+    def _close_page(self, page, name, number, has_next):
+        page.write(self._nav(name, number, has_next))
+        page.write("</body>\n</html>\n")
+        page.close()
+
+    def _nav(self, name, number, has_next):
+        previous = f"{name}-{number - 1}.html" if number > 2 else f"../{self.output_file.name}"
+        links = [f'<a href="{previous}">Previous</a>', f'<a href="../{self.output_file.name}">Report</a>']
+        if has_next:
+            links.append(f'<a href="{name}-{number + 1}.html">Next</a>')
+        return f'<p class="pages">{" ".join(links)}</p>\n'
+
+
+def iter_store_recommendations(store, scan_id):
+    """Recommendations for a stored scan, critical first, without collecting them"""
+    for severity in DETAIL_SEVERITIES:
+        for finding in store.iter_findings(scan_id, severity=severity):
+            recommendation = recommendation_for(severity, finding.get('title'), finding.get('resource'))
+            if recommendation is not None:
+                yield recommendation
+
+
+def write_html_report(store, scan, output_file, page_size=DEFAULT_PAGE_SIZE, report_generated=None):
+    """Render the HTML report for a FindingsStore scan row, streaming findings from the store"""
+    aggregator = ReportAggregator.from_scan(scan)
+    header = {
+        "report_generated": report_generated or datetime.utcnow().isoformat(),
+        "executive_summary": aggregator.executive_summary(),
+        "risk_assessment": aggregator.risk_assessment()
+    }
+    critical = (
+        (finding.get('service'), finding)
+        for finding in store.iter_findings(scan['id'], severity='CRITICAL', by_service=True)
+    )
+    return HTMLReportWriter(output_file, page_size).write(header, critical, iter_store_recommendations(store, scan['id']))
@@ -0,0 +1,304 @@
+# utils/metrics.py
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are updated on hot paths (every AWS API call,
+every finding), so an update is one dict lookup and an add under a
+per-metric lock. Nothing is formatted until render() runs at scrape time.
+Gauges that describe current state, such as store size or WebSocket
+queues, are collected by callbacks only when metrics are scraped.
+
+What is instrumented:
+- AWS API calls, through botocore event hooks on each scanner session
+  (instrument_session)
+- per-check scan durations (time_check)
+- findings, through the scan event bus (watch_scan_events)
+- HTTP routes and dashboard state, registered by dashboard/app.py
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from utils.events import FINDING, SCAN_FINISHED, SCAN_STARTED, bus
+from utils.findings import field_value
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; suits both single API calls and whole checks
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Error codes AWS services use to throttle callers
+THROTTLE_CODES = frozenset((
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException', 'RequestLimitExceeded',
+    'RequestThrottled', 'SlowDown', 'BandwidthLimitExceeded', 'EC2ThrottledException',
+    'PriorRequestNotComplete', 'LimitExceededException',
+))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """A monotonically increasing count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield self.name, _label_text(self.labels, label_values), value
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label set"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = [(label_values, list(values)) for label_values, values in self._series.items()]
+        for label_values, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                yield f"{self.name}_bucket", _label_text(self.labels, label_values, [('le', _format_value(bound))]), cumulative
+            cumulative += values[len(self.buckets)]
+            yield f"{self.name}_bucket", _label_text(self.labels, label_values, [('le', '+Inf')]), cumulative
+            yield f"{self.name}_sum", _label_text(self.labels, label_values), values[-1]
+            yield f"{self.name}_count", _label_text(self.labels, label_values), cumulative
+
+
+class Gauge:
+    """A current value read from a callback at scrape time
+
+    The callback returns a number, or {label values tuple: number}.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, help, callback, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            yield self.name, _label_text(self.labels, label_values), value
+
+
+class MetricsRegistry:
+    """Named metrics rendered together for a scrape"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Re-registering (a reloaded module, a second app) replaces gauges and reuses the rest
+                if isinstance(metric, Gauge):
+                    self._metrics[metric.name] = metric
+                    return metric
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, callback, labels=()):
+        return self._register(Gauge(name, help, callback, labels))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                # A failing gauge callback must not break the whole scrape
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+# Shared by scanners and the dashboard in this process
+registry = MetricsRegistry()
+
+AWS_API_CALLS = registry.counter(
+    'threatforge_aws_api_calls_total', "AWS API calls made by scanners", ('service', 'operation', 'status'))
+AWS_API_DURATION = registry.histogram(
+    'threatforge_aws_api_call_duration_seconds', "AWS API call latency, including retries", ('service', 'operation'))
+AWS_API_THROTTLES = registry.counter(
+    'threatforge_aws_api_throttled_total', "AWS API attempts rejected by throttling", ('service', 'operation'))
+CHECK_DURATION = registry.histogram(
+    'threatforge_check_duration_seconds', "Time spent in each scanner check", ('check', 'region', 'account'))
+FINDINGS = registry.counter(
+    'threatforge_findings_total', "Findings produced by scans", ('scan_type', 'severity'))
+SCANS = registry.counter(
+    'threatforge_scans_total', "Scans finished", ('scan_type',))
+SCAN_DURATION = registry.histogram(
+    'threatforge_scan_duration_seconds', "Duration of whole scans", ('scan_type',))
+
+
+def time_check(check, region=None, account=None):
+    """Context manager timing one scanner check"""
+    return CHECK_DURATION.time(check, region or '', account or '')
+
+
+def _operation_labels(model):
+    return model.service_model.service_name, model.name
+
+
+def _before_call(model, context, **kwargs):
+    context['threatforge_started'] = time.perf_counter()
+
+
+def _after_call(model, context, http_response=None, **kwargs):
+    started = context.pop('threatforge_started', None)
+    service, operation = _operation_labels(model)
+    failed = http_response is None or http_response.status_code >= 300
+    AWS_API_CALLS.inc(service, operation, 'error' if failed else 'ok')
+    if started is not None:
+        AWS_API_DURATION.observe(time.perf_counter() - started, service, operation)
+
+
+def _after_call_error(model, context, **kwargs):
+    # Connection errors and the like, raised before any response was parsed
+    _after_call(model, context)
+
+
+def _needs_retry(response=None, operation=None, **kwargs):
+    # Emitted for every attempt; return None so the retry handlers decide
+    if response is None or operation is None:
+        return None
+    http_response, parsed = response
+    code = (parsed or {}).get('Error', {}).get('Code')
+    if code in THROTTLE_CODES or getattr(http_response, 'status_code', None) == 429:
+        AWS_API_THROTTLES.inc(*_operation_labels(operation))
+    return None
+
+
+def instrument_session(session):
+    """Record metrics for every AWS API call made by clients this boto3 session creates from now on
+
+    Safe to call more than once on the same session. Objects without botocore
+    events (such as the scan worker's WarmSession, which instruments its own
+    session) are returned unchanged.
+    """
+    events = getattr(session, 'events', None)
+    if events is None:
+        return session
+    events.register('before-call', _before_call, unique_id='threatforge-metrics-before-call')
+    events.register('after-call', _after_call, unique_id='threatforge-metrics-after-call')
+    events.register('after-call-error', _after_call_error, unique_id='threatforge-metrics-after-call-error')
+    events.register('needs-retry', _needs_retry, unique_id='threatforge-metrics-needs-retry')
+    return session
+
+
+class ScanEventMetrics:
+    """Counts findings and times scans from the scan event bus"""
+
+    def __init__(self, event_bus):
+        self._started = {}  # (scan_type, scan_time) -> perf_counter at scan_started
+        self._unsubscribe = [
+            event_bus.subscribe(FINDING, self._on_finding),
+            event_bus.subscribe(SCAN_STARTED, self._on_started),
+            event_bus.subscribe(SCAN_FINISHED, self._on_finished),
+        ]
+
+    def _on_finding(self, event):
+        FINDINGS.inc(event.get('scan_type') or '', field_value(event['finding'], 'severity') or '')
+
+    def _on_started(self, event):
+        self._started[(event.get('scan_type'), event.get('scan_time'))] = time.perf_counter()
+
+    def _on_finished(self, event):
+        scan_type = event.get('scan_type')
+        started = self._started.pop((scan_type, event.get('scan_time')), None)
+        SCANS.inc(scan_type or '')
+        if started is not None:
+            SCAN_DURATION.observe(time.perf_counter() - started, scan_type or '')
+
+    def close(self):
+        for unsubscribe in self._unsubscribe:
+            unsubscribe()
+        self._unsubscribe = []
+
+
+def watch_scan_events(event_bus=None):
+    """Start counting findings and scans published on the event bus (the shared bus by default)"""
+    return ScanEventMetrics(event_bus or bus)
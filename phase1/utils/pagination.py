@@ -0,0 +1,32 @@
+# utils/pagination.py
+"""
+Streaming helpers on top of boto3 paginators.
+
+Scanners use these instead of single describe_*/list_* calls so that every
+page of an account is visited while only one page is held in memory.
+"""
+
+
+def iter_pages(client, operation, page_size=None, **kwargs):
+    """Yield raw response pages for an AWS API operation
+
+    EC2 describe_* calls return everything in one response unless a page size
+    is requested, so callers should pass one that the API accepts.
+    """
+    if not client.can_paginate(operation):
+        # Operations without a paginator (e.g. list_buckets on older botocore)
+        # return everything in a single response
+        yield getattr(client, operation)(**kwargs)
+        return
+
+    paginator = client.get_paginator(operation)
+    pagination_config = {'PageSize': page_size} if page_size else {}
+    for page in paginator.paginate(PaginationConfig=pagination_config, **kwargs):
+        yield page
+
+
+def iter_resources(client, operation, result_key, page_size=None, **kwargs):
+    """Yield individual resources from every page of an AWS API operation"""
+    for page in iter_pages(client, operation, page_size=page_size, **kwargs):
+        for resource in page.get(result_key, []):
+            yield resource
@@ -0,0 +1,135 @@
+# utils/report_aggregator.py
+"""
+One-pass aggregation of findings into the security report sections.
+
+ReportAggregator.add() folds in one finding at a time: the severity counts,
+the per-service finding lists, the recommendations and the risk score are
+all updated together. Findings can therefore come straight from a
+streaming source such as FindingsStore.iter_findings() or
+iter_scan_findings(), and are never held as a list.
+
+Counts and the risk score take constant memory. The per-service lists and
+recommendations are part of the report itself and grow with the number of
+CRITICAL, HIGH and MEDIUM findings. Pass keep_details=False when only the
+summary and risk assessment are needed.
+"""
+from utils.findings import field_value
+
+# Severities whose findings are listed in the report, by service
+DETAIL_SEVERITIES = ('CRITICAL', 'HIGH', 'MEDIUM')
+
+# Points each finding adds to the risk score (capped at 100)
+RISK_WEIGHTS = {'CRITICAL': 10, 'HIGH': 7, 'MEDIUM': 4}
+
+
+def recommendation_for(severity, title, resource):
+    """The fix recommended for a finding, or None"""
+    title = title or ''
+    if severity == 'CRITICAL' and ("SSH" in title or "RDP" in title):
+        return {
+            "priority": "IMMEDIATE",
+            "action": "Restrict SSH/RDP access",
+            "description": f"Close {title} in security group {resource}",
+            "impact": "Prevents unauthorized remote access"
+        }
+    if severity == 'HIGH' and "IAM" in title:
+        return {
+            "priority": "HIGH",
+            "action": "Configure IAM password policy",
+            "description": "Set strong password requirements for IAM users",
+            "impact": "Improves account security"
+        }
+    if severity == 'MEDIUM' and "EBS" in title:
+        return {
+            "priority": "MEDIUM",
+            "action": "Enable EBS encryption",
+            "description": f"Encrypt EBS volume {resource}",
+            "impact": "Protects data at rest"
+        }
+    return None
+
+
+class ReportAggregator:
+    """Builds every section of the security report in a single pass over the findings"""
+
+    def __init__(self, keep_details=True):
+        self.keep_details = keep_details
+        self.total = 0
+        self.severity_counts = dict.fromkeys(DETAIL_SEVERITIES, 0)
+        self.risk_points = 0
+        self.by_severity = {severity: {} for severity in DETAIL_SEVERITIES}
+        # Recommendations are listed critical first, then high, then medium
+        self._recommendations = {severity: [] for severity in DETAIL_SEVERITIES}
+
+    def add(self, finding):
+        """Fold one finding (a Finding or a finding dict) into every section"""
+        self.total += 1
+        severity = field_value(finding, 'severity')
+        if severity not in self.severity_counts:
+            return
+
+        self.severity_counts[severity] += 1
+        self.risk_points += RISK_WEIGHTS[severity]
+        if not self.keep_details:
+            return
+
+        title = field_value(finding, 'title')
+        resource = field_value(finding, 'resource')
+        self.by_severity[severity].setdefault(field_value(finding, 'service'), []).append({
+            "title": title,
+            "resource": resource,
+            "description": field_value(finding, 'description'),
+            "recommendation": field_value(finding, 'recommendation')
+        })
+
+        recommendation = recommendation_for(severity, title, resource)
+        if recommendation is not None:
+            self._recommendations[severity].append(recommendation)
+
+    def add_all(self, findings):
+        for finding in findings:
+            self.add(finding)
+        return self
+
+    @classmethod
+    def from_scan(cls, scan):
+        """Summary-only aggregator from the severity totals kept on a FindingsStore scan row"""
+        aggregator = cls(keep_details=False)
+        aggregator.total = scan['total_findings']
+        for severity in DETAIL_SEVERITIES:
+            count = scan[severity.lower()]
+            aggregator.severity_counts[severity] = count
+            aggregator.risk_points += RISK_WEIGHTS[severity] * count
+        return aggregator
+
+    def executive_summary(self):
+        critical_count = self.severity_counts['CRITICAL']
+        high_count = self.severity_counts['HIGH']
+        medium_count = self.severity_counts['MEDIUM']
+
+        return {
+            "total_findings": self.total,
+            "critical_findings": critical_count,
+            "high_findings": high_count,
+            "medium_findings": medium_count,
+            "overall_risk": "CRITICAL" if critical_count > 0 else "HIGH" if high_count > 0 else "MEDIUM",
+            "summary": f"Found {critical_count} critical, {high_count} high, and {medium_count} medium security issues requiring attention."
+        }
+
+    def findings_by_service(self, severity):
+        return self.by_severity[severity]
+
+    def recommendations(self):
+        return [
+            recommendation
+            for severity in DETAIL_SEVERITIES
+            for recommendation in self._recommendations[severity]
+        ]
+
+    def risk_assessment(self):
+        risk_score = self.risk_points
+        return {
+            "risk_score": min(100, risk_score),
+            "risk_level": "CRITICAL" if risk_score >= 50 else "HIGH" if risk_score >= 30 else "MEDIUM",
+            "compliance_status": "NON-COMPLIANT" if risk_score >= 30 else "PARTIALLY_COMPLIANT"
+        }
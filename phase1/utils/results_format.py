@@ -0,0 +1,174 @@
+# utils/results_format.py
+"""
+Compact on-disk format for scan results.
+
+A results file is gzip-compressed newline-delimited JSON:
+
+    {"header": {...scan fields..., "summary": {"severity": {...}, "service": {...}, "region": {...}}}}
+    {"s": [0, "CRITICAL"]}
+    {"f": {"severity": 0, "resource": "sg-123", ...}}
+    ...
+
+The header comes first, so totals can be read without decompressing the
+findings. Repeated strings (severity, title, recommendation, ...) are written
+once as "s" records and referenced by index from the "f" records that follow.
+Descriptions that the rule catalogue renders from a finding's rule_id and
+params are left out and rebuilt by the reader.
+Pretty-printed JSON files from earlier releases stay readable through
+load_scan_results() and iter_scan_findings().
+"""
+import gzip
+import json
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from utils.findings import as_dict, field_value, rule_description
+
+FORMAT_NAME = "threatforge-ndjson"
+FORMAT_VERSION = 2  # 2: descriptions rendered from the rule catalogue are not stored
+SUFFIX = ".ndjson.gz"
+
+# Finding fields whose values repeat across findings and are interned.
+# Descriptions and timestamps are near-unique per finding and written inline,
+# so the string table stays the size of the rule set, not of the scan.
+INTERNED_FIELDS = ('severity', 'service', 'region', 'account', 'title', 'recommendation')
+
+# Fields the reader resolves, including those interned by version 1 writers
+DECODED_FIELDS = INTERNED_FIELDS + ('description', 'timestamp')
+
+SUMMARY_FIELDS = ('severity', 'service', 'region')
+
+
+def summarize_findings(findings):
+    """Count findings by severity, service and region"""
+    summary = {field: Counter() for field in SUMMARY_FIELDS}
+    total = 0
+    for finding in findings:
+        total += 1
+        for field in SUMMARY_FIELDS:
+            value = field_value(finding, field)
+            if value is not None:
+                summary[field][value] += 1
+    return total, {field: dict(counts) for field, counts in summary.items()}
+
+
+def write_scan_results(path, scan_data):
+    """Write a scan document in the compact format"""
+    findings = scan_data.get('findings', [])
+    total, summary = summarize_findings(findings)
+
+    header = {key: value for key, value in scan_data.items() if key != 'findings'}
+    header.update({
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'total_findings': total,
+        'summary': summary
+    })
+
+    strings = {}
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(dumps({'header': header}) + "\n")
+
+        for finding in findings:
+            data = as_dict(finding)
+            record = {}
+            for field, value in data.items():
+                if field == 'description' and value == rule_description(data):
+                    continue  # Rendered again on read
+                if field in INTERNED_FIELDS and isinstance(value, str):
+                    index = strings.get(value)
+                    if index is None:
+                        index = strings[value] = len(strings)
+                        f.write(dumps({'s': [index, value]}) + "\n")
+                    value = index
+                record[field] = value
+            f.write(dumps({'f': record}) + "\n")
+
+    return path
+
+
+def is_compact(path):
+    return str(path).endswith(SUFFIX)
+
+
+def read_summary(path):
+    """Return the header of a results file without reading its findings"""
+    if not is_compact(path):
+        return _legacy_header(load_scan_results(path))
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.loads(f.readline())['header']
+
+
+def _legacy_header(scan_data):
+    # Old JSON files carry no summary; count it from the findings
+    total, summary = summarize_findings(scan_data.get('findings', []))
+    header = {key: value for key, value in scan_data.items() if key != 'findings'}
+    header.update({'total_findings': total, 'summary': summary})
+    return header
+
+
+def iter_scan_findings(path):
+    """Stream the findings of a results file one at a time"""
+    if not is_compact(path):
+        yield from load_scan_results(path).get('findings', [])
+        return
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        f.readline()  # Header
+        yield from _read_findings(f)
+
+
+@contextmanager
+def open_scan_results(path):
+    """Open a results file once and yield its header and an iterator over its findings"""
+    if not is_compact(path):
+        scan_data = load_scan_results(path)
+        yield _legacy_header(scan_data), iter(scan_data.get('findings', []))
+        return
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())['header']
+        yield header, _read_findings(f)
+
+
+def _read_findings(f):
+    # Decode the records that follow the header line
+    strings = []
+    for line in f:
+        record = json.loads(line)
+        if 'f' in record:
+            finding = record['f']
+            for field in DECODED_FIELDS:
+                value = finding.get(field)
+                if isinstance(value, int):
+                    finding[field] = strings[value]
+            if 'description' not in finding:
+                description = rule_description(finding)
+                if description is not None:
+                    finding['description'] = description
+            yield finding
+        elif 's' in record:
+            strings.append(record['s'][1])
+
+
+def load_scan_results(path):
+    """Load a whole scan document from either the compact or the legacy JSON format"""
+    if not is_compact(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    scan_data = read_summary(path)
+    for key in ('format', 'format_version', 'summary'):
+        scan_data.pop(key, None)
+    scan_data['findings'] = list(iter_scan_findings(path))
+    return scan_data
+
+
+def results_files(results_dir):
+    """Scan result files in a directory, in either format"""
+    results_dir = Path(results_dir)
+    return list(results_dir.glob("*scan*.json")) + list(results_dir.glob(f"*scan*{SUFFIX}"))
@@ -4,6 +4,8 @@ import os
 from pathlib import Path
 from colorama import Fore, Style, init
 
+from utils.results_format import read_summary, results_files
+
 init(autoreset=True)
 
 def verify_complete_system():
@@ -50,7 +52,7 @@ def verify_complete_system():
     # Check 3: Security reports
     print(f"{Fore.WHITE}3. Security Reports:")
     results_dir = Path("results")
-    scan_files = list(results_dir.glob("*scan*.json"))
+    scan_files = results_files(results_dir)
     report_files = list(results_dir.glob("security_report*"))
     
     if scan_files:
@@ -80,14 +82,14 @@ def verify_complete_system():
     # Check 5: Latest scan findings
     print(f"{Fore.WHITE}5. Latest Security Findings:")
     try:
-        with open(latest_scan, 'r') as f:
-            scan_data = json.load(f)
-        findings = scan_data.get('findings', [])
-        critical = len([f for f in findings if f['severity'] == 'CRITICAL'])
-        high = len([f for f in findings if f['severity'] == 'HIGH'])
-        medium = len([f for f in findings if f['severity'] == 'MEDIUM'])
+        # Either format; counts come from the summary header
+        header = read_summary(latest_scan)
+        severity = header['summary']['severity']
+        critical = severity.get('CRITICAL', 0)
+        high = severity.get('HIGH', 0)
+        medium = severity.get('MEDIUM', 0)
         
-        print(f"   ✓ Total findings: {len(findings)}")
+        print(f"   ✓ Total findings: {header['total_findings']}")
         print(f"   ✓ Critical: {critical}, High: {high}, Medium: {medium}")
         
     except Exception as e: